@@ -61,6 +61,7 @@ class Search(object):
         self.logger = logging.getLogger(self.name)
         self.logger.info('Project directory: {}'.format(self.dir))
         self.best_keras_graph = None
+        self.best_preprocess_graph = None
         self.best_model = None
         self.need_fully_train = False
 
@@ -88,9 +89,8 @@ class Search(object):
         tuner.search_space_summary()
         # show the search results
         tuner.results_summary()
-        best_pipe_lists = tuner.get_best_models(1)
-        # len(best_pipe_lists) == 0 means that this pipeline does not have tunable parameters
-        self.best_model = best_pipe_lists[0]
+        # the best model predicts on the data transformed by its fitted preprocessors
+        self.best_preprocess_graph, self.best_model = tuner.get_best_model()
         return self.best_model
 
     def _build_tuner(self, tuner, tuner_params):
@@ -123,6 +123,7 @@ class Search(object):
         """
         if isinstance (self.pipe, RPRecommender):
             x = load_dataframe_input(x)
+        x = PipeTuner.transform(self.best_preprocess_graph, x)
         return self.best_model.predict(x)
 
     def evaluate(self, x, y_true):
@@ -3,3 +3,4 @@ from autorecsys.pipeline.interactor import MLPInteraction, ConcatenateInteractio
     ElementwiseInteraction, CrossNetInteraction, SelfAttentionInteraction, HyperInteraction, InnerProductInteraction
 from autorecsys.pipeline.optimizer import RatingPredictionOptimizer, CTRPredictionOptimizer
 from autorecsys.pipeline.node import Input, StructuredDataInput
+from autorecsys.pipeline.preprocessor import Normalization
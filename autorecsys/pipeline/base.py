@@ -7,13 +7,19 @@ from tensorflow.python.util import nest
 
 
 class Node(Stateful):
-    """The nodes in a network connecting the blocks."""
+    """The nodes in a network connecting the blocks.
+    # Arguments
+        shape: A tuple of integers specifying the shape of the data without the batch dimension.
+        dtype: String or tf.DType. The data type of the data, e.g., 'int32' for categorical indices.
+            Defaults to None, which uses the Keras default float type.
+    """
 
-    def __init__(self, shape=None):
+    def __init__(self, shape=None, dtype=None):
         super().__init__()
         self.in_blocks = []
         self.out_blocks = []
         self.shape = shape
+        self.dtype = dtype
 
     def add_in_block(self, hypermodel):
         self.in_blocks.append(hypermodel)
@@ -22,13 +28,23 @@ class Node(Stateful):
         self.out_blocks.append(hypermodel)
 
     def build(self):
-        return tf.keras.Input(shape=self.shape)
+        return tf.keras.Input(shape=self.shape, dtype=self.dtype)
+
+    def build_block_input(self, inputs):
+        """Convert the Keras Input(s) returned by build() to the tensor fed to the blocks.
+        # Arguments
+            inputs: The Keras Input(s) returned by build().
+        # Returns
+            A tensor.
+        """
+        return inputs
 
     def get_state(self):
-        return {'shape': self.shape}
+        return {'shape': self.shape, 'dtype': self.dtype}
 
     def set_state(self, state):
         self.shape = state['shape']
+        self.dtype = state.get('dtype')
 
 
 class HyperModel(object):
@@ -94,6 +110,19 @@ class Block(HyperModel, Stateful):
     def __str__(self):
         return self.name
 
+    def __getstate__(self):
+        # The wrapped build methods are closures, which cannot be pickled but are
+        # recreated by __new__ on unpickling.
+        state = self.__dict__.copy()
+        state.pop('build', None)
+        state.pop('_build', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build = self.build
+        self.build = self._build_wrapper
+
     @property
     def hyperparameters(self):
         return self._hyperparameters
@@ -193,6 +222,34 @@ class Preprocessor(Block):
         """
         raise NotImplementedError
 
+    def update_batch(self, x, y=None):
+        """Compute the partial state of the preprocessor fitted with a batch of instances.
+        The preprocessor itself is not changed until the partial state is merged,
+        so the batches can be fitted in any order and in other processes, in
+        which case the preprocessor and the partial state must be picklable.
+        # Arguments
+            x: A list of numpy.ndarray. A batch of instances for each input node,
+                with the batch dimension first.
+            y: numpy.ndarray. The targets of the tasks. Defaults to None.
+        # Returns
+            The partial state to be merged by merge().
+        """
+        raise NotImplementedError
+
+    def merge(self, partial_state):
+        """Merge a partial state returned by update_batch into the preprocessor.
+        # Arguments
+            partial_state: The partial state of a batch of instances.
+        """
+        raise NotImplementedError
+
+    def supports_batch_update(self):
+        """Whether the preprocessor implements update_batch and merge.
+        # Returns
+            A boolean.
+        """
+        return type(self).update_batch is not Preprocessor.update_batch
+
     def transform(self, x, fit=False):
         """Incrementally fit the preprocessor with a single training instance.
         # Arguments
@@ -203,6 +260,27 @@ class Preprocessor(Block):
         """
         raise NotImplementedError
 
+    def transform_batch(self, x, fit=False):
+        """Transform a batch of instances at once.
+        Unlike transform, it is traced into the tf.data graph instead of called
+        through tf.py_function, so it must be written with TensorFlow ops, which
+        lets the batches be transformed in parallel outside the Python GIL.
+        Preprocessors not overriding it are transformed instance by instance.
+        # Arguments
+            x: tf.Tensor. A batch of instances with the batch dimension first.
+            fit: Boolean. Whether it is in fit mode.
+        Returns:
+            A tf.Tensor of the transformed batch with the batch dimension first.
+        """
+        raise NotImplementedError
+
+    def supports_batch(self):
+        """Whether the preprocessor implements transform_batch.
+        # Returns
+            A boolean.
+        """
+        return type(self).transform_batch is not Preprocessor.transform_batch
+
     def output_types(self):
         """The output types of the transformed data, e.g. tf.int64.
         The output types are required by tf.py_function, which is used for transform
@@ -1,15 +1,32 @@
 import os
+import copy as copy_module
 import pickle
 import functools
+import collections
+from concurrent.futures import ProcessPoolExecutor
 
 from autorecsys.searcher.core.trial import Stateful
 from autorecsys.searcher.core import hyperparameters as hp_module
 from autorecsys.pipeline import base
+from autorecsys.pipeline.utils import LazyAdam
 
 import tensorflow as tf
 from tensorflow.python.util import nest
 
 
+# The Preprocessors of a worker process of PreprocessGraph._fit_batch, sent once by the executor initializer.
+_worker_blocks = None
+
+
+def _init_worker(blocks):
+    global _worker_blocks
+    _worker_blocks = blocks
+
+
+def _update_batch(block_index, data, y):
+    return _worker_blocks[block_index].update_batch(data, y=y)
+
+
 class Graph(Stateful):
     """A graph consists of connected Blocks, HyperBlocks
 
@@ -182,25 +199,34 @@ class PreprocessGraph(Graph):
     a Keras model.
     """
 
-    def preprocess(self, dataset, validation_data=None, fit=False):
+    def preprocess(self, dataset, validation_data=None, fit=False, batch_size=None,
+                   num_workers=None):
         """Preprocess the data to be ready for the Keras Model.
         # Arguments
             dataset: tf.data.Dataset. Training data.
             validation_data: tf.data.Dataset. Validation data.
             fit: Boolean. Whether to fit the preprocessing layers with x and y.
+            batch_size: Int. Number of instances fitted or transformed at once by
+                the Preprocessors supporting update_batch or transform_batch.
+                Defaults to None to fit and transform instance by instance.
+            num_workers: Int. Number of processes to fit the batches in parallel.
+                Defaults to None to fit them in the current process.
         # Returns
             if validation data is provided.
             A tuple of two preprocessed tf.data.Dataset, (train, validation).
             Otherwise, return the training dataset.
         """
-        dataset = self._preprocess(dataset, fit=fit)
+        dataset = self._preprocess(dataset, fit=fit, batch_size=batch_size,
+                                   num_workers=num_workers)
         if validation_data:
-            validation_data = self._preprocess(validation_data)
+            validation_data = self._preprocess(validation_data, batch_size=batch_size)
         return dataset, validation_data
 
-    def _preprocess(self, dataset, fit=False):
+    def _preprocess(self, dataset, fit=False, batch_size=None, num_workers=None):
         # A list of input node ids in the same order as the x in the dataset.
         input_node_ids = [self._node_to_id[input_node] for input_node in self.inputs]
+        # Whether the elements of the dataset are currently batches.
+        batched = False
 
         # Iterate until all the model inputs have their data.
         while set(map(lambda node: self._node_to_id[node], self.outputs)
@@ -212,39 +238,105 @@ class PreprocessGraph(Graph):
                     if block in self._blocks:
                         blocks.append(block)
             if fit:
+                if batched:
+                    dataset = dataset.unbatch()
+                    batched = False
                 # Iterate the dataset to fit the preprocessors in current depth.
-                self._fit(dataset, input_node_ids, blocks)
+                self._fit(dataset, input_node_ids, blocks, batch_size=batch_size,
+                          num_workers=num_workers)
 
-            # Transform the dataset.
+            # Transform the dataset, by batches if all the blocks support it.
             output_node_ids = []
-            dataset = dataset.map(functools.partial(
-                self._transform,
-                input_node_ids=input_node_ids,
-                output_node_ids=output_node_ids,
-                blocks=blocks,
-                fit=fit))
+            if batch_size and all(block.supports_batch() for block in blocks):
+                if not batched:
+                    dataset = dataset.batch(batch_size)
+                    batched = True
+                dataset = dataset.map(functools.partial(
+                    self._transform_batch,
+                    input_node_ids=input_node_ids,
+                    output_node_ids=output_node_ids,
+                    blocks=blocks,
+                    fit=fit), num_parallel_calls=tf.data.experimental.AUTOTUNE)
+            else:
+                if batched:
+                    dataset = dataset.unbatch()
+                    batched = False
+                dataset = dataset.map(functools.partial(
+                    self._transform,
+                    input_node_ids=input_node_ids,
+                    output_node_ids=output_node_ids,
+                    blocks=blocks,
+                    fit=fit))
 
             # Build input_node_ids for next depth.
             input_node_ids = output_node_ids
+        if batched:
+            dataset = dataset.unbatch()
         return dataset
 
-    def _fit(self, dataset, input_node_ids, blocks):
+    def _fit(self, dataset, input_node_ids, blocks, batch_size=None, num_workers=None):
+        # Fit the preprocessors supporting it by batches, and the others by instances.
+        batch_blocks = [block for block in blocks
+                        if batch_size and block.supports_batch_update()]
+        instance_blocks = [block for block in blocks if block not in batch_blocks]
+
         # Iterate the dataset to fit the preprocessors in current depth.
-        for x, y in dataset:
-            x = nest.flatten(x)
-            id_to_data = {
-                node_id: temp_x for temp_x, node_id in zip(x, input_node_ids)
-            }
-            for block in blocks:
-                data = [id_to_data[self._node_to_id[input_node]]
-                        for input_node in block.inputs]
-                block.update(data, y=y)
+        if instance_blocks:
+            for x, y in dataset:
+                for block, data in self._gather_block_data(x, input_node_ids,
+                                                           instance_blocks):
+                    block.update(data, y=y)
+        if batch_blocks:
+            self._fit_batch(dataset.batch(batch_size), input_node_ids, batch_blocks,
+                            num_workers=num_workers)
 
         # Finalize and set the shapes of the output nodes.
         for block in blocks:
             block.finalize()
             nest.flatten(block.outputs)[0].shape = block.output_shape
 
+    def _fit_batch(self, dataset, input_node_ids, blocks, num_workers=None):
+        if not num_workers or num_workers <= 1:
+            for x, y in dataset.as_numpy_iterator():
+                for block, data in self._gather_block_data(x, input_node_ids, blocks):
+                    block.merge(block.update_batch(data, y=y))
+            return
+
+        # The workers only need the preprocessors, not the graph connected to them.
+        worker_blocks = []
+        for block in blocks:
+            worker_block = copy_module.copy(block)
+            worker_block.inputs = None
+            worker_block.outputs = None
+            worker_blocks.append(copy_module.deepcopy(worker_block))
+        block_indices = {block: index for index, block in enumerate(blocks)}
+
+        # The partial states are merged in the order of the batches, and the pending
+        # batches are bounded to keep the memory usage independent of the dataset.
+        pending = collections.deque()
+        with ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker,
+                                 initargs=(worker_blocks,)) as executor:
+            for x, y in dataset.as_numpy_iterator():
+                for block, data in self._gather_block_data(x, input_node_ids, blocks):
+                    pending.append((block, executor.submit(
+                        _update_batch, block_indices[block], data, y)))
+                while len(pending) > 2 * num_workers * len(blocks):
+                    block, future = pending.popleft()
+                    block.merge(future.result())
+            while pending:
+                block, future = pending.popleft()
+                block.merge(future.result())
+
+    def _gather_block_data(self, x, input_node_ids, blocks):
+        x = nest.flatten(x)
+        id_to_data = {
+            node_id: temp_x for temp_x, node_id in zip(x, input_node_ids)
+        }
+        for block in blocks:
+            data = [id_to_data[self._node_to_id[input_node]]
+                    for input_node in block.inputs]
+            yield block, data
+
     def _transform(self,
                    x,
                    y,
@@ -278,6 +370,38 @@ class PreprocessGraph(Graph):
         return tuple(map(
             lambda node_id: output_data[node_id], output_node_ids)), y
 
+    def _transform_batch(self,
+                         x,
+                         y,
+                         input_node_ids,
+                         output_node_ids,
+                         blocks,
+                         fit=False):
+        x = nest.flatten(x)
+        id_to_data = {
+            node_id: temp_x
+            for temp_x, node_id in zip(x, input_node_ids)
+        }
+        output_data = {}
+        # Transform each batch of x by the corresponding block in graph mode.
+        for hm in blocks:
+            data = [id_to_data[self._node_to_id[input_node]]
+                    for input_node in hm.inputs]
+            data = hm.transform_batch(*nest.flatten(data), fit=fit)
+            data = nest.flatten(data)[0]
+            data.set_shape(tf.TensorShape([None]).concatenate(hm.output_shape))
+            output_data[self._node_to_id[hm.outputs[0]]] = data
+        # Keep the Keras Model inputs even they are not inputs to the blocks.
+        for node_id, data in id_to_data.items():
+            if self._nodes[node_id] in self.outputs:
+                output_data[node_id] = data
+
+        # The node ids are recorded once, when the map function is traced.
+        if not output_node_ids:
+            output_node_ids.extend(sorted(output_data.keys()))
+        return tuple(map(
+            lambda node_id: output_data[node_id], output_node_ids)), y
+
     def build(self, hp):
         """Obtain the values of all the HyperParameters.
         Different from the build function of Hypermodel. This build function does not
@@ -300,9 +424,11 @@ class KerasGraph(Graph, base.HyperModel):
         super().build(hp)
         # self.compile(compiler.AFTER)
         real_nodes = {}
+        keras_inputs = []
         for input_node in self.inputs:
             node_id = self._node_to_id[input_node]
-            real_nodes[node_id] = input_node.build()
+            keras_inputs.append(input_node.build())
+            real_nodes[node_id] = input_node.build_block_input(keras_inputs[-1])
         for block in self._blocks:
             temp_inputs = [real_nodes[self._node_to_id[input_node]]
                            for input_node in block.inputs]
@@ -311,8 +437,7 @@ class KerasGraph(Graph, base.HyperModel):
             for output_node, real_output_node in zip(block.outputs, outputs):
                 real_nodes[self._node_to_id[output_node]] = real_output_node
         model = tf.keras.Model(
-            [real_nodes[self._node_to_id[input_node]] for input_node in
-             self.inputs],
+            keras_inputs,
             [real_nodes[self._node_to_id[output_node]] for output_node in
              self.outputs])
 
@@ -340,14 +465,19 @@ class KerasGraph(Graph, base.HyperModel):
 
     def _compile_keras_model(self, hp, model):
         # Specify hyperparameters from compile(...)
+        # 'lazy_adam' and 'adagrad' only update the embeddings looked up in each batch,
+        # so their steps do not scale with the sizes of the embedding tables.
         optimizer = hp.Choice('optimizer',
                               ['adam',
+                               'lazy_adam',
+                               'adagrad',
                                # 'adadelta',
-                               # "Adagrad",
                                # "RMSprop",
                                #  "AdaMax",
                                # 'sgd'
                                ])
+        if optimizer == 'lazy_adam':
+            optimizer = LazyAdam()
 
         model.compile(optimizer=optimizer,
                       metrics=self._get_metrics(),
@@ -1,7 +1,97 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import logging
+import numpy as np
 import tensorflow as tf
 from autorecsys.pipeline.base import Block
+from autorecsys.pipeline.utils import FieldEmbedding, MixedDimensionEmbedding, QuotientRemainderEmbedding
+from autorecsys.searcher.core import hyperparameters as hp_module
+
+logger = logging.getLogger(__name__)
+
+
+def get_embedding_bytes(table_sizes, embedding_dim, dtype='float32'):
+    """ Get the memory used by embedding tables.
+
+    # Arguments
+        table_sizes (list): The numbers of rows of the embedding tables.
+        embedding_dim (int or list): The dimension of the embeddings of all or each of the tables.
+        dtype (str): The data type of the embeddings.
+
+    # Returns
+        Integer number of bytes.
+    """
+    return int(np.dot(np.asarray(table_sizes, dtype=np.int64), embedding_dim)) * np.dtype(dtype).itemsize
+
+
+def get_num_buckets(input_dim, num_collisions):
+    """ Get the number of remainder buckets of a field compressed by the quotient-remainder trick.
+
+    # Arguments
+        input_dim (int): The number of indices of the field.
+        num_collisions (int): The number of indices sharing each remainder bucket.
+
+    # Returns
+        Integer number of buckets, or None if the compressed tables would not have fewer rows than the full table.
+    """
+    if not num_collisions or num_collisions <= 1:
+        return None
+    num_buckets = -(-input_dim // num_collisions)
+    if num_buckets + -(-input_dim // num_buckets) >= input_dim:
+        return None
+    return num_buckets
+
+
+def get_table_size(input_dim, num_buckets):
+    """ Get the number of embedding rows of a field, which is compressed if num_buckets is not None. """
+    return input_dim if num_buckets is None else num_buckets + -(-input_dim // num_buckets)
+
+
+def get_dimension_blocks(input_dim, embedding_dim, num_frequent, min_dim=2):
+    """ Get the blocks of indices of a field with mixed-dimension embeddings.
+
+    # Note
+        The first num_frequent indices have embeddings of embedding_dim. Each next block has 4 times as many indices
+            with embeddings of half the dimension, down to min_dim for all the remaining indices.
+
+    # Arguments
+        input_dim (int): The number of indices of the field.
+        embedding_dim (int): The dimension of the embeddings of the most frequent indices.
+        num_frequent (int): The number of indices of the first block.
+        min_dim (int): The minimum dimension of the embeddings.
+
+    # Returns
+        2-tuple of lists of the numbers of indices and the dimensions of the embeddings of the blocks, or None if the
+            field fits in the first block.
+    """
+    if not num_frequent or input_dim <= num_frequent:
+        return None
+    block_sizes, block_dims = [], []
+    start, size, dim = 0, num_frequent, embedding_dim
+    while start < input_dim:
+        if dim <= min_dim:
+            size = input_dim - start
+        size = min(size, input_dim - start)
+        block_sizes.append(size)
+        block_dims.append(dim)
+        start += size
+        size *= 4
+        dim = max(dim // 2, min_dim)
+    return block_sizes, block_dims
+
+
+def log_embedding_bytes(name, table_sizes, embedding_dim):
+    """ Log the number of rows and the memory of the embedding tables of a mapper.
+
+    # Arguments
+        name (str): The name of the mapper.
+        table_sizes (list): The numbers of rows of the embedding tables.
+        embedding_dim (int or list): The dimension of the embeddings of all or each of the tables.
+    """
+    logger.info('{}: {} embedding rows of dimension {}, {:.1f} MB'.format(
+        name, int(np.sum(table_sizes, dtype=np.int64)),
+        embedding_dim if np.isscalar(embedding_dim) else '{}-{}'.format(min(embedding_dim), max(embedding_dim)),
+        get_embedding_bytes(table_sizes, embedding_dim) / 2 ** 20))
 
 
 class LatentFactorMapper(Block):
@@ -22,29 +112,35 @@ class LatentFactorMapper(Block):
         column_id (int): The index of the user (item) entity column.
         num_of_entities (int): The number of the user (item) entity.
         embedding_dim (int): The dimension of the embeddings (latent factors).
+        num_collisions (int): The number of entities sharing each remainder embedding of the quotient-remainder
+            compressed embeddings, or 1 for a full embedding table, e.g., QuotientRemainderEmbedding.
 
     # Attributes
         column_id (int): The index of the user (item) entity column.
         num_of_entities (int): The number of the user (item) entities.
         embedding_dim (int): The dimension of the embeddings (latent factors).
+        num_collisions (int): The number of entities sharing each remainder embedding.
     """
 
     def __init__(self,
                  column_id=None,
                  num_of_entities=None,
                  embedding_dim=None,
+                 num_collisions=None,
                  **kwargs):
         super().__init__(**kwargs)
         self.column_id = column_id
         self.num_of_entities = num_of_entities
         self.embedding_dim = embedding_dim
+        self.num_collisions = num_collisions
 
     def get_state(self):
         state = super().get_state()
         state.update({
             'column_id': self.column_id,
             'num_of_entities': self.num_of_entities,
-            'embedding_dim': self.embedding_dim})
+            'embedding_dim': self.embedding_dim,
+            'num_collisions': self.num_collisions})
         return state
 
     def set_state(self, state):
@@ -52,11 +148,55 @@ class LatentFactorMapper(Block):
         self.column_id = state['column_id']
         self.num_of_entities = state['num_of_entities']
         self.embedding_dim = state['embedding_dim']
+        self.num_collisions = state.get('num_collisions')
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor, column_id, **kwargs):
+        """ Create a mapper with one embedding per index of a categorical column of a fitted preprocessor.
+
+        # Arguments
+            preprocessor (BasePreprocessor): The preprocessor whose categorical data are the input data.
+            column_id (int): The index of the user (item) entity column among the categorical columns.
+            kwargs (dict): Other arguments of the mapper.
+
+        # Returns
+            The mapper with num_of_entities set to the hash size of the column.
+        """
+        return cls(column_id=column_id, num_of_entities=preprocessor.get_hash_size()[column_id], **kwargs)
+
+    def _get_num_of_entities(self, hp):
+        return self.num_of_entities or hp.Choice('num_of_entities', [10000], default=10000)
+
+    def _get_embedding_dim(self, hp):
+        return self.embedding_dim or hp.Choice('embedding_dim', [8, 16, 32, 64, 128], default=32)
+
+    def _get_num_collisions(self, hp):
+        return self.num_collisions or hp.Choice('num_collisions', [1, 4, 16, 64], default=1)
+
+    def get_embedding_bytes(self, hp=None):
+        """ Get the memory used by the embeddings, before the mapper is built.
+
+        # Arguments
+            hp (HyperParameters): The hyperparameters to build the mapper with, or None to use the default values.
+
+        # Returns
+            Integer number of bytes.
+        """
+        hp = hp or hp_module.HyperParameters()
+        with hp.name_scope(self.name):
+            num_of_entities = self._get_num_of_entities(hp)
+            num_buckets = get_num_buckets(num_of_entities, self._get_num_collisions(hp))
+            return get_embedding_bytes([get_table_size(num_of_entities, num_buckets)], self._get_embedding_dim(hp))
 
     def build(self, hp, inputs=None):
         input_node = inputs
-        num_of_entities = self.num_of_entities or hp.Choice('num_of_entities', [10000], default=10000)
-        embedding_dim = self.embedding_dim or hp.Choice('embedding_dim', [8, 16, 32, 64, 128], default=32)
+        num_of_entities = self._get_num_of_entities(hp)
+        embedding_dim = self._get_embedding_dim(hp)
+        num_buckets = get_num_buckets(num_of_entities, self._get_num_collisions(hp))
+        log_embedding_bytes(self.name, [get_table_size(num_of_entities, num_buckets)], embedding_dim)
+        if num_buckets is not None:
+            return QuotientRemainderEmbedding([num_of_entities], embedding_dim, [num_buckets])(
+                input_node[0][:, self.column_id])
         output_node = tf.keras.layers.Embedding(num_of_entities, embedding_dim)(input_node[0][:, self.column_id])
         return output_node
 
@@ -64,26 +204,56 @@ class LatentFactorMapper(Block):
 class SparseFeatureMapper(Block):
     """ This module maps the categorical data of sparse feature columns into embeddings.
 
+    # Note
+        In fused mode, the embeddings of all the fields are rows of one table, where the rows of each field start at
+            the total number of categories of the previous fields. The indices of all the fields are then looked up
+            with a single gather instead of one per field, which is faster for many fields, as measured by
+            examples/mapper_benchmark.py. The output has the same shape as in the default mode.
+        With num_collisions greater than 1, the fields whose tables would shrink are compressed by the
+            quotient-remainder trick, which keeps a unique embedding per category, e.g., QuotientRemainderEmbedding.
+            It is a hyperparameter, so that the tuner can trade accuracy against memory.
+        With num_frequent set, the fields of more categories get mixed-dimension embeddings, where the most frequent
+            categories have embeddings of embedding_dim and the less frequent ones smaller embeddings projected up to
+            embedding_dim, e.g., MixedDimensionEmbedding. It relies on the categories indexed by descending frequency,
+            as by BasePreprocessor unless hash_buckets is set. These fields are looked up separately even in fused
+            mode, while the other fields still share the fused table.
+
     # Arguments
         num_of_fields (int): The number of sparse feature columns (fields).
-        hash_size (list): The numbers of categories used in each sparse feature column.
+        hash_size (int or list): The numbers of categories used in each sparse feature column, or the number of hash
+            buckets used in all sparse feature columns, e.g., BasePreprocessor.hash_buckets.
         embedding_dim (int): The dimension of the embeddings.
+        fused (bool): Whether to store the embeddings of all the fields in one table.
+        num_collisions (int): The number of categories sharing each remainder embedding of the compressed fields, or 1
+            for full embedding tables.
+        num_frequent (int): The number of the most frequent categories of each field with embeddings of embedding_dim,
+            or None for embeddings of embedding_dim for all the categories. See get_dimension_blocks().
 
     # Attributes
         num_of_fields (int): The number of sparse feature columns (fields).
-        hash_size (list): The list of numbers of categories used in each sparse feature column.
+        hash_size (int or list): The numbers of categories used in each sparse feature column, or the number of hash
+            buckets used in all sparse feature columns.
         embedding_dim (int): The dimension of the embeddings.
+        fused (bool): Whether to store the embeddings of all the fields in one table.
+        num_collisions (int): The number of categories sharing each remainder embedding of the compressed fields.
+        num_frequent (int): The number of the most frequent categories of each field with embeddings of embedding_dim.
     """
 
     def __init__(self,
                  num_of_fields=None,
                  hash_size=None,
                  embedding_dim=None,
+                 fused=False,
+                 num_collisions=None,
+                 num_frequent=None,
                  **kwargs):
         super().__init__(**kwargs)
         self.num_of_fields = num_of_fields
         self.hash_size = hash_size
         self.embedding_dim = embedding_dim
+        self.fused = fused
+        self.num_collisions = num_collisions
+        self.num_frequent = num_frequent
 
     def get_state(self):
         """ Get information about the mapper layer, including name, level, and hyperparameters.
@@ -95,7 +265,10 @@ class SparseFeatureMapper(Block):
         state.update({
             'num_of_fields': self.num_of_fields,
             'hash_size': self.hash_size,
-            'embedding_dim': self.embedding_dim})
+            'embedding_dim': self.embedding_dim,
+            'fused': self.fused,
+            'num_collisions': self.num_collisions,
+            'num_frequent': self.num_frequent})
         return state
 
     def set_state(self, state):
@@ -108,6 +281,95 @@ class SparseFeatureMapper(Block):
         self.num_of_fields = state['num_of_fields']
         self.hash_size = state['hash_size']
         self.embedding_dim = state['embedding_dim']
+        self.fused = state.get('fused', False)
+        self.num_collisions = state.get('num_collisions')
+        self.num_frequent = state.get('num_frequent')
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor, **kwargs):
+        """ Create a mapper with one embedding per index of each categorical column of a fitted preprocessor.
+
+        # Arguments
+            preprocessor (BasePreprocessor): The preprocessor whose categorical data are the input data.
+            kwargs (dict): Other arguments of the mapper.
+
+        # Returns
+            The mapper with num_of_fields and hash_size set by the categorical columns of the preprocessor.
+        """
+        return cls(num_of_fields=preprocessor.get_categorical_count(), hash_size=preprocessor.get_hash_size(),
+                   **kwargs)
+
+    def _get_hash_size(self, hp):
+        # TODO: modify default hash_size, current version is wrong when category of a feature is more than 10000
+        hash_size = self.hash_size or [hp.Choice('hash_size', [10000], default=10000)
+                                       for _ in range(self.num_of_fields)]
+        if isinstance(hash_size, int):
+            hash_size = [hash_size] * self.num_of_fields  # hash buckets shared by all columns
+        return hash_size
+
+    def _get_embedding_dim(self, hp):
+        return self.embedding_dim or hp.Choice('embedding_dim', [8, 16], default=8)
+
+    def _get_num_buckets(self, hp, hash_size):
+        num_collisions = self.num_collisions or hp.Choice('num_collisions', [1, 4, 16, 64], default=1)
+        return [get_num_buckets(input_dim, num_collisions) for input_dim in hash_size]
+
+    def _get_dimension_blocks(self, hash_size, embedding_dim, num_buckets):
+        # Compressed fields keep embeddings of embedding_dim.
+        return [None if buckets is not None else get_dimension_blocks(input_dim, embedding_dim, self.num_frequent)
+                for input_dim, buckets in zip(hash_size, num_buckets)]
+
+    @staticmethod
+    def _get_tables(hash_size, embedding_dim, num_buckets, dimension_blocks):
+        # The numbers of rows and the dimensions of all the tables, where a projection counts as a table.
+        table_sizes, table_dims = [], []
+        for input_dim, buckets, blocks in zip(hash_size, num_buckets, dimension_blocks):
+            if blocks is None:
+                table_sizes.append(get_table_size(input_dim, buckets))
+                table_dims.append(embedding_dim)
+                continue
+            for size, dim in zip(*blocks):
+                table_sizes.append(size)
+                table_dims.append(dim)
+                if dim != embedding_dim:
+                    table_sizes.append(dim)
+                    table_dims.append(embedding_dim)
+        return table_sizes, table_dims
+
+    @staticmethod
+    def _build_field_table(input_dim, embedding_dim, num_buckets, dimension_blocks, indices):
+        # The embeddings of one field, which are mixed-dimension, compressed or a full table.
+        if dimension_blocks is not None:
+            return MixedDimensionEmbedding(*dimension_blocks, embedding_dim)(indices)
+        if num_buckets is not None:
+            return QuotientRemainderEmbedding([input_dim], embedding_dim, [num_buckets])(indices)
+        return tf.keras.layers.Embedding(input_dim, embedding_dim)(indices)
+
+    @staticmethod
+    def _build_fused_table(hash_size, embedding_dim, num_buckets, indices):
+        # The embeddings of several fields in one table, looked up with a single gather.
+        if any(num_buckets):
+            return QuotientRemainderEmbedding(hash_size, embedding_dim, num_buckets)(indices)
+        # Shift the indices of each field to its rows in the table before a single lookup.
+        offsets = np.concatenate([[0], np.cumsum(hash_size[:-1])]).astype(np.int64)
+        return tf.keras.layers.Embedding(int(np.sum(hash_size)), embedding_dim)(tf.cast(indices, tf.int64) + offsets)
+
+    def get_embedding_bytes(self, hp=None):
+        """ Get the memory used by the embeddings of all the fields, before the mapper is built.
+
+        # Arguments
+            hp (HyperParameters): The hyperparameters to build the mapper with, or None to use the default values.
+
+        # Returns
+            Integer number of bytes.
+        """
+        hp = hp or hp_module.HyperParameters()
+        with hp.name_scope(self.name):
+            hash_size = self._get_hash_size(hp)
+            embedding_dim = self._get_embedding_dim(hp)
+            num_buckets = self._get_num_buckets(hp, hash_size)
+            dimension_blocks = self._get_dimension_blocks(hash_size, embedding_dim, num_buckets)
+            return get_embedding_bytes(*self._get_tables(hash_size, embedding_dim, num_buckets, dimension_blocks))
 
     def build(self, hp, inputs=None):
         """ Build the mapper layer.
@@ -124,13 +386,38 @@ class SparseFeatureMapper(Block):
             The defined mapper block.
         """
         input_node = inputs
-        # TODO: modify default hash_size, current version is wrong when category of a feature is more than 10000
-        hash_size = self.hash_size or [hp.Choice('hash_size', [10000], default=10000)
-                                       for _ in range(self.num_of_fields)]
-        embedding_dim = self.embedding_dim or hp.Choice('embedding_dim', [8, 16], default=8)
+        hash_size = self._get_hash_size(hp)
+        embedding_dim = self._get_embedding_dim(hp)
+        num_buckets = self._get_num_buckets(hp, hash_size)
+        dimension_blocks = self._get_dimension_blocks(hash_size, embedding_dim, num_buckets)
+        log_embedding_bytes(self.name, *self._get_tables(hash_size, embedding_dim, num_buckets, dimension_blocks))
+        if self.fused:
+            # The fields of mixed-dimension embeddings are looked up separately, beside the table of the others.
+            fused_ids = [col_id for col_id in range(self.num_of_fields) if dimension_blocks[col_id] is None]
+            if len(fused_ids) == self.num_of_fields:
+                return self._build_fused_table([hash_size[col_id] for col_id in fused_ids], embedding_dim,
+                                               [num_buckets[col_id] for col_id in fused_ids],
+                                               input_node[0][:, :self.num_of_fields])
+            mixed_ids = [col_id for col_id in range(self.num_of_fields) if dimension_blocks[col_id] is not None]
+            output_node = tf.stack(
+                [
+                    self._build_field_table(hash_size[col_id], embedding_dim, num_buckets[col_id],
+                                            dimension_blocks[col_id], input_node[0][:, col_id])
+                    for col_id in mixed_ids
+                ],
+                axis=1
+            )
+            if fused_ids:
+                fused_node = self._build_fused_table([hash_size[col_id] for col_id in fused_ids], embedding_dim,
+                                                     [num_buckets[col_id] for col_id in fused_ids],
+                                                     tf.gather(input_node[0], fused_ids, axis=1))
+                output_node = tf.concat([fused_node, output_node], axis=1)
+            # Restore the order of the fields.
+            return tf.gather(output_node, np.argsort(fused_ids + mixed_ids), axis=1)
         output_node = tf.stack(
             [
-                tf.keras.layers.Embedding(hash_size[col_id], embedding_dim)(input_node[0][:, col_id])
+                self._build_field_table(hash_size[col_id], embedding_dim, num_buckets[col_id],
+                                        dimension_blocks[col_id], input_node[0][:, col_id])
                 for col_id in range(self.num_of_fields)
             ],
             axis=1
@@ -141,6 +428,10 @@ class SparseFeatureMapper(Block):
 class DenseFeatureMapper(Block):
     """ This module maps the numerical data of dense feature columns into embeddings.
 
+    # Note
+        The embedding of each column is its own trainable vector scaled by the value of the column, which is computed
+            for all the columns at once by a single broadcasted multiplication.
+
     # Arguments
         num_of_fields (int): The number of dense feature columns.
         embedding_dim (int): The dimension of the embeddings.
@@ -195,12 +486,6 @@ class DenseFeatureMapper(Block):
         """
         input_node = inputs
         embedding_dim = self.embedding_dim or hp.Choice('embedding_dim', [8, 16], default=8)
-        output_node = tf.stack(
-            [
-                tf.tensordot(input_node[0][:, col_id], tf.keras.layers.Embedding(1, embedding_dim)(0), axes=0)
-                for col_id in range(self.num_of_fields)
-            ],
-            axis=1
-        )
+        output_node = FieldEmbedding(self.num_of_fields, embedding_dim)(input_node[0][:, :self.num_of_fields])
         return output_node
 
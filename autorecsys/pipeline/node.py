@@ -26,7 +26,7 @@ class Input(base.Node):
         if isinstance(x, tf.data.Dataset):
             return x
         if isinstance(x, np.ndarray):
-            x = x.astype(np.float32)
+            x = x.astype(self.dtype or np.float32, copy=False)
             return tf.data.Dataset.from_tensor_slices(x)
 
     def _record_dataset_shape(self, dataset):
@@ -58,17 +58,28 @@ class StructuredDataInput(Input):
             If None, it will be inferred from the data. A column will be judged as
             categorical if the number of different values is less than 5% of the
             number of instances.
+        sample_size: Int. The number of randomly sampled rows to infer the column
+            types from. Defaults to None, which uses all rows.
+        typed: Boolean. Whether to convert the data to a dict of per-column tensors
+            of their own data types, e.g., float64 for numerical columns, instead of
+            converting all columns to strings. The blocks still receive a single
+            float32 tensor of the stacked columns, so the string columns must hold
+            numbers, e.g., encoded categorical indices, or a ValueError is raised.
+            Defaults to False.
     """
 
-    def __init__(self, column_names=None, column_types=None, **kwargs):
+    def __init__(self, column_names=None, column_types=None, sample_size=None, typed=False, **kwargs):
         super().__init__(**kwargs)
         self.column_names = column_names
         self.column_types = column_types
+        self.sample_size = sample_size
+        self.typed = typed
         # Variables for inferring column types.
         self.count_nan = None
         self.count_numerical = None
         self.count_categorical = None
         self.count_unique_numerical = []
+        self.count_unique_nan = None
         self.num_col = None
 
     def get_state(self):
@@ -76,10 +87,13 @@ class StructuredDataInput(Input):
         state.update({
             'column_names': self.column_names,
             'column_types': self.column_types,
+            'sample_size': self.sample_size,
+            'typed': self.typed,
             'count_nan': self.count_nan,
             'count_numerical': self.count_numerical,
             'count_categorical': self.count_categorical,
             'count_unique_numerical': self.count_unique_numerical,
+            'count_unique_nan': self.count_unique_nan,
             'num_col': self.num_col
         })
         return state
@@ -88,11 +102,14 @@ class StructuredDataInput(Input):
         super().set_state(state)
         self.column_names = state['column_names']
         self.column_types = state['column_types']
+        self.sample_size = state.get('sample_size')
+        self.typed = state.get('typed', False)
         self.count_nan = state['count_nan']
         self.count_numerical = state['count_numerical']
         self.count_categorical = state['count_categorical']
         self.count_unique_numerical = state['count_unique_numerical']
         self.num_col = state['num_col']
+        self.count_unique_nan = state.get('count_unique_nan', np.zeros(self.num_col or 0))
 
     def _check(self, x):
         if not isinstance(x, (pd.DataFrame, np.ndarray)):
@@ -125,54 +142,124 @@ class StructuredDataInput(Input):
                                  expect=x.shape[1],
                                  actual=len(self.column_names)))
 
+    def build(self):
+        if not self.typed:
+            return super().build()
+        return {name: tf.keras.Input(shape=shape, dtype=self.dtype[name]) for name, shape in self.shape.items()}
+
+    def build_block_input(self, inputs):
+        """Stack the per-column Keras Inputs in the column order into a float32 tensor in typed mode."""
+        if not self.typed:
+            return super().build_block_input(inputs)
+        columns = []
+        for name in map(str, self.column_names):
+            column = inputs[name]
+            if column.dtype == tf.string:
+                column = tf.strings.to_number(column, out_type=tf.float32)
+            columns.append(tf.cast(column, tf.float32))
+        return tf.stack(columns, axis=1)
+
+    def _record_dataset_shape(self, dataset):
+        super()._record_dataset_shape(dataset)
+        if self.typed:
+            self.dtype = {name: spec.dtype.name for name, spec in dataset.element_spec.items()}
+
     def _convert_to_dataset(self, x):
+        self.update(x)
+        self.infer_column_types()
+        if self.typed:
+            return tf.data.Dataset.from_tensor_slices(self._to_column_dict(x))
         if isinstance(x, pd.DataFrame):
             # Convert x, y, validation_data to tf.Dataset.
             x = tf.data.Dataset.from_tensor_slices(
                 x.values.astype(np.unicode))
         if isinstance(x, np.ndarray):
             x = tf.data.Dataset.from_tensor_slices(x.astype(np.unicode))
-        dataset = super()._convert_to_dataset(x)
-        for x in dataset:
-            self.update(x)
-        self.infer_column_types()
-        return dataset
+        return super()._convert_to_dataset(x)
+
+    def _to_column_dict(self, x):
+        """Convert the data to a dict which maps the string column names to arrays."""
+        if not isinstance(x, pd.DataFrame):
+            x = pd.DataFrame(x, columns=self.column_names, copy=False)
+        columns = {}
+        for i, (name, column) in enumerate(zip(self.column_names, x.columns)):
+            column = x[column]
+            if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+                # Keep the native data type. A column of a frame with several columns is strided,
+                # so TensorFlow copies it once, but no string is formatted or parsed.
+                columns[str(name)] = column.to_numpy()
+            elif self.count_categorical[i] > 0:
+                # The blocks parse the string columns as numbers in typed mode.
+                raise ValueError('Column {name} has non-numerical values, which cannot be converted in typed mode. '
+                                 'Encode them as indices first or set typed to False.'.format(name=name))
+            else:
+                # Python strings are encoded once by TensorFlow, without padding to the longest string.
+                columns[str(name)] = column.astype(str).to_numpy(dtype=object)
+        return columns
 
     def update(self, x):
-        # Calculate the statistics.
-        x = nest.flatten(x)[0].numpy()
+        """Calculate the statistics of the columns from a batch of rows.
+        # Arguments
+            x: pandas.DataFrame or numpy.ndarray. The rows of the data. If sample_size
+                is set, only sample_size randomly sampled rows are counted.
+        """
+        if not isinstance(x, pd.DataFrame):
+            x = pd.DataFrame(x)
+        if self.sample_size is not None and len(x) > self.sample_size:
+            rows = np.random.RandomState(0).choice(len(x), self.sample_size, replace=False)
+            x = x.iloc[np.sort(rows)]
         if self.num_col is None:
-            self.num_col = len(x)
+            self.num_col = x.shape[1]
             self.count_nan = np.zeros(self.num_col)
             self.count_numerical = np.zeros(self.num_col)
             self.count_categorical = np.zeros(self.num_col)
-            for i in range(len(x)):
+            self.count_unique_nan = np.zeros(self.num_col)
+            for i in range(self.num_col):
                 self.count_unique_numerical.append({})
         for i in range(self.num_col):
-            x[i] = x[i].decode('utf-8')
-            if x[i] == 'nan':
-                self.count_nan[i] += 1
-            elif x[i] == 'True':
-                self.count_categorical[i] += 1
-            elif x[i] == 'False':
-                self.count_categorical[i] += 1
-            else:
-                try:
-                    tmp_num = float(x[i])
-                    self.count_numerical[i] += 1
-                    if tmp_num not in self.count_unique_numerical[i]:
-                        self.count_unique_numerical[i][tmp_num] = 1
-                    else:
-                        self.count_unique_numerical[i][tmp_num] += 1
-                except ValueError:
-                    self.count_categorical[i] += 1
+            self._update_column(i, x.iloc[:, i])
+
+    def _update_column(self, i, column):
+        """Calculate the statistics of one column as if each value were converted to a string and parsed."""
+        if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+            numbers = column.to_numpy(dtype=np.float64)
+            is_nan = np.isnan(numbers)
+            self.count_nan[i] += np.count_nonzero(is_nan)
+            self.count_numerical[i] += np.count_nonzero(~is_nan)
+            numbers, counts = np.unique(numbers[~is_nan], return_counts=True)
+        else:
+            # Parse each distinct string once instead of every value.
+            codes, strings = pd.factorize(column.to_numpy().astype(np.unicode))
+            counts = np.bincount(codes, minlength=len(strings))
+            numbers = np.full(len(strings), np.nan)
+            is_numerical = np.zeros(len(strings), dtype=bool)
+            for j, string in enumerate(strings):
+                if string == 'nan':
+                    self.count_nan[i] += counts[j]
+                elif string in ('True', 'False'):
+                    self.count_categorical[i] += counts[j]
+                else:
+                    try:
+                        numbers[j] = float(string)
+                        is_numerical[j] = True
+                        self.count_numerical[i] += counts[j]
+                    except ValueError:
+                        self.count_categorical[i] += counts[j]
+            numbers, counts = numbers[is_numerical], counts[is_numerical]
+        # Every parsed NaN, e.g., of 'NaN', counts as a distinct value, since float('NaN') != float('NaN').
+        is_nan = np.isnan(numbers)
+        self.count_unique_nan[i] += counts[is_nan].sum()
+        unique_numerical = self.count_unique_numerical[i]
+        for number, count in zip(numbers[~is_nan].tolist(), counts[~is_nan].tolist()):
+            unique_numerical[number] = unique_numerical.get(number, 0) + count
 
     def infer_column_types(self):
         column_types = {}
         for i in range(self.num_col):
             if self.count_categorical[i] > 0:
                 column_types[self.column_names[i]] = 'categorical'
-            elif len(self.count_unique_numerical[i])/self.count_numerical[i] < 0.05:
+            elif (len(self.count_unique_numerical[i]) +
+                  self.count_unique_nan[i]) / self.count_numerical[i] < 0.05:
                 column_types[self.column_names[i]] = 'categorical'
             else:
                 column_types[self.column_names[i]] = 'numerical'
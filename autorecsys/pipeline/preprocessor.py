@@ -1,10 +1,507 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from pandas.api.types import union_categoricals
 from sklearn.model_selection import train_test_split
+from tensorflow.python.util import nest
+from autorecsys.pipeline import base
+from autorecsys.utils.sketch import CountMinSketch
+import tensorflow as tf
 import pandas as pd
 import numpy as np
+import collections
+import glob
+import hashlib
+import io
+import json
 import math
+import os
+import shutil
+
+
+def factorize_categories(values):
+    """ Factorize the categories of one column and count their occurrences.
+
+    # Arguments
+        values (Series): The categorical data of one column.
+
+    # Returns
+        2-tuple of ndarray codes which index the categories of each row, and Series of category counts in the order
+            the categories first appear.
+    """
+    codes, uniques = pd.factorize(values)
+    if isinstance(uniques, pd.CategoricalIndex):
+        uniques = pd.Index(np.asarray(uniques))  # index the categories themselves rather than categorical data
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    return codes, pd.Series(counts, index=uniques)
+
+
+def count_categories(data_df, columns):
+    """ Count the categorical occurrences in each column.
+
+    # Arguments
+        data_df (DataFrame): The input data.
+        columns (list): String names associated with the columns containing categorical data.
+
+    # Returns
+        Dictionary which maps column names to Series of category counts in the order the categories first appear.
+    """
+    return {col: factorize_categories(data_df[col])[1] for col in columns}
+
+
+def index_categories(counts, categorical_filter):
+    """ Reindex the categories of one column by descending counts.
+
+    # Note
+        Categories which occur no more than categorical_filter times are grouped in one category with the last index.
+
+    # Arguments
+        counts (Series): Category counts in the order the categories first appear.
+        categorical_filter (int): Filter used to group infrequent categories as the same category.
+
+    # Returns
+        2-tuple of ndarray indices aligned with the input counts, and Series which maps categories to indices in
+            descending order of counts.
+    """
+    # Sort the same way as Series.value_counts() so that indices of equally frequent categories are unchanged.
+    order = pd.Series(counts.values).sort_values(ascending=False).index.values
+    frequent = counts.values[order] > categorical_filter
+    num_frequent = np.count_nonzero(frequent)
+    dtype = compact_int_dtype(num_frequent)
+    sorted_indices = np.where(frequent, np.cumsum(frequent) - 1, num_frequent).astype(dtype)
+    indices = np.empty(len(order), dtype=dtype)
+    indices[order] = sorted_indices
+    return indices, pd.Series(sorted_indices, index=counts.index[order])
+
+
+def fill_missing(data_df, filler):
+    """ Fill missing data in place, including categorical data whose categories do not contain the filler.
+
+    # Arguments
+        data_df (DataFrame): The input data.
+        filler (float): Filler value used to fill missing data.
+    """
+    for col in data_df.columns:
+        values = data_df[col]
+        if isinstance(values.dtype, pd.CategoricalDtype) and filler not in values.cat.categories and values.hasnans:
+            data_df[col] = values.cat.add_categories([filler])
+    data_df.fillna(filler, inplace=True)
+
+
+def compact_int_dtype(max_value):
+    """ Get the smallest signed integer type which holds the maximum value.
+
+    # Arguments
+        max_value (int): The maximum value.
+
+    # Returns
+        NumPy integer type.
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def merge_category_counts(total_counts, counts):
+    """ Merge the categorical occurrences counted on consecutive parts of a dataset.
+
+    # Note
+        Categories keep the order in which they first appear, so merging the counts of all parts in order gives the
+            same counts as counting the whole dataset at once.
+
+    # Arguments
+        total_counts (dict): Map column names to Series of category counts of the preceding parts, or None.
+        counts (dict): Map column names to Series of category counts of the next part.
+
+    # Returns
+        Dictionary which maps column names to Series of merged category counts.
+    """
+    if total_counts is None:
+        return counts
+    return {col: pd.concat([total_counts[col], counts[col]]).groupby(level=0, sort=False).sum()
+            for col in total_counts}
+
+
+def split_rows(num_rows, test_percentage, validate_percentage, offset=0):
+    """ Assign rows to the training, validation, and test sets by a deterministic hash of their row numbers.
+
+    # Note
+        A row is always assigned to the same set no matter how the dataset is loaded, e.g., in chunks or in shards, as
+            long as it keeps its row number. The sizes of the sets follow the percentages approximately.
+
+    # Arguments
+        num_rows (int): The number of rows.
+        test_percentage (float): Percentage of all rows for the test set.
+        validate_percentage (float): Percentage of all rows for the validation set.
+        offset (int): Row number of the first row.
+
+    # Returns
+        3-tuple of ndarray ascending row positions of the training, validation, and test sets.
+    """
+    # Hashing scatters consecutive row numbers uniformly over [0, 1).
+    uniform = pd.util.hash_array(np.arange(offset, offset + num_rows, dtype=np.int64)) / 2.0 ** 64
+    test = uniform < test_percentage
+    validate = ~test & (uniform < test_percentage + validate_percentage)
+    return np.flatnonzero(~test & ~validate), np.flatnonzero(validate), np.flatnonzero(test)
+
+
+def split_rows_by_time(times, test_percentage, validate_percentage):
+    """ Assign rows to the training, validation, and test sets in time order.
+
+    # Note
+        The latest rows are assigned to the test set and the rows before them to the validation set, so that models
+            are validated and tested on data newer than the training data. Rows with the same timestamp are always
+            assigned to the same set, so the sizes of the sets follow the percentages approximately.
+
+    # Arguments
+        times (ndarray): Timestamps of the rows, which may be of any ordered data type, e.g., the hour column of Avazu.
+        test_percentage (float): Percentage of all rows for the test set.
+        validate_percentage (float): Percentage of all rows for the validation set.
+
+    # Returns
+        3-tuple of ndarray ascending row positions of the training, validation, and test sets.
+    """
+    times = np.asarray(times)
+    sorted_times = np.sort(times)
+    num_test = int(math.ceil(test_percentage * len(times)))
+    num_validate = int(math.ceil(validate_percentage * len(times)))
+
+    def latest_rows(num_rows):
+        # Mask of the rows at or after the earliest timestamp among the latest num_rows rows.
+        if not num_rows:
+            return np.zeros(len(times), dtype=bool)
+        return times >= sorted_times[len(times) - num_rows]
+
+    test = latest_rows(num_test)
+    validate = ~test & latest_rows(num_test + num_validate)
+    return np.flatnonzero(~test & ~validate), np.flatnonzero(validate), np.flatnonzero(test)
+
+
+def append_npy(path, array):
+    """ Append rows to an array saved in NumPy .npy format.
+
+    # Note
+        The rows are written at the end of the file and only the header is rewritten, so appending takes time
+            proportional to the appended rows. The header is padded to a multiple of 64 bytes, so it almost always
+            keeps its size when the number of rows grows; the file is rewritten as a whole otherwise.
+
+    # Arguments
+        path (str): Path to the .npy file of a one-dimensional array.
+        array (ndarray): Rows to append. The saved array is widened if its data type cannot hold them, e.g., when new
+            categories outgrow the smallest integer type.
+    """
+    with open(path, 'rb+') as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            read_header, write_header = np.lib.format.read_array_header_1_0, np.lib.format.write_array_header_1_0
+        else:
+            read_header, write_header = np.lib.format.read_array_header_2_0, np.lib.format.write_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        header_size = f.tell()
+        new_header = io.BytesIO(np.lib.format.magic(*version))
+        new_header.seek(0, os.SEEK_END)
+        write_header(new_header, {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': fortran_order,
+                                  'shape': (shape[0] + len(array),) + shape[1:]})
+        if new_header.tell() == header_size and np.promote_types(dtype, array.dtype) == dtype:
+            f.seek(0, os.SEEK_END)
+            f.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+            f.seek(0)
+            f.write(new_header.getvalue())
+            return
+    np.save(path, np.concatenate([np.load(path), array]), allow_pickle=False)
+
+
+def find_shard_offsets(csv_path, num_shards):
+    """ Split a CSV file into shards of about equal size at line boundaries.
+
+    # Arguments
+        csv_path (str): Path to the CSV dataset.
+        num_shards (int): The number of shards.
+
+    # Returns
+        List of integer byte offsets where the shards start, followed by the size of the file.
+    """
+    size = os.path.getsize(csv_path)
+    offsets = [0]
+    with open(csv_path, 'rb') as f:
+        for i in range(1, num_shards):
+            f.seek(max(size * i // num_shards, offsets[-1]))
+            f.readline()  # move to the start of the next line
+            offsets.append(min(f.tell(), size))
+    offsets.append(size)
+    return sorted(set(offsets))
+
+
+def read_csv_shard(csv_path, start, end, read_csv_kwargs, ignored_columns, filler, categorical_columns):
+    """ Parse one shard of a CSV file and count its categorical occurrences.
+
+    # Note
+        Categorical columns are returned as Pandas categorical data, which are much cheaper to send between processes
+            than columns of Python objects.
+
+    # Arguments
+        csv_path (str): Path to the CSV dataset.
+        start (int): Byte offset where the shard starts.
+        end (int): Byte offset where the shard ends.
+        read_csv_kwargs (dict): Keyword arguments of pd.read_csv().
+        ignored_columns (list): String names associated with the columns to ignore.
+        filler (float): Filler value used to fill missing data.
+        categorical_columns (list): String names associated with the columns containing categorical data.
+
+    # Returns
+        2-tuple of DataFrame shard, and dictionary which maps column names to Series of category counts in the order
+            the categories first appear.
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(start)
+        shard = f.read(end - start)
+    shard_df = pd.read_csv(io.BytesIO(shard), **read_csv_kwargs)
+    shard_df.drop(columns=ignored_columns, inplace=True)
+    fill_missing(shard_df, filler)
+    counts = {}
+    for col in categorical_columns:
+        codes, counts[col] = factorize_categories(shard_df[col])
+        shard_df[col] = pd.Categorical.from_codes(codes, categories=counts[col].index)
+    return shard_df, counts
+
+
+# Map file extensions to the columnar formats read by read_columnar().
+COLUMNAR_FORMATS = {
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+}
+
+
+def get_columnar_format(path):
+    """ Get the columnar format of a dataset file by its extension.
+
+    # Arguments
+        path (str): Path to the dataset file.
+
+    # Returns
+        String name of the format in COLUMNAR_FORMATS, or None if the file is not columnar, e.g., CSV.
+    """
+    return COLUMNAR_FORMATS.get(os.path.splitext(str(path))[1].lower())
+
+
+def read_columnar(path, columns, batch_size=None):
+    """ Read the selected columns of a Parquet or Arrow IPC file as Pandas DataFrame objects.
+
+    # Note
+        Only the selected columns are read. Parquet files are streamed row group by row group, and Arrow IPC files
+            are memory-mapped, so that at most batch_size rows are converted to DataFrame objects at a time.
+        Reading columnar data requires pyarrow, which is imported only when a columnar file is read.
+
+    # Arguments
+        path (str): Path to the Parquet or Arrow IPC file.
+        columns (list): String names associated with the columns to read. Columns which are not in the file are
+            ignored.
+        batch_size (int): Number of rows per DataFrame, or None to read all rows at once.
+
+    # Returns
+        Generator of DataFrame objects of consecutive rows, which contain the selected columns in file order.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Reading Parquet or Arrow IPC data requires pyarrow, e.g., pip install pyarrow.')
+
+    if get_columnar_format(path) == 'parquet':
+        parquet_file = pq.ParquetFile(path)
+        names = [name for name in parquet_file.schema_arrow.names if name in columns]
+        if batch_size is None:
+            yield parquet_file.read(columns=names).to_pandas()
+            return
+        for batch in parquet_file.iter_batches(batch_size=batch_size, columns=names):
+            yield batch.to_pandas()
+        return
+
+    with pa.memory_map(path) as source:
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+        table = table.select([name for name in table.column_names if name in columns])
+        if batch_size is None:
+            yield table.to_pandas()
+            return
+        for batch in table.to_batches(max_chunksize=batch_size):
+            yield batch.to_pandas()
+
+
+def format_categories(values):
+    """ Format categories as strings which do not depend on the data type they are parsed into.
+
+    # Note
+        Integral numbers are formatted as integers, so that a category which is parsed as 5 in a chunk or shard of a
+            dataset and as 5.0 in another, e.g., which has missing values, is formatted as '5' in both, like the
+            string '5'.
+
+    # Arguments
+        values (ndarray): The categories.
+
+    # Returns
+        ndarray of string objects.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'biu':
+        return values.astype(str).astype(object)
+    if values.dtype.kind == 'f':
+        formatted = values.astype(str).astype(object)
+        integral = np.isfinite(values) & (np.floor(values) == values) & (np.abs(values) < 2.0 ** 63)
+        formatted[integral] = values[integral].astype(np.int64).astype(str)
+        return formatted
+
+    def format_category(value):
+        if isinstance(value, (float, np.floating)) and value.is_integer() and abs(value) < 2.0 ** 63:
+            return str(int(value))
+        return str(value)
+
+    return np.array([format_category(value) for value in values], dtype=object)
+
+
+def hash_categories(values, hash_size):
+    """ Map the categories of one column to indices by feature hashing.
+
+    # Note
+        Categories are hashed as formatted by format_categories(), so the same category is mapped to the same index
+            no matter which data type it is parsed into, in all the chunks or shards of a dataset and in new data.
+            Each distinct category is hashed only once.
+
+    # Arguments
+        values (Series): The categorical data of one column.
+        hash_size (int): The number of hash buckets.
+
+    # Returns
+        ndarray integer indices in [0, hash_size) of the categories.
+    """
+    codes, uniques = pd.factorize(values)
+    hashes = pd.util.hash_array(format_categories(uniques), categorize=False) % hash_size
+    return hashes.astype(compact_int_dtype(hash_size - 1))[codes]
+
+
+def convert_netflix_block(block, movie, wf):
+    """ Convert a block of complete lines of a Netflix Prize data file into CSV format.
+
+    # Arguments
+        block (bytes): Lines of the data file, which are either "MovieID:" or "CustomerID,Rating,Date".
+        movie (bytes): The "MovieID," prefix of the lines before the first MovieID line in the block.
+        wf (file): Binary file object to write the "MovieID,CustomerID,Rating,Date" lines to.
+
+    # Returns
+        Bytes "MovieID," prefix of the lines after the block.
+    """
+    start = 0
+    while True:
+        end = block.find(b':\n', start)
+        if end < 0:
+            break
+        line_start = block.rfind(b'\n', start, end) + 1
+        ratings = block[start:line_start]
+        if ratings:
+            # Prefix all lines of the movie at once instead of writing them one by one.
+            wf.write(movie + ratings[:-1].replace(b'\n', b'\n' + movie) + b'\n')
+        movie = block[line_start:end] + b','
+        start = end + 2
+    ratings = block[start:]
+    if ratings:
+        wf.write(movie + ratings[:-1].replace(b'\n', b'\n' + movie) + b'\n')
+    return movie
+
+
+def convert_netflix_file(txt_path, csv_path, block_size=1 << 24):
+    """ Convert a Netflix Prize data file into CSV format block by block.
+
+    # Arguments
+        txt_path (str): Path to the data file, e.g., combined_data_1.txt.
+        csv_path (str): Path to save the CSV data.
+        block_size (int): Number of bytes to read at a time.
+    """
+    movie = None
+    rest = b''
+    with open(txt_path, 'rb') as rf, open(csv_path, 'wb') as wf:
+        for block in iter(lambda: rf.read(block_size), b''):
+            # Convert the complete lines and keep the incomplete last line for the next block.
+            block = rest + block
+            cut = block.rfind(b'\n') + 1
+            block, rest = block[:cut], block[cut:]
+            movie = convert_netflix_block(block, movie, wf)
+        if rest:
+            convert_netflix_block(rest + b'\n', movie, wf)
+
+
+def scale_by_log(values):
+    """ Scale numerical data by log transformation, i.e., log(x)^2 if x > 2 else x.
+
+    # Arguments
+        values (ndarray): The numerical data of one column.
+
+    # Returns
+        ndarray transformed numerical data.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    # The log of values not greater than 2 is discarded, so do not warn about it.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(values > 2, np.square(np.log(values)), values)
+
+
+def scale_by_log1p(values):
+    """ Scale numerical data by log1p transformation, i.e., log(1 + x) for non-negative x.
+
+    # Arguments
+        values (ndarray): The numerical data of one column.
+
+    # Returns
+        ndarray transformed numerical data.
+    """
+    return np.log1p(np.maximum(np.asarray(values, dtype=np.float64), 0.0))
+
+
+def clip_by_quantile(values, lower=0.001, upper=0.999):
+    """ Clip numerical data to the range between the lower and upper quantiles.
+
+    # Arguments
+        values (ndarray): The numerical data of one column.
+        lower (float): Quantile of the lower bound.
+        upper (float): Quantile of the upper bound.
+
+    # Returns
+        ndarray transformed numerical data.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    low, high = np.nanquantile(values, [lower, upper])
+    return np.clip(values, low, high)
+
+
+def bin_by_quantile(values, num_bins=10):
+    """ Discretize numerical data into bins of equal frequency.
+
+    # Arguments
+        values (ndarray): The numerical data of one column.
+        num_bins (int): The number of bins.
+
+    # Returns
+        ndarray bin indices of the numerical data.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    edges = np.unique(np.nanquantile(values, np.linspace(0, 1, num_bins + 1)[1:-1]))
+    return np.searchsorted(edges, values, side='right').astype(np.float64)
+
+
+# Map names of the supported numerical transformation methods to vectorized functions of one column.
+NUMERICAL_TRANSFORMS = {
+    'log': scale_by_log,
+    'log1p': scale_by_log1p,
+    'clip': clip_by_quantile,
+    'quantile': bin_by_quantile,
+}
 
 
 class BasePreprocessor(metaclass=ABCMeta):
@@ -12,7 +509,8 @@ class BasePreprocessor(metaclass=ABCMeta):
 
     # Arguments
         non_csv_path (str): Path to convert the dataset into CSV format.
-        csv_path (str): Path to save and load the CSV dataset.
+        csv_path (str): Path to save and load the CSV dataset, or to load a Parquet or Arrow IPC dataset by the file
+            extension.
         header (int): Row number to use as column names.
         columns (list): String names associated with the columns of the dataset.
         delimiter (str): Separator used to parse lines.
@@ -25,16 +523,33 @@ class BasePreprocessor(metaclass=ABCMeta):
         categorical_columns (list): String names associated with the columns containing categorical data.
         categorical_filter (int): Filter used to group infrequent categories in one column as the same category.
         fit_dictionary_path (str): Path to the fit dictionary for categorical data.
-        transform_path (str): Path to the transformed dataset.
+        transform_path (str): Path to the directory which caches the transformed dataset, or None to disable caching.
         test_percentage (float): Percentage for the test set.
         validate_percentage (float): Percentage for the validation set.
-        train_path (str): Path to the training set.
-        validate_path (str): Path to the validation set.
-        test_path (str): Path to the test set.
+        train_path (str): Path to the directory which caches the training set. Defaults to transform_path/train.
+        validate_path (str): Path to the directory which caches the validation set. Defaults to
+            transform_path/validate.
+        test_path (str): Path to the directory which caches the test set. Defaults to transform_path/test.
+        chunk_size (int): Number of rows per chunk to stream the dataset out-of-core, or None to load it at once.
+        numerical_transform (str or callable): Name of the transformation method in NUMERICAL_TRANSFORMS, or a function
+            which transforms the numerical data of one column.
+        compact_dtype (bool): Whether to encode categorical data as the smallest integer type and numerical data as
+            float32, instead of float64.
+        num_workers (int): Number of processes to parse shards of the dataset in parallel, or None to parse it in one
+            process.
+        hash_buckets (int or list): Number of hash buckets to encode all or each categorical column by feature hashing
+            instead of the fit dictionary, or None to build the fit dictionary.
+        sketch_error (float): Maximum overestimation of categorical counts relative to the number of rows, to filter
+            categories approximately in bounded memory with a Count-Min Sketch, or None to count categories exactly.
+        time_column (str): String name associated with the column of timestamps to split the dataset in time order, or
+            None to split it by a hash of row numbers.
+        dtype_sample_size (int): Number of rows sampled to infer compact data types of columns missing from dtype_dict,
+            or None to let Pandas infer them from the whole dataset.
 
     # Attributes
         non_csv_path (str): Path to convert the dataset into CSV format.
-        csv_path (str): Path to save and load the CSV dataset.
+        csv_path (str): Path to save and load the CSV dataset, or to load a Parquet or Arrow IPC dataset by the file
+            extension.
         header (int): Row number to use as column names.
         columns (list): String names associated with the columns of the dataset.
         delimiter (str): Separator used to parse lines.
@@ -47,14 +562,39 @@ class BasePreprocessor(metaclass=ABCMeta):
         numerical_columns (list): String names associated with the columns containing numerical data.
         categorical_columns (list): String names associated with the columns containing categorical data.
         categorical_filter (int): Filter used to group infrequent categories in one column as the same category.
-        fit_dict (dict): Map string categorical column names to dictionary which maps categories to indices.
+        category_counts (dict): Map string categorical column names to Series which count categories in the order
+            they first appear.
+        category_sketches (dict): Map string categorical column names to CountMinSketch objects which count categories
+            approximately if sketch_error is set.
+        fit_dict (dict): Map string categorical column names to Series which maps categories to indices.
+        unseen_indices (dict): Map string categorical column names to the indices of categories which are not in the
+            fit dictionary.
         fit_dictionary_path (str): Path to the fit dictionary for categorical data.
-        transform_path (str): Path to the transformed dataset.
+        transform_path (str): Path to the directory which caches the transformed dataset, or None to disable caching.
         test_percentage (float): Percentage for the test set.
         validate_percentage (float): Percentage for the validation set.
-        train_path (str): Path to the training set.
-        validate_path (str): Path to the validation set.
-        test_path (str): Path to the test set.
+        train_path (str): Path to the directory which caches the training set. Defaults to transform_path/train.
+        validate_path (str): Path to the directory which caches the validation set. Defaults to
+            transform_path/validate.
+        test_path (str): Path to the directory which caches the test set. Defaults to transform_path/test.
+        chunk_size (int): Number of rows per chunk to stream the dataset out-of-core, or None to load it at once.
+        numerical_transform (str or callable): Name of the transformation method in NUMERICAL_TRANSFORMS, or a function
+            which transforms the numerical data of one column.
+        compact_dtype (bool): Whether to encode categorical data as the smallest integer type and numerical data as
+            float32, instead of float64.
+        num_workers (int): Number of processes to parse shards of the dataset in parallel, or None to parse it in one
+            process.
+        hash_buckets (int or list): Number of hash buckets to encode all or each categorical column by feature hashing
+            instead of the fit dictionary, or None to build the fit dictionary.
+        sketch_error (float): Maximum overestimation of categorical counts relative to the number of rows, to filter
+            categories approximately in bounded memory with a Count-Min Sketch, or None to count categories exactly.
+        time_column (str): String name associated with the column of timestamps to split the dataset in time order, or
+            None to split it by a hash of row numbers.
+        time_values (ndarray): Timestamps of the rows of data_df before transformation if time_column is categorical.
+        dtype_sample_size (int): Number of rows sampled to infer compact data types of columns missing from dtype_dict,
+            or None to let Pandas infer them from the whole dataset.
+        inferred_dtype_dict (dict): Map string column names to column data type, including the data types inferred
+            from a sample of the dataset if dtype_sample_size is set.
     """
 
     @abstractmethod
@@ -77,7 +617,15 @@ class BasePreprocessor(metaclass=ABCMeta):
                  validate_percentage=None,
                  train_path=None,
                  validate_path=None,
-                 test_path=None):
+                 test_path=None,
+                 chunk_size=None,
+                 numerical_transform='log',
+                 compact_dtype=False,
+                 num_workers=None,
+                 hash_buckets=None,
+                 sketch_error=None,
+                 time_column=None,
+                 dtype_sample_size=None):
 
         super().__init__()
         # Dataset load attributes.
@@ -88,7 +636,11 @@ class BasePreprocessor(metaclass=ABCMeta):
         self.delimiter = delimiter
         self.filler = filler
         self.dtype_dict = dtype_dict
+        self.dtype_sample_size = dtype_sample_size
+        self.inferred_dtype_dict = None
         self.ignored_columns = ignored_columns
+        self.chunk_size = chunk_size
+        self.num_workers = num_workers
         self.data_df = None
 
         # Dataset access attributes.
@@ -98,8 +650,15 @@ class BasePreprocessor(metaclass=ABCMeta):
 
         # Dataset transformation attributes.
         self.categorical_filter = categorical_filter
+        self.sketch_error = sketch_error
+        self.numerical_transform = numerical_transform
+        self.compact_dtype = compact_dtype
+        self.category_counts = None
+        self.category_sketches = None
         self.fit_dict = None
+        self.unseen_indices = None
         self.fit_dictionary_path = fit_dictionary_path
+        self.hash_buckets = hash_buckets
         self.transform_path = transform_path
 
         # Dataset split attributes.
@@ -108,6 +667,8 @@ class BasePreprocessor(metaclass=ABCMeta):
         self.train_path = train_path
         self.validate_path = validate_path
         self.test_path = test_path
+        self.time_column = time_column
+        self.time_values = None
 
     def format_dataset(self):
         """ (Optional) Convert dataset into CSV format.
@@ -119,57 +680,497 @@ class BasePreprocessor(metaclass=ABCMeta):
 
     def load_dataset(self):  # pragma: no cover
         """ Load CSV data as a Pandas DataFrame object.
+
+        # Note
+            If chunk_size is set, the dataset is streamed chunk by chunk and only the categorical counts are kept in
+                memory. No DataFrame object of the whole dataset is built; see split_chunks().
+            If the fit dictionary is saved at fit_dictionary_path or hash_buckets is set, the chunks are not streamed
+                to count categories.
+            If num_workers is set, the dataset is otherwise parsed in shards on a pool of processes and the categories
+                are counted per shard. See load_dataset_parallel().
+            If csv_path is a Parquet or Arrow IPC file by its extension, only the relevant columns are read by
+                iter_columnar(), in row groups if chunk_size is set. See COLUMNAR_FORMATS.
+        """
+        if self.chunk_size:
+            self.data_df = None
+            self.category_counts = None
+            if self.has_fit_dict_file() or self.hash_buckets is not None:
+                return  # categories are not counted when the saved fit dictionary is reused or features are hashed
+            if self.sketch_error is not None:
+                self.category_counts = self.count_frequent_categories(self.iter_dataset())
+                return
+            for chunk_df in self.iter_dataset():
+                self.category_counts = merge_category_counts(
+                    self.category_counts, count_categories(chunk_df, self.categorical_columns))
+            return
+
+        if self.num_workers is not None and self.num_workers > 1 and get_columnar_format(self.csv_path) is None:
+            self.load_dataset_parallel()
+            return
+
+        self.data_df = self.read_dataset()
+        self.category_counts = None
+
+    def infer_dtype_dict(self):
+        """ Infer compact data types of the columns missing from dtype_dict from the first rows of the CSV dataset.
+
+        # Note
+            Categorical columns which are parsed as strings in the sample, e.g., the hashed categories of Criteo and
+                Avazu, are read as Pandas categorical data, which store each distinct category once and integer codes
+                per row, instead of one Python string object per row. Numerical columns are read as float32 if
+                compact_dtype is set. Other columns are left for Pandas to infer from the whole dataset, so that a
+                column which is numeric in the sample but not in the rest of the dataset is still parsed correctly.
+
+        # Returns
+            Dictionary which maps column names to column data type, including the entries of dtype_dict.
+        """
+        sample_df = pd.read_csv(self.csv_path, sep=self.delimiter, header=self.header, names=self.columns,
+                                dtype=self.dtype_dict, nrows=self.dtype_sample_size)
+        dtype_dict = dict(self.dtype_dict or {})
+        for col in self.categorical_columns:
+            if col not in dtype_dict and col in sample_df.columns and sample_df[col].dtype == object:
+                dtype_dict[col] = 'category'
+        if self.compact_dtype:
+            for col in self.numerical_columns:
+                dtype_dict.setdefault(col, np.float32)
+        return dtype_dict
+
+    def get_dtype_dict(self):
+        """ Get the data types to parse the columns of the CSV dataset.
+
+        # Returns
+            Dictionary which maps column names to column data type, which is inferred by infer_dtype_dict() once if
+                dtype_sample_size is set, or dtype_dict otherwise.
+        """
+        if self.dtype_sample_size is None:
+            return self.dtype_dict
+        if self.inferred_dtype_dict is None:
+            self.inferred_dtype_dict = self.infer_dtype_dict()
+        return self.inferred_dtype_dict
+
+    def read_dataset(self, csv_path=None):
+        """ Read CSV data, or Parquet or Arrow IPC data by the file extension, at once as a Pandas DataFrame object.
+
+        # Arguments
+            csv_path (str): Path to the data, which is in the same format as the dataset. Defaults to csv_path.
+
+        # Returns
+            DataFrame data which contains only relevant columns.
         """
-        self.data_df = pd.read_csv(self.csv_path, sep=self.delimiter, header=self.header, names=self.columns, dtype=self.dtype_dict)
-        self.data_df.drop(columns=self.ignored_columns, inplace=True)
-        self.data_df.fillna(self.filler, inplace=True)
+        if get_columnar_format(csv_path or self.csv_path) is not None:
+            return next(self.iter_columnar(csv_path or self.csv_path))
+        data_df = pd.read_csv(csv_path or self.csv_path, sep=self.delimiter, header=self.header, names=self.columns,
+                              dtype=self.get_dtype_dict())
+        data_df.drop(columns=self.ignored_columns, inplace=True)
+        fill_missing(data_df, self.filler)
+        return data_df
+
+    def load_dataset_parallel(self):
+        """ Load CSV data as a Pandas DataFrame object by parsing shards of the dataset in parallel.
+
+        # Note
+            The dataset is split at line boundaries into num_workers shards, which are parsed and counted on a pool of
+                processes. The shards and their categorical counts are merged in file order, so the result does not
+                depend on the number of workers, and the categorical data are transformed the same way as in
+                load_dataset() without num_workers.
+            A categorical column may be parsed into different data types in different shards, e.g., integers in a
+                shard and floats in another which has missing values. The shards are then parsed again with the data
+                type which Pandas infers from the whole column, i.e., the common numerical type, or strings if any
+                shard has strings, so that each category has one value in all the shards.
+        """
+        names = self.columns
+        header = self.header
+        if header is not None and names is None:
+            names = list(pd.read_csv(self.csv_path, sep=self.delimiter, header=header, nrows=0).columns)
+        counted_columns = self.categorical_columns if self.hash_buckets is None else []
+        offsets = find_shard_offsets(self.csv_path, self.num_workers)
+        with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+
+            def submit(i, dtype):
+                # Only the first shard contains the header.
+                read_csv_kwargs = dict(sep=self.delimiter, header=header if i == 0 else None, names=names, dtype=dtype)
+                return executor.submit(read_csv_shard, self.csv_path, offsets[i], offsets[i + 1], read_csv_kwargs,
+                                       self.ignored_columns, self.filler, counted_columns)
+
+            futures = [submit(i, self.get_dtype_dict()) for i in range(len(offsets) - 1)]
+            shards = [future.result() for future in futures]
+
+            common_dtypes = {}
+            for col in counted_columns:
+                dtypes = [shard_df[col].cat.categories.dtype for shard_df, _ in shards]
+                if len(set(dtypes)) > 1:
+                    common_dtypes[col] = np.result_type(*dtypes)
+            if common_dtypes:
+                dtype = dict(self.get_dtype_dict() or {})
+                dtype.update({col: str if common_dtype == object else common_dtype
+                              for col, common_dtype in common_dtypes.items()})
+                futures = {i: submit(i, dtype) for i, (shard_df, _) in enumerate(shards)
+                           if any(shard_df[col].cat.categories.dtype != common_dtypes[col] for col in common_dtypes)}
+                for i, future in futures.items():
+                    shards[i] = future.result()
+
+        # Concatenating categorical data with different categories would convert them back to Python objects.
+        columns = shards[0][0].columns
+        self.data_df = pd.concat([shard_df.drop(columns=counted_columns) for shard_df, _ in shards],
+                                 ignore_index=True)
+        for col in counted_columns:
+            self.data_df[col] = union_categoricals([shard_df[col] for shard_df, _ in shards])
+        self.data_df = self.data_df[columns]
+        self.category_counts = None
+        for _, counts in shards:
+            if counts:
+                self.category_counts = merge_category_counts(self.category_counts, counts)
+
+    def iter_dataset(self):
+        """ Iterate over the CSV data in chunks of Pandas DataFrame objects.
+
+        # Returns
+            Generator of DataFrame chunks of at most chunk_size rows, which contain only relevant columns.
+        """
+        if get_columnar_format(self.csv_path) is not None:
+            yield from self.iter_columnar(self.csv_path, self.chunk_size)
+            return
+        reader = pd.read_csv(self.csv_path, sep=self.delimiter, header=self.header, names=self.columns,
+                             dtype=self.get_dtype_dict(), chunksize=self.chunk_size)
+        for chunk_df in reader:
+            chunk_df.drop(columns=self.ignored_columns, inplace=True)
+            fill_missing(chunk_df, self.filler)
+            yield chunk_df
+
+    def get_relevant_columns(self):
+        """ Get the columns which are needed to preprocess the dataset.
+
+        # Returns
+            List of the target column, numerical columns, categorical columns, and time column without duplicates.
+        """
+        columns = [self.target_column] + list(self.numerical_columns) + list(self.categorical_columns)
+        if self.time_column is not None:
+            columns.append(self.time_column)
+        return list(dict.fromkeys(columns))
+
+    def iter_columnar(self, path, batch_size=None):
+        """ Iterate over Parquet or Arrow IPC data in batches of Pandas DataFrame objects.
+
+        # Note
+            Only the columns returned by get_relevant_columns() are read, instead of parsing all columns and dropping
+                ignored_columns. Columns are matched by their string names, e.g., the column named '14' of a file is
+                read as column 14 of the Criteo dataset. See read_columnar().
+
+        # Arguments
+            path (str): Path to the Parquet or Arrow IPC file.
+            batch_size (int): Number of rows per batch, or None to read all rows at once.
+
+        # Returns
+            Generator of DataFrame batches of at most batch_size rows, which contain only relevant columns.
+        """
+        names = {str(col): col for col in self.get_relevant_columns()}
+        for data_df in read_columnar(path, list(names), batch_size):
+            data_df.columns = [names[name] for name in data_df.columns]
+            dtypes = {col: dtype for col, dtype in (self.dtype_dict or {}).items() if col in data_df.columns}
+            if dtypes:
+                data_df = data_df.astype(dtypes, copy=False)
+            fill_missing(data_df, self.filler)
+            yield data_df
 
     def transform_categorical(self):
         """ Transform categorical data.
 
         # Note
             Produce fit dictionary for categorical data and transform categorical data using fit dictionary.
+            If the dataset is streamed in chunks, only the fit dictionary is produced, and the chunks are transformed
+                one at a time by iter_encoded() or split_chunks().
+            If fit_dictionary_path is set, the fit dictionary is loaded from it when the file exists, and saved to it
+                otherwise.
+            If hash_buckets is set, no fit dictionary is produced and categorical data are transformed by feature
+                hashing in a single pass.
+            If time_column is categorical, its timestamps are kept in time_values before they are transformed.
         """
-        # Step 1: Count categorical occurrences for each column.
-        self.fit_dict = {col: self.data_df[col].value_counts().to_dict() for col in self.categorical_columns}
-
-        # Step 2: Reindex categories for each column (create fit dictionary)
-        for col, count_dict in self.fit_dict.items():
-            index = 0.0  # float meets TensorFlow type requirement
-            categories = list()
-            for category, count in count_dict.items():
-                if count > self.categorical_filter:
-                    self.fit_dict[col][category] = index
-                    index += 1
-                else:
-                    categories.append(category)
-            for category in categories:
-                self.fit_dict[col][category] = index
+        codes = {}
+        indices = {}
+        if self.hash_buckets is not None:
+            # Step 1-2: Feature hashing needs no fit dictionary.
+            self.fit_dict = None
+        elif self.has_fit_dict_file():
+            # Step 1-2: Load fit dictionary saved by a previous run.
+            self.load_fit_dict()
+        else:
+            # Step 1: Count categorical occurrences for each column.
+            if self.category_counts is None and self.sketch_error is not None:
+                self.category_counts = self.count_frequent_categories([self.data_df])
+            elif self.category_counts is None:
+                self.category_counts = {}
+                for col in self.categorical_columns:
+                    codes[col], self.category_counts[col] = factorize_categories(self.data_df[col])
+
+            # Step 2: Reindex categories for each column (create fit dictionary)
+            self.fit_dict = {}
+            self.unseen_indices = None
+            for col in self.categorical_columns:
+                indices[col], self.fit_dict[col] = index_categories(self.category_counts[col], self.categorical_filter)
+            self.unseen_indices = {col: self.get_unseen_index(col) for col in self.categorical_columns}
+            if self.fit_dictionary_path is not None:
+                self.save_fit_dict()
 
         # Step 3: Transform categorical data (apply fit dictionary)
+        # Keep the timestamps for split_index() if they are encoded as categories.
+        if self.data_df is None:
+            return
+        keep_time = self.time_column is not None and self.time_column in self.categorical_columns
+        self.time_values = np.asarray(self.data_df[self.time_column]) if keep_time else None
+        if codes:
+            for col in self.categorical_columns:
+                self.data_df[col] = self.cast_categorical(indices[col][codes[col]])  # set class attribute pd_data
+        else:
+            self.apply_fit_dict(self.data_df)
+
+    def iter_encoded(self):
+        """ Iterate over the dataset in chunks whose categorical columns are transformed by apply_fit_dict().
+
+        # Returns
+            Generator of DataFrame chunks of at most chunk_size rows.
+        """
+        for chunk_df in self.iter_dataset():
+            yield self.apply_fit_dict(chunk_df)
+
+    def count_frequent_categories(self, data_dfs):
+        """ Approximately count the frequent categories in a single pass with bounded memory.
+
+        # Note
+            The occurrences of categories are counted with a Count-Min Sketch per column, and only the categories whose
+                estimated counts exceed categorical_filter are kept as candidates. Estimated counts never fall below
+                the true counts, so no frequent category is missed, while categories which occur no more than
+                categorical_filter - sketch_error * rows times are dropped with probability 0.99.
+            Since infrequent categories are not kept, they share the index after the frequent categories with
+                categories which are not seen.
+            The sketch takes e / sketch_error * 5 counters per column, so it saves memory when categorical_filter is
+                large enough for sketch_error * rows to be a small fraction of it, e.g., 1e-5 for a filter of 100 on
+                10M rows, while exact counting is preferable for small filters.
+
+        # Arguments
+            data_dfs (iterable): DataFrame objects of consecutive parts of the dataset.
+
+        # Returns
+            Dictionary which maps column names to Series of estimated counts of the frequent categories in the order
+                they first appear.
+        """
+        sketches = {}
+        candidates = {col: pd.Index([]) for col in self.categorical_columns}
+        num_rows = 0
+        for data_df in data_dfs:
+            num_rows += len(data_df)
+            for col in self.categorical_columns:
+                if col not in sketches:
+                    sketches[col] = CountMinSketch(error=self.sketch_error)
+                _, counts = factorize_categories(data_df[col])
+                frequent = counts.index[sketches[col].update(counts.index, counts.values) > self.categorical_filter]
+                candidates[col] = candidates[col].append(frequent.difference(candidates[col], sort=False))
+        self.category_sketches = sketches
+
+        category_counts = {}
         for col in self.categorical_columns:
-            self.data_df[col] = self.data_df[col].map(self.fit_dict[col])  # set class attribute pd_data
+            estimates = pd.Series(sketches[col].estimate(candidates[col]) if len(candidates[col]) else [],
+                                  index=candidates[col], dtype=np.int64)
+            category_counts[col] = estimates[estimates > self.categorical_filter]
+        return category_counts
+
+    def has_fit_dict_file(self):
+        """ Check whether the fit dictionary is saved at fit_dictionary_path.
+
+        # Returns
+            Boolean whether fit_dictionary_path is set and the file exists.
+        """
+        return self.fit_dictionary_path is not None and os.path.isfile(self.fit_dictionary_path)
+
+    def save_fit_dict(self, path=None):
+        """ Save the fit dictionary in NumPy .npz format.
+
+        # Note
+            Each categorical column is stored as an array of categories and an array of indices in the same order,
+                along with the index of unseen categories.
+                String categories are stored as fixed-width unicode arrays, so that loading does not unpickle objects
+                unless a column mixes data types, e.g., strings and the numerical filler.
+
+        # Arguments
+            path (str): Path to save the fit dictionary. Defaults to fit_dictionary_path.
+        """
+        arrays = {'columns': np.array([str(col) for col in self.categorical_columns])}
+        for i, col in enumerate(self.categorical_columns):
+            categories = self.fit_dict[col].index
+            if categories.inferred_type == 'string':
+                categories = categories.astype(str)
+            arrays['categories_{}'.format(i)] = categories.values
+            arrays['indices_{}'.format(i)] = self.fit_dict[col].values
+        arrays['unseen_indices'] = np.array([self.get_unseen_index(col) for col in self.categorical_columns])
+        # Write through a file object so that NumPy does not append the .npz extension to the path.
+        with open(path or self.fit_dictionary_path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def load_fit_dict(self, path=None):
+        """ Load the fit dictionary saved by save_fit_dict().
+
+        # Arguments
+            path (str): Path to load the fit dictionary. Defaults to fit_dictionary_path.
+        """
+        with np.load(path or self.fit_dictionary_path, allow_pickle=True) as arrays:
+            columns = [str(col) for col in self.categorical_columns]
+            if list(arrays['columns']) != columns:
+                raise ValueError('The fit dictionary is saved for categorical columns {}, but got {}.'.format(
+                    list(arrays['columns']), columns))
+            self.fit_dict = {col: pd.Series(arrays['indices_{}'.format(i)], index=arrays['categories_{}'.format(i)])
+                             for i, col in enumerate(self.categorical_columns)}
+            self.unseen_indices = None
+            if 'unseen_indices' in arrays:
+                self.unseen_indices = dict(zip(self.categorical_columns, arrays['unseen_indices'].tolist()))
+
+    def encode_categorical(self, col, values):
+        """ Encode the categories of one column using the fit dictionary, or by feature hashing if hash_buckets is set.
+
+        # Note
+            Categories which are not in the fit dictionary share the index given by get_unseen_index().
 
-    def transform_numerical(self):
+        # Arguments
+            col (str): String name associated with the categorical column.
+            values (Series): The categorical data of the column.
+
+        # Returns
+            ndarray integer indices of the categories.
+        """
+        if self.hash_buckets is not None:
+            return hash_categories(values, self.get_hash_size()[list(self.categorical_columns).index(col)])
+        fit = self.fit_dict[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Look up each distinct category once; the appended -1 is taken by the code of missing data.
+            positions = np.append(pd.Index(fit.index).get_indexer(values.cat.categories), -1)[values.cat.codes]
+        else:
+            positions = pd.Index(fit.index).get_indexer(values)
+        # A column may have no frequent category, e.g., in sketch mode, so only the found positions are looked up.
+        found = positions >= 0
+        dtype = fit.values.dtype if len(fit) else np.int64
+        indices = np.full(len(positions), self.get_unseen_index(col), dtype=dtype)
+        indices[found] = fit.values[positions[found]]
+        return indices
+
+    def get_unseen_index(self, col):
+        """ Get the index of the categories which are not in the fit dictionary of one column.
+
+        # Note
+            The index is the index of the infrequent categories if any, or the index after the frequent categories if
+                sketch_error is set. It is recorded along with the fit dictionary, so that it stays the same when the
+                fit dictionary is extended by extend_fit_dict().
+
+        # Arguments
+            col (str): String name associated with the categorical column.
+
+        # Returns
+            Integer index of unseen categories.
+        """
+        if self.unseen_indices is not None and col in self.unseen_indices:
+            return self.unseen_indices[col]
+        fit = self.fit_dict[col]
+        if self.sketch_error is not None:
+            return len(fit)  # infrequent categories are not kept in the fit dictionary
+        return int(fit.values.max()) if len(fit) else 0
+
+    def extend_fit_dict(self, data_df):
+        """ Extend the fit dictionary with the frequent categories of new data.
+
+        # Note
+            Categories which are not in the fit dictionary and occur more than categorical_filter times in the new data
+                are indexed after all existing indices by descending counts, so that the existing indices stay the same
+                and data transformed before remain valid. Other new categories share the index of unseen categories.
+            Only the new data are counted, so a category which is infrequent in each part of the data is not added
+                even if it is frequent in all parts together.
+
+        # Arguments
+            data_df (DataFrame): The new data before transformation.
+        """
+        self.unseen_indices = {col: self.get_unseen_index(col) for col in self.categorical_columns}
+        for col in self.categorical_columns:
+            fit = self.fit_dict[col]
+            _, counts = factorize_categories(data_df[col])
+            counts = counts[~counts.index.isin(fit.index) & (counts.values > self.categorical_filter)]
+            if not len(counts):
+                continue
+            start = max(int(fit.values.max()) if len(fit) else -1, self.unseen_indices[col]) + 1
+            # Sort the same way as index_categories().
+            order = pd.Series(counts.values).sort_values(ascending=False).index.values
+            new_indices = np.arange(start, start + len(order))
+            dtype = compact_int_dtype(new_indices[-1])
+            self.fit_dict[col] = pd.concat([fit.astype(dtype), pd.Series(new_indices.astype(dtype),
+                                                                        index=counts.index[order])])
+
+    def apply_fit_dict(self, data_df):
+        """ Transform the categorical columns of the input data using the fit dictionary or feature hashing.
+
+        # Arguments
+            data_df (DataFrame): The input data, which is transformed in place.
+
+        # Returns
+            DataFrame transformed input data.
+        """
+        for col in self.categorical_columns:
+            data_df[col] = self.cast_categorical(self.encode_categorical(col, data_df[col]))
+        return data_df
+
+    def cast_categorical(self, indices):
+        """ Cast the indices of categories to the data type of the transformed categorical data.
+
+        # Arguments
+            indices (ndarray): Integer indices of the categories.
+
+        # Returns
+            ndarray indices of the smallest integer type if compact_dtype is set, or float64 otherwise.
+        """
+        if self.compact_dtype:
+            return indices
+        # float meets TensorFlow type requirement
+        return indices.astype(np.float64)
+
+    def transform_numerical(self, data_df=None):
         """ Transform numerical data using supported data transformation functions.
+
+        # Note
+            The transformation method is applied to whole columns at once. See NUMERICAL_TRANSFORMS for the supported
+                transformation methods.
+
+        # Arguments
+            data_df (DataFrame): The input data, which is transformed in place. Defaults to data_df.
         """
+        if data_df is None:
+            data_df = self.data_df
+
         # Step 1: Define transformation method.
-        def scale_by_log(num):
-            """ Scale numerical data by log transformation.
-            """
-            return math.log(float(num)) ** 2 if num > 2 else num
+        transform = self.numerical_transform
+        if not callable(transform):
+            transform = NUMERICAL_TRANSFORMS[transform]
 
         # Step 2: Transform numerical data (apply transformation method)
         for col in self.numerical_columns:
-            self.data_df[col] = self.data_df[col].map(scale_by_log)
+            values = transform(data_df[col].values)
+            data_df[col] = values.astype(np.float32) if self.compact_dtype else values
 
     def get_hash_size(self):
         """ Get the hash sizes of categorical columns.
 
+        # Note
+            The hash size of a column is the exact number of indices its categories are encoded into, i.e., the
+                number of frequent categories, plus one for the infrequent and unseen categories if they have their
+                own index, so that embedding tables of these sizes have one row per index.
+
         # Returns
-            List of integer numbers of categories in each categorical data columns.
+            List of integer numbers of indices of the categories in each categorical data columns, or numbers of
+                hash buckets if hash_buckets is set.
         """
-        return [len(self.fit_dict[col]) for col in self.categorical_columns]
+        if self.hash_buckets is not None:
+            if isinstance(self.hash_buckets, int):
+                return [self.hash_buckets] * len(self.categorical_columns)
+            return list(self.hash_buckets)
+        hash_size = []
+        for col in self.categorical_columns:
+            fit = self.fit_dict[col]
+            max_index = int(fit.values.max()) if len(fit) else 0
+            hash_size.append(max(max_index, self.get_unseen_index(col)) + 1)
+        return hash_size
 
     def get_x(self):
         """ Get the training data columns.
@@ -242,6 +1243,317 @@ class BasePreprocessor(metaclass=ABCMeta):
 
         return x_train, x_test, y_train, y_test
 
+    def get_split_paths(self):
+        """ Get the paths to cache the training, validation, and test sets.
+
+        # Returns
+            3-tuple of string paths to the directories of the training, validation, and test sets.
+        """
+        return (self.train_path or os.path.join(self.transform_path, 'train'),
+                self.validate_path or os.path.join(self.transform_path, 'validate'),
+                self.test_path or os.path.join(self.transform_path, 'test'))
+
+    def get_source_paths(self):
+        """ Get the paths to the source files of the dataset.
+
+        # Returns
+            List of string paths to the files at non_csv_path, which may be a path, a glob pattern, or a list of paths,
+                or list of the path to the CSV dataset if non_csv_path is None.
+        """
+        if self.non_csv_path is None:
+            return [self.csv_path]
+        if isinstance(self.non_csv_path, str):
+            return sorted(glob.glob(self.non_csv_path)) or [self.non_csv_path]
+        return list(self.non_csv_path)
+
+    def get_transform_key(self):
+        """ Get the key which identifies the transformed dataset.
+
+        # Note
+            The key changes whenever a source file is modified or any preprocessing parameter changes, so that a
+                stale transformed dataset is never reused.
+
+        # Returns
+            String hash of the source file statuses and the preprocessing parameters.
+        """
+        sources = [(os.path.abspath(path), os.stat(path).st_size, os.stat(path).st_mtime_ns)
+                   for path in self.get_source_paths()]
+        params = [type(self).__name__, sources, self.header, self.columns, self.delimiter, self.filler,
+                  self.dtype_dict, self.ignored_columns, self.target_column, self.numerical_columns,
+                  self.categorical_columns, self.categorical_filter, self.sketch_error, self.hash_buckets,
+                  self.numerical_transform, self.compact_dtype, self.test_percentage, self.validate_percentage,
+                  self.time_column, self.dtype_sample_size]
+        params = json.dumps(params, default=lambda obj: getattr(obj, '__name__', str(obj)))
+        return hashlib.sha1(params.encode('utf-8')).hexdigest()
+
+    def save_transformed(self, splits):
+        """ Cache the transformed dataset split into the training, validation, and test sets.
+
+        # Note
+            Each column of each set is saved as a separate NumPy .npy file at train_path, validate_path, and test_path,
+                and the fit dictionary is saved along with a manifest at transform_path. Nothing is saved if
+                transform_path is None.
+
+        # Arguments
+            splits (tuple): 6-tuple of training input data, training output data, validation input data, validation
+                output data, testing input data, and testing output data, as returned by preprocess().
+        """
+        if self.transform_path is None:
+            return
+        os.makedirs(self.transform_path, exist_ok=True)
+        for split_path, x, y in zip(self.get_split_paths(), splits[0::2], splits[1::2]):
+            os.makedirs(split_path, exist_ok=True)
+            for i, col in enumerate(x.columns):
+                np.save(os.path.join(split_path, 'x_{}.npy'.format(i)), x[col].values, allow_pickle=False)
+            np.save(os.path.join(split_path, 'index.npy'), x.index.values, allow_pickle=False)
+            np.save(os.path.join(split_path, 'y.npy'), np.asarray(y), allow_pickle=False)
+        self.save_manifest(list(splits[0].columns))
+
+    def save_manifest(self, x_columns):
+        """ Save the fit dictionary and the manifest which validates the transformed dataset at transform_path.
+
+        # Note
+            The manifest is written last so that an interrupted run leaves no valid cache behind.
+
+        # Arguments
+            x_columns (list): Names of the input data columns, in the order of the saved x_{i}.npy files.
+        """
+        if self.fit_dict is not None:
+            self.save_fit_dict(os.path.join(self.transform_path, 'fit_dict.npz'))
+        manifest = {'key': self.get_transform_key(), 'x_columns': x_columns}
+        with open(os.path.join(self.transform_path, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, default=int)
+
+    def load_transformed(self):
+        """ Load the transformed dataset cached by save_transformed().
+
+        # Note
+            Columns are memory-mapped and wrapped in DataFrame objects without copying, so that loading takes time
+                independent of the size of the dataset. The fit dictionary is loaded as well, but data_df is not.
+
+        # Returns
+            6-tuple as returned by preprocess(), or None if transform_path is None or caches no up-to-date
+                transformed dataset.
+        """
+        if self.transform_path is None:
+            return None
+        manifest_path = os.path.join(self.transform_path, 'manifest.json')
+        if not os.path.isfile(manifest_path):
+            return None
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest['key'] != self.get_transform_key():
+            return None
+
+        if self.hash_buckets is None:
+            self.load_fit_dict(os.path.join(self.transform_path, 'fit_dict.npz'))
+        splits = []
+        for split_path in self.get_split_paths():
+            columns = {col: np.load(os.path.join(split_path, 'x_{}.npy'.format(i)), mmap_mode='r')
+                       for i, col in enumerate(manifest['x_columns'])}
+            index = pd.Index(np.load(os.path.join(split_path, 'index.npy'), mmap_mode='r'))
+            splits.append(pd.DataFrame(columns, index=index, columns=manifest['x_columns'], copy=False))
+            splits.append(np.load(os.path.join(split_path, 'y.npy'), mmap_mode='r'))
+        return tuple(splits)
+
+    def append_dataset(self, csv_path):
+        """ Transform new data and append them to the transformed dataset cached by save_transformed().
+
+        # Note
+            Only the new data are read and transformed, and the cached sets are extended in place by append_npy(), so
+                that the work is proportional to the new data. The fit dictionary is extended by extend_fit_dict(),
+                so the cached data stay valid.
+            If time_column is set, the new data become the test set, the test set becomes the validation set, and the
+                validation set is appended to the training set, assuming the new data are newer than the cached data.
+                Otherwise, the new rows are split by split_rows() following the row numbers of the cached rows.
+            Numerical transformation methods which depend on the data, e.g., 'quantile', are fit to the new data
+                alone. The cached dataset is still identified by the source files, so it is rebuilt without the
+                appended data when they are modified or any preprocessing parameter changes.
+
+        # Arguments
+            csv_path (str): Path to the new CSV data, which is in the same format as the dataset.
+
+        # Returns
+            6-tuple as returned by preprocess() of the extended dataset.
+        """
+        splits = self.load_transformed()
+        if splits is None:
+            raise ValueError('No up-to-date transformed dataset is cached at transform_path {}.'.format(
+                self.transform_path))
+        x_columns = list(splits[0].columns)
+        num_rows = sum(len(y) for y in splits[1::2])
+        del splits  # release the memory-mapped files before they are modified
+
+        # Step 1: Transform the new data with the extended fit dictionary.
+        data_df = self.read_dataset(csv_path)
+        if self.hash_buckets is None:
+            self.extend_fit_dict(data_df)
+        self.apply_fit_dict(data_df)
+        self.transform_numerical(data_df)
+        data_df.index = pd.RangeIndex(num_rows, num_rows + len(data_df))
+        names = ['x_{}.npy'.format(i) for i in range(len(x_columns))] + ['index.npy', 'y.npy']
+        arrays = [data_df[col].values for col in x_columns] + [data_df.index.values, data_df[self.target_column].values]
+
+        # Step 2: Append the new rows to the cached sets.
+        # Remove the manifest first so that an interrupted run leaves no valid cache behind.
+        manifest_path = os.path.join(self.transform_path, 'manifest.json')
+        os.remove(manifest_path)
+        train_path, validate_path, test_path = self.get_split_paths()
+        if self.time_column is not None:
+            for name in names:
+                append_npy(os.path.join(train_path, name), np.load(os.path.join(validate_path, name)))
+                os.replace(os.path.join(test_path, name), os.path.join(validate_path, name))
+            for name, array in zip(names, arrays):
+                np.save(os.path.join(test_path, name), array, allow_pickle=False)
+        else:
+            for split_path, index in zip(self.get_split_paths(), split_rows(len(data_df), self.test_percentage,
+                                                                            self.validate_percentage, num_rows)):
+                for name, array in zip(names, arrays):
+                    append_npy(os.path.join(split_path, name), array[index])
+
+        if self.fit_dict is not None:
+            self.save_fit_dict(os.path.join(self.transform_path, 'fit_dict.npz'))
+            if self.fit_dictionary_path is not None:
+                self.save_fit_dict()
+        with open(manifest_path, 'w') as f:
+            json.dump({'key': self.get_transform_key(), 'x_columns': x_columns}, f, default=int)
+        return self.load_transformed()
+
+    def split_index(self, offset=0):
+        """ Split the rows of the data into the training, validation, and test sets.
+
+        # Note
+            Unlike split_data(), rows are assigned by a deterministic hash of their row numbers without copying any
+                data, so the splits are reproducible and can be sliced lazily, e.g., x.iloc[train_index].
+            If time_column is set, rows are assigned in time order by split_rows_by_time() instead.
+
+        # Arguments
+            offset (int): Row number of the first row of data_df.
+
+        # Returns
+            3-tuple of ndarray row positions of the training, validation, and test sets.
+        """
+        if self.time_column is not None:
+            times = self.time_values if self.time_values is not None else self.data_df[self.time_column].values
+            return split_rows_by_time(times, self.test_percentage, self.validate_percentage)
+        return split_rows(len(self.data_df.index), self.test_percentage, self.validate_percentage, offset)
+
+    def split_dataset(self):
+        """ Split the data into the training, validation, and test sets by split_index().
+
+        # Note
+            Each set is taken from data_df once, instead of copying the training data columns first and splitting
+                the copies again, so the peak memory is about twice the size of data_df.
+
+        # Returns
+            6-tuple of training input data, training output data, validation input data, validation output data,
+                testing input data, and testing output data.
+        """
+        x_columns = [col for col in self.data_df.columns if col != self.target_column]
+        y = self.get_y()
+        splits = []
+        for index in self.split_index():
+            # Gather column by column, since taking rows and columns of a DataFrame at once copies the data twice.
+            x = pd.DataFrame({col: self.data_df[col].values[index] for col in x_columns},
+                             index=self.data_df.index[index], columns=x_columns, copy=False)
+            splits.extend([x, y[index]])
+        return tuple(splits)
+
+    def split_chunks(self, numerical=True):
+        """ Transform and split the dataset chunk by chunk, as load_dataset() and transform_categorical() stream it.
+
+        # Note
+            Each chunk is encoded by iter_encoded(), transformed by transform_numerical() if numerical is set, and split
+                by split_rows() at its row numbers, and its columns are appended to the sets at transform_path by
+                append_npy(). Only one chunk is held in memory, besides the timestamps if time_column is set, which
+                are read in an extra pass to split the rows by split_rows_by_time(), and the numerical columns if the
+                numerical transformation method depends on the whole columns, i.e., 'clip' and 'quantile'.
+            If transform_path is None, the columns of the sets are kept in memory instead, so the peak memory is about
+                the size of the transformed dataset.
+            The result is the same as that of split_dataset() after the whole dataset is transformed.
+
+        # Arguments
+            numerical (bool): Whether to transform the numerical data by transform_numerical().
+
+        # Returns
+            6-tuple as returned by split_dataset().
+        """
+        assignment = None
+        if self.time_column is not None:
+            times = np.concatenate([np.asarray(chunk_df[self.time_column]) for chunk_df in self.iter_dataset()])
+            assignment = np.zeros(len(times), dtype=np.int8)
+            for i, index in enumerate(split_rows_by_time(times, self.test_percentage, self.validate_percentage)):
+                assignment[index] = i
+            del times
+        # Transformations which depend on whole columns are applied after all the chunks are read.
+        whole_columns = numerical and self.numerical_transform in ('clip', 'quantile')
+        numerical_parts = {col: [] for col in self.numerical_columns} if whole_columns else {}
+
+        split_paths = self.get_split_paths() if self.transform_path is not None else None
+        parts = [collections.defaultdict(list) for _ in range(3)]  # arrays of each set kept in memory
+
+        def write(i, name, array):
+            if split_paths is None:
+                parts[i][name].append(array)
+                return
+            path = os.path.join(split_paths[i], name)
+            if name in parts[i]:
+                append_npy(path, array)
+            else:
+                parts[i][name] = None  # the file is created
+                np.save(path, array, allow_pickle=False)
+
+        if split_paths is not None:
+            os.makedirs(self.transform_path, exist_ok=True)
+            for split_path in split_paths:
+                os.makedirs(split_path, exist_ok=True)
+        x_columns = None
+        num_rows = 0
+        for chunk_df in self.iter_encoded():
+            for col in numerical_parts:
+                numerical_parts[col].append(chunk_df[col].values)
+            if numerical and not whole_columns:
+                self.transform_numerical(chunk_df)
+            x_columns = [col for col in chunk_df.columns if col != self.target_column]
+            names = ['x_{}.npy'.format(i) for i in range(len(x_columns))] + ['index.npy', 'y.npy']
+            arrays = [chunk_df[col].values for col in x_columns] + [
+                np.arange(num_rows, num_rows + len(chunk_df)), chunk_df[self.target_column].values]
+            if assignment is None:
+                indices = split_rows(len(chunk_df), self.test_percentage, self.validate_percentage, num_rows)
+            else:
+                chunk_assignment = assignment[num_rows:num_rows + len(chunk_df)]
+                indices = [np.flatnonzero(chunk_assignment == i) for i in range(3)]
+            for i, index in enumerate(indices):
+                for name, array in zip(names, arrays):
+                    write(i, name, array[index])
+            num_rows += len(chunk_df)
+
+        # Transform the numerical columns as a whole and write them over the untransformed ones.
+        if numerical_parts:
+            data_df = pd.DataFrame({col: np.concatenate(numerical_parts[col]) for col in numerical_parts})
+            del numerical_parts
+            self.transform_numerical(data_df)
+            index = [np.load(os.path.join(split_paths[i], 'index.npy')) if split_paths is not None
+                     else np.concatenate(parts[i]['index.npy']) for i in range(3)]
+            for col in data_df.columns:
+                name = 'x_{}.npy'.format(x_columns.index(col))
+                for i in range(3):
+                    if split_paths is None:
+                        parts[i][name] = [data_df[col].values[index[i]]]
+                    else:
+                        np.save(os.path.join(split_paths[i], name), data_df[col].values[index[i]], allow_pickle=False)
+
+        if split_paths is not None:
+            self.save_manifest(x_columns)
+            return self.load_transformed()
+        splits = []
+        for i in range(3):
+            arrays = {name: np.concatenate(part) for name, part in parts[i].items()}
+            splits.append(pd.DataFrame({col: arrays['x_{}.npy'.format(j)] for j, col in enumerate(x_columns)},
+                                       index=pd.Index(arrays['index.npy']), columns=x_columns, copy=False))
+            splits.append(arrays['y.npy'])
+        return tuple(splits)
+
     @abstractmethod
     def preprocess(self):
         """ Apply all preprocess steps.
@@ -265,7 +1577,8 @@ class AvazuPreprocessor(BasePreprocessor):
 
     # Arguments
         non_csv_path (str): Path to convert the dataset into CSV format.
-        csv_path (str): Path to save and load the CSV dataset.
+        csv_path (str): Path to save and load the CSV dataset, or to load a Parquet or Arrow IPC dataset by the file
+            extension.
         header (int): Row number to use as column names.
         columns (list): String names associated with the columns of the dataset.
         delimiter (str): Separator used to parse lines.
@@ -278,12 +1591,28 @@ class AvazuPreprocessor(BasePreprocessor):
         categorical_columns (list): String names associated with the columns containing categorical data.
         categorical_filter (int): Filter used to group infrequent categories in one column as the same category.
         fit_dictionary_path (str): Path to the fit dictionary for categorical data.
-        transform_path (str): Path to the transformed dataset.
+        transform_path (str): Path to the directory which caches the transformed dataset, or None to disable caching.
         test_percentage (float): Percentage for the test set.
         validate_percentage (float): Percentage for the validation set.
-        train_path (str): Path to the training set.
-        validate_path (str): Path to the validation set.
-        test_path (str): Path to the test set.
+        train_path (str): Path to the directory which caches the training set. Defaults to transform_path/train.
+        validate_path (str): Path to the directory which caches the validation set. Defaults to
+            transform_path/validate.
+        test_path (str): Path to the directory which caches the test set. Defaults to transform_path/test.
+        chunk_size (int): Number of rows per chunk to stream the dataset out-of-core, or None to load it at once.
+        numerical_transform (str or callable): Name of the transformation method in NUMERICAL_TRANSFORMS, or a function
+            which transforms the numerical data of one column.
+        compact_dtype (bool): Whether to encode categorical data as the smallest integer type and numerical data as
+            float32, instead of float64.
+        num_workers (int): Number of processes to parse shards of the dataset in parallel, or None to parse it in one
+            process.
+        hash_buckets (int or list): Number of hash buckets to encode all or each categorical column by feature hashing
+            instead of the fit dictionary, or None to build the fit dictionary.
+        sketch_error (float): Maximum overestimation of categorical counts relative to the number of rows, to filter
+            categories approximately in bounded memory with a Count-Min Sketch, or None to count categories exactly.
+        time_column (str): String name associated with the column of timestamps to split the dataset in time order, or
+            None to split it by a hash of row numbers.
+        dtype_sample_size (int): Number of rows sampled to infer compact data types of columns missing from dtype_dict,
+            or None to let Pandas infer them from the whole dataset.
     """
 
     def __init__(self,
@@ -293,7 +1622,7 @@ class AvazuPreprocessor(BasePreprocessor):
                  columns=None,
                  delimiter=',',
                  filler=0.0,
-                 dtype_dict=None,  # inferred in load_data()
+                 dtype_dict=None,  # inferred in infer_dtype_dict()
                  ignored_columns=None,
                  target_column='click',
                  numerical_columns=None,
@@ -305,7 +1634,15 @@ class AvazuPreprocessor(BasePreprocessor):
                  validate_percentage=0.1,
                  train_path=None,
                  validate_path=None,
-                 test_path=None):
+                 test_path=None,
+                 chunk_size=None,
+                 numerical_transform='log',
+                 compact_dtype=False,
+                 num_workers=None,
+                 hash_buckets=None,
+                 sketch_error=None,
+                 time_column=None,
+                 dtype_sample_size=10000):
 
         if columns is None:
             columns = ['id', 'click', 'hour', 'C1', 'banner_pos', 'site_id', 'site_domain', 'site_category', 'app_id',
@@ -338,7 +1675,15 @@ class AvazuPreprocessor(BasePreprocessor):
                          validate_percentage=validate_percentage,
                          train_path=train_path,
                          validate_path=validate_path,
-                         test_path=test_path)
+                         test_path=test_path,
+                         chunk_size=chunk_size,
+                         numerical_transform=numerical_transform,
+                         compact_dtype=compact_dtype,
+                         num_workers=num_workers,
+                         hash_buckets=hash_buckets,
+                         sketch_error=sketch_error,
+                         time_column=time_column,
+                         dtype_sample_size=dtype_sample_size)
 
     def preprocess(self):
         """ Apply all preprocessing steps to the Avazu dataset.
@@ -347,21 +1692,24 @@ class AvazuPreprocessor(BasePreprocessor):
             6-tuple of ndarray training input data, training output data, validation input data, validation output data,
                 testing input data, and testing output data.
         """
+        # Step 0: Load the transformed dataset cached by a previous run.
+        splits = self.load_transformed()
+        if splits is not None:
+            return splits
+
         # Step 1: Load the Avazu dataset.
         self.load_dataset()
 
         # Step 2: Transform categorical data.
         self.transform_categorical()
+        if self.data_df is None:
+            # Step 3: Split the dataset chunk by chunk.
+            return self.split_chunks(numerical=False)
 
-        # Step 3: Obtain LHS (X) and RHS (y) of the equation.
-        x = self.get_x()
-        y = self.get_y()
-
-        # Step 4: Split data for training, validation, and testing.
-        x_train, x_test, y_train, y_test = self.split_data(x, y, self.test_percentage)
-        x_train, x_validate, y_train, y_validate = self.split_data(x_train, y_train, self.validate_percentage)
-
-        return x_train, y_train, x_validate, y_validate, x_test, y_test
+        # Step 3: Split LHS (X) and RHS (y) of the equation for training, validation, and testing.
+        splits = self.split_dataset()
+        self.save_transformed(splits)
+        return splits
 
 
 class CriteoPreprocessor(BasePreprocessor):
@@ -373,7 +1721,8 @@ class CriteoPreprocessor(BasePreprocessor):
 
     # Arguments
         non_csv_path (str): Path to convert the dataset into CSV format.
-        csv_path (str): Path to save and load the CSV dataset.
+        csv_path (str): Path to save and load the CSV dataset, or to load a Parquet or Arrow IPC dataset by the file
+            extension.
         header (int): Row number to use as column names.
         columns (list): String names associated with the columns of the dataset.
         delimiter (str): Separator used to parse lines.
@@ -386,12 +1735,28 @@ class CriteoPreprocessor(BasePreprocessor):
         categorical_columns (list): String names associated with the columns containing categorical data.
         categorical_filter (int): Filter used to group infrequent categories in one column as the same category.
         fit_dictionary_path (str): Path to the fit dictionary for categorical data.
-        transform_path (str): Path to the transformed dataset.
+        transform_path (str): Path to the directory which caches the transformed dataset, or None to disable caching.
         test_percentage (float): Percentage for the test set.
         validate_percentage (float): Percentage for the validation set.
-        train_path (str): Path to the training set.
-        validate_path (str): Path to the validation set.
-        test_path (str): Path to the test set.
+        train_path (str): Path to the directory which caches the training set. Defaults to transform_path/train.
+        validate_path (str): Path to the directory which caches the validation set. Defaults to
+            transform_path/validate.
+        test_path (str): Path to the directory which caches the test set. Defaults to transform_path/test.
+        chunk_size (int): Number of rows per chunk to stream the dataset out-of-core, or None to load it at once.
+        numerical_transform (str or callable): Name of the transformation method in NUMERICAL_TRANSFORMS, or a function
+            which transforms the numerical data of one column.
+        compact_dtype (bool): Whether to encode categorical data as the smallest integer type and numerical data as
+            float32, instead of float64.
+        num_workers (int): Number of processes to parse shards of the dataset in parallel, or None to parse it in one
+            process.
+        hash_buckets (int or list): Number of hash buckets to encode all or each categorical column by feature hashing
+            instead of the fit dictionary, or None to build the fit dictionary.
+        sketch_error (float): Maximum overestimation of categorical counts relative to the number of rows, to filter
+            categories approximately in bounded memory with a Count-Min Sketch, or None to count categories exactly.
+        time_column (str): String name associated with the column of timestamps to split the dataset in time order, or
+            None to split it by a hash of row numbers.
+        dtype_sample_size (int): Number of rows sampled to infer compact data types of columns missing from dtype_dict,
+            or None to let Pandas infer them from the whole dataset.
     """
 
     def __init__(self,
@@ -401,7 +1766,7 @@ class CriteoPreprocessor(BasePreprocessor):
                  columns=None,
                  delimiter='\t',
                  filler=0.0,
-                 dtype_dict=None,  # inferred in load_data()
+                 dtype_dict=None,  # inferred in infer_dtype_dict()
                  ignored_columns=None,
                  target_column=0,
                  numerical_columns=None,
@@ -413,7 +1778,15 @@ class CriteoPreprocessor(BasePreprocessor):
                  validate_percentage=0.1,
                  train_path=None,
                  validate_path=None,
-                 test_path=None):
+                 test_path=None,
+                 chunk_size=None,
+                 numerical_transform='log',
+                 compact_dtype=False,
+                 num_workers=None,
+                 hash_buckets=None,
+                 sketch_error=None,
+                 time_column=None,
+                 dtype_sample_size=10000):
 
         if columns is None:
             columns = range(40)
@@ -444,7 +1817,15 @@ class CriteoPreprocessor(BasePreprocessor):
                          validate_percentage=validate_percentage,
                          train_path=train_path,
                          validate_path=validate_path,
-                         test_path=test_path)
+                         test_path=test_path,
+                         chunk_size=chunk_size,
+                         numerical_transform=numerical_transform,
+                         compact_dtype=compact_dtype,
+                         num_workers=num_workers,
+                         hash_buckets=hash_buckets,
+                         sketch_error=sketch_error,
+                         time_column=time_column,
+                         dtype_sample_size=dtype_sample_size)
 
     def preprocess(self):
         """ Apply all preprocessing steps to the Criteo dataset.
@@ -453,24 +1834,27 @@ class CriteoPreprocessor(BasePreprocessor):
             6-tuple of ndarray training input data, training output data, validation input data, validation output data,
                 testing input data, and testing output data.
         """
+        # Step 0: Load the transformed dataset cached by a previous run.
+        splits = self.load_transformed()
+        if splits is not None:
+            return splits
+
         # Step 1: Load data for fit and transform categorical data.
         self.load_dataset()
 
         # Step 2: Transform categorical data.
         self.transform_categorical()
+        if self.data_df is None:
+            # Step 3-4: Transform numerical data and split the dataset chunk by chunk.
+            return self.split_chunks()
 
         # Step 3: Transform numerical data.
         self.transform_numerical()
 
-        # Step 4: Obtain LHS (X) and RHS (y) of the equation.
-        x = self.get_x()
-        y = self.get_y()
-
-        # Step 5: Split data for training, validation, and testing.
-        x_train, x_test, y_train, y_test = self.split_data(x, y, self.test_percentage)
-        x_train, x_validate, y_train, y_validate = self.split_data(x_train, y_train, self.validate_percentage)
-
-        return x_train, y_train, x_validate, y_validate, x_test, y_test
+        # Step 4: Split LHS (X) and RHS (y) of the equation for training, validation, and testing.
+        splits = self.split_dataset()
+        self.save_transformed(splits)
+        return splits
 
 
 class NetflixPrizePreprocessor(BasePreprocessor):
@@ -481,8 +1865,10 @@ class NetflixPrizePreprocessor(BasePreprocessor):
         The Netflix dataset has 4 data columns: MovieID, CustomerID, Rating, and Date.
 
     # Arguments
-        non_csv_path (str): Path to convert the dataset into CSV format.
-        csv_path (str): Path to save and load the CSV dataset.
+        non_csv_path (str or list): Path, glob pattern, or list of paths to the data files to convert into CSV format,
+            e.g., combined_data_*.txt.
+        csv_path (str): Path to save and load the CSV dataset, or to load a Parquet or Arrow IPC dataset by the file
+            extension.
         header (int): Row number to use as column names.
         columns (list): String names associated with the columns of the dataset.
         delimiter (str): Separator used to parse lines.
@@ -495,12 +1881,28 @@ class NetflixPrizePreprocessor(BasePreprocessor):
         categorical_columns (list): String names associated with the columns containing categorical data.
         categorical_filter (int): Filter used to group infrequent categories in one column as the same category.
         fit_dictionary_path (str): Path to the fit dictionary for categorical data.
-        transform_path (str): Path to the transformed dataset.
+        transform_path (str): Path to the directory which caches the transformed dataset, or None to disable caching.
         test_percentage (float): Percentage for the test set.
         validate_percentage (float): Percentage for the validation set.
-        train_path (str): Path to the training set.
-        validate_path (str): Path to the validation set.
-        test_path (str): Path to the test set.
+        train_path (str): Path to the directory which caches the training set. Defaults to transform_path/train.
+        validate_path (str): Path to the directory which caches the validation set. Defaults to
+            transform_path/validate.
+        test_path (str): Path to the directory which caches the test set. Defaults to transform_path/test.
+        chunk_size (int): Number of rows per chunk to stream the dataset out-of-core, or None to load it at once.
+        numerical_transform (str or callable): Name of the transformation method in NUMERICAL_TRANSFORMS, or a function
+            which transforms the numerical data of one column.
+        compact_dtype (bool): Whether to encode categorical data as the smallest integer type and numerical data as
+            float32, instead of float64.
+        num_workers (int): Number of processes to parse shards of the dataset in parallel, or None to parse it in one
+            process.
+        hash_buckets (int or list): Number of hash buckets to encode all or each categorical column by feature hashing
+            instead of the fit dictionary, or None to build the fit dictionary.
+        sketch_error (float): Maximum overestimation of categorical counts relative to the number of rows, to filter
+            categories approximately in bounded memory with a Count-Min Sketch, or None to count categories exactly.
+        time_column (str): String name associated with the column of timestamps to split the dataset in time order, or
+            None to split it by a hash of row numbers.
+        dtype_sample_size (int): Number of rows sampled to infer compact data types of columns missing from dtype_dict,
+            or None to let Pandas infer them from the whole dataset.
     """
 
     def __init__(self,
@@ -522,7 +1924,15 @@ class NetflixPrizePreprocessor(BasePreprocessor):
                  validate_percentage=0.1,
                  train_path=None,
                  validate_path=None,
-                 test_path=None):
+                 test_path=None,
+                 chunk_size=None,
+                 numerical_transform='log',
+                 compact_dtype=False,
+                 num_workers=None,
+                 hash_buckets=None,
+                 sketch_error=None,
+                 time_column=None,
+                 dtype_sample_size=None):
 
         if columns is None:
             columns = ['MovieID', 'CustomerID', 'Rating', 'Date']
@@ -553,20 +1963,42 @@ class NetflixPrizePreprocessor(BasePreprocessor):
                          validate_percentage=validate_percentage,
                          train_path=train_path,
                          validate_path=validate_path,
-                         test_path=test_path)
+                         test_path=test_path,
+                         chunk_size=chunk_size,
+                         numerical_transform=numerical_transform,
+                         compact_dtype=compact_dtype,
+                         num_workers=num_workers,
+                         hash_buckets=hash_buckets,
+                         sketch_error=sketch_error,
+                         time_column=time_column,
+                         dtype_sample_size=dtype_sample_size)
 
     def format_dataset(self):
         """ Convert the Netflix Prize dataset into CSV format and save it as a new file.
 
         # Note:
             This is an example showing the function which converts dataset into the CSV format as provided by user.
+            The data files at non_csv_path are converted block by block on a pool of num_workers processes and
+                concatenated in order. The conversion is skipped if the CSV dataset is newer than all data files.
         """
-        with open(self.non_csv_path, 'r') as rf, open(self.csv_path, 'w') as wf:
-            for line in rf:
-                if ':' in line:
-                    movie = line.strip(":\n")
-                else:
-                    wf.write(movie + ',' + line)
+        source_paths = self.get_source_paths()
+        if os.path.isfile(self.csv_path) and \
+                os.path.getmtime(self.csv_path) >= max(os.path.getmtime(path) for path in source_paths):
+            return
+
+        # Write temporary files first so that an interrupted conversion is not mistaken for an up-to-date CSV dataset.
+        part_paths = ['{}.part{}'.format(self.csv_path, i) for i in range(len(source_paths))]
+        if len(source_paths) == 1:
+            convert_netflix_file(source_paths[0], part_paths[0])
+        else:
+            with ProcessPoolExecutor(max_workers=self.num_workers) as executor:
+                list(executor.map(convert_netflix_file, source_paths, part_paths))
+            with open(part_paths[0], 'ab') as wf:
+                for part_path in part_paths[1:]:
+                    with open(part_path, 'rb') as rf:
+                        shutil.copyfileobj(rf, wf, 1 << 24)
+                    os.remove(part_path)
+        os.replace(part_paths[0], self.csv_path)
 
     def preprocess(self):
         """ Apply all preprocessing steps to the Netflix Prize dataset.
@@ -575,6 +2007,11 @@ class NetflixPrizePreprocessor(BasePreprocessor):
             6-tuple of ndarray training input data, training output data, validation input data, validation output data,
                 testing input data, and testing output data.
         """
+        # Step 0: Load the transformed dataset cached by a previous run.
+        splits = self.load_transformed()
+        if splits is not None:
+            return splits
+
         # Step 1: Convert Netflix dataset to CSV format.
         self.format_dataset()
 
@@ -583,16 +2020,14 @@ class NetflixPrizePreprocessor(BasePreprocessor):
 
         # Step 3: Transform categorical data.
         self.transform_categorical()
+        if self.data_df is None:
+            # Step 4: Split the dataset chunk by chunk.
+            return self.split_chunks(numerical=False)
 
-        # Step 4: Obtain LHS (X) and RHS (y) of the equation.
-        x = self.get_x()
-        y = self.get_y()
-
-        # Step 5: Split data for training, validation, and testing.
-        x_train, x_test, y_train, y_test = self.split_data(x, y, self.test_percentage)
-        x_train, x_validate, y_train, y_validate = self.split_data(x_train, y_train, self.validate_percentage)
-
-        return x_train, y_train, x_validate, y_validate, x_test, y_test
+        # Step 4: Split LHS (X) and RHS (y) of the equation for training, validation, and testing.
+        splits = self.split_dataset()
+        self.save_transformed(splits)
+        return splits
 
 
 class MovielensPreprocessor(BasePreprocessor):
@@ -604,7 +2039,8 @@ class MovielensPreprocessor(BasePreprocessor):
 
     # Arguments
         non_csv_path (str): Path to convert the dataset into CSV format.
-        csv_path (str): Path to save and load the CSV dataset.
+        csv_path (str): Path to save and load the CSV dataset, or to load a Parquet or Arrow IPC dataset by the file
+            extension.
         header (int): Row number to use as column names.
         columns (list): String names associated with the columns of the dataset.
         delimiter (str): Separator used to parse lines.
@@ -617,12 +2053,28 @@ class MovielensPreprocessor(BasePreprocessor):
         categorical_columns (list): String names associated with the columns containing categorical data.
         categorical_filter (int): Filter used to group infrequent categories in one column as the same category.
         fit_dictionary_path (str): Path to the fit dictionary for categorical data.
-        transform_path (str): Path to the transformed dataset.
+        transform_path (str): Path to the directory which caches the transformed dataset, or None to disable caching.
         test_percentage (float): Percentage for the test set.
         validate_percentage (float): Percentage for the validation set.
-        train_path (str): Path to the training set.
-        validate_path (str): Path to the validation set.
-        test_path (str): Path to the test set.
+        train_path (str): Path to the directory which caches the training set. Defaults to transform_path/train.
+        validate_path (str): Path to the directory which caches the validation set. Defaults to
+            transform_path/validate.
+        test_path (str): Path to the directory which caches the test set. Defaults to transform_path/test.
+        chunk_size (int): Number of rows per chunk to stream the dataset out-of-core, or None to load it at once.
+        numerical_transform (str or callable): Name of the transformation method in NUMERICAL_TRANSFORMS, or a function
+            which transforms the numerical data of one column.
+        compact_dtype (bool): Whether to encode categorical data as the smallest integer type and numerical data as
+            float32, instead of float64.
+        num_workers (int): Number of processes to parse shards of the dataset in parallel, or None to parse it in one
+            process.
+        hash_buckets (int or list): Number of hash buckets to encode all or each categorical column by feature hashing
+            instead of the fit dictionary, or None to build the fit dictionary.
+        sketch_error (float): Maximum overestimation of categorical counts relative to the number of rows, to filter
+            categories approximately in bounded memory with a Count-Min Sketch, or None to count categories exactly.
+        time_column (str): String name associated with the column of timestamps to split the dataset in time order, or
+            None to split it by a hash of row numbers.
+        dtype_sample_size (int): Number of rows sampled to infer compact data types of columns missing from dtype_dict,
+            or None to let Pandas infer them from the whole dataset.
     """
 
     def __init__(self,
@@ -644,7 +2096,15 @@ class MovielensPreprocessor(BasePreprocessor):
                  validate_percentage=0.1,
                  train_path=None,
                  validate_path=None,
-                 test_path=None):
+                 test_path=None,
+                 chunk_size=None,
+                 numerical_transform='log',
+                 compact_dtype=False,
+                 num_workers=None,
+                 hash_buckets=None,
+                 sketch_error=None,
+                 time_column=None,
+                 dtype_sample_size=None):
 
         if columns is None:
             columns = ['UserID', 'MovieID', 'Rating', 'Timestamp']
@@ -675,7 +2135,15 @@ class MovielensPreprocessor(BasePreprocessor):
                          validate_percentage=validate_percentage,
                          train_path=train_path,
                          validate_path=validate_path,
-                         test_path=test_path)
+                         test_path=test_path,
+                         chunk_size=chunk_size,
+                         numerical_transform=numerical_transform,
+                         compact_dtype=compact_dtype,
+                         num_workers=num_workers,
+                         hash_buckets=hash_buckets,
+                         sketch_error=sketch_error,
+                         time_column=time_column,
+                         dtype_sample_size=dtype_sample_size)
 
     def preprocess(self):
         """ Apply all preprocessing steps to the Movielens 1M dataset.
@@ -684,18 +2152,91 @@ class MovielensPreprocessor(BasePreprocessor):
             6-tuple of ndarray training input data, training output data, validation input data, validation output data,
                 testing input data, and testing output data.
         """
+        # Step 0: Load the transformed dataset cached by a previous run.
+        splits = self.load_transformed()
+        if splits is not None:
+            return splits
+
         # Step 1: Load data for fit and transform categorical data.
         self.load_dataset()
 
         # Step 2: Transform categorical data.
         self.transform_categorical()
+        if self.data_df is None:
+            # Step 3: Split the dataset chunk by chunk.
+            return self.split_chunks(numerical=False)
+
+        # Step 3: Split LHS (X) and RHS (y) of the equation for training, validation, and testing.
+        splits = self.split_dataset()
+        self.save_transformed(splits)
+        return splits
 
-        # Step 3: Obtain LHS (X) and RHS (y) of the equation.
-        x = self.get_x()
-        y = self.get_y()
 
-        # Step 4: Split data for training, validation, and testing.
-        x_train, x_test, y_train, y_test = self.split_data(x, y, self.test_percentage)
-        x_train, x_validate, y_train, y_validate = self.split_data(x_train, y_train, self.validate_percentage)
+class Normalization(base.Preprocessor):
+    """ Preprocessor block standardizing each numerical feature to zero mean and unit variance.
+
+    # Note
+        The partial state of a batch is its count, mean and sum of squared differences, which merge combines in any
+            order, so PreprocessGraph fits the batches in parallel processes. The batches are transformed with
+            TensorFlow ops by transform_batch, instead of instance by instance through tf.py_function.
+
+    # Attributes
+        count (int): Number of fitted instances.
+        mean (ndarray): Mean of each feature.
+        m2 (ndarray): Sum of the squared differences from the mean of each feature.
+        std (ndarray): Standard deviation of each feature, or 1 for constant features, set by finalize.
+    """
 
-        return x_train, y_train, x_validate, y_validate, x_test, y_test
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+        self.std = None
+
+    def update(self, x, y=None):
+        x = np.asarray(nest.flatten(x)[0], dtype=np.float64)
+        self.merge((1, x, np.zeros_like(x)))
+
+    def update_batch(self, x, y=None):
+        x = np.asarray(x[0], dtype=np.float64)
+        mean = x.mean(axis=0)
+        return len(x), mean, np.square(x - mean).sum(axis=0)
+
+    def merge(self, partial_state):
+        count, mean, m2 = partial_state
+        if self.mean is None:
+            self.count, self.mean, self.m2 = count, mean, m2
+            return
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.m2 = self.m2 + m2 + np.square(delta) * (self.count * count / total)
+        self.count = total
+
+    def finalize(self):
+        std = np.sqrt(self.m2 / max(self.count, 1))
+        std[std == 0] = 1
+        self.std = std
+
+    def transform(self, x, fit=False):
+        return ((np.asarray(x, dtype=np.float64) - self.mean) / self.std).astype(np.float32)
+
+    def transform_batch(self, x, fit=False):
+        return (tf.cast(x, tf.float32) - tf.constant(self.mean, tf.float32)) / tf.constant(self.std, tf.float32)
+
+    def output_types(self):
+        return (tf.float32,)
+
+    @property
+    def output_shape(self):
+        return tf.TensorShape(self.mean.shape)
+
+    def get_weights(self):
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'std': self.std}
+
+    def set_weights(self, weights):
+        self.count = weights['count']
+        self.mean = weights['mean']
+        self.m2 = weights['m2']
+        self.std = weights['std']
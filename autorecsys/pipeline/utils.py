@@ -1,5 +1,6 @@
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import numpy as np
 import tensorflow as tf
 from tensorflow.keras.layers import Layer
 
@@ -29,3 +30,186 @@ class Bias(Layer):
             List of batch input tensors added with bias tensors.
         """
         return inputs + self.bias
+
+
+class FieldEmbedding(Layer):
+    """ This module builds a Keras layer which scales one embedding per numerical field by the value of the field.
+
+    # Arguments
+        num_of_fields (int): The number of numerical fields.
+        embedding_dim (int): The dimension of the embeddings.
+
+    # Attributes
+        embeddings (Tensor): The (num_of_fields, embedding_dim) embeddings of the fields.
+    """
+
+    def __init__(self, num_of_fields, embedding_dim):
+        super(FieldEmbedding, self).__init__()
+        embeddings_init = tf.keras.initializers.RandomUniform(minval=-0.05, maxval=0.05)
+        self.embeddings = tf.Variable(initial_value=embeddings_init(shape=(num_of_fields, embedding_dim),
+                                                                    dtype='float32'), trainable=True)
+
+    def call(self, inputs):
+        """ Scale the embeddings of the fields by the input values.
+
+        # Arguments
+            inputs (Tensor): Batch input tensor of shape (batch_size, num_of_fields).
+
+        # Returns
+            Batch tensor of shape (batch_size, num_of_fields, embedding_dim).
+        """
+        return tf.expand_dims(tf.cast(inputs, self.embeddings.dtype), -1) * self.embeddings
+
+
+class QuotientRemainderEmbedding(Layer):
+    """ This module builds a Keras layer of compositional embeddings of categorical fields by the quotient-remainder
+    trick, which represents each index by the elementwise product of the embeddings of its quotient and remainder.
+
+    # Note
+        An index i of a field with num_buckets buckets has the unique pair of quotient i // num_buckets and remainder
+            i % num_buckets, so each index keeps its own embedding although the two tables of a field of input_dim
+            indices only have ceil(input_dim / num_buckets) + num_buckets rows instead of input_dim rows. The tables
+            of all the fields are fused into one table for quotients and one for remainders.
+        The indices of the uncompressed fields are plain rows of the remainder table, without quotient rows.
+        Reference: https://arxiv.org/abs/1909.02107
+
+    # Arguments
+        input_dims (list): The numbers of indices of each field.
+        output_dim (int): The dimension of the embeddings.
+        num_buckets (list): The numbers of remainder buckets of each field, or None for the uncompressed fields.
+
+    # Attributes
+        quotient_embedding (Embedding): The embeddings of the quotients of all the compressed fields.
+        remainder_embedding (Embedding): The embeddings of the remainders of all the fields.
+    """
+
+    def __init__(self, input_dims, output_dim, num_buckets):
+        super(QuotientRemainderEmbedding, self).__init__()
+        input_dims = np.asarray(input_dims, dtype=np.int64)
+        self.compressed = np.array([buckets is not None for buckets in num_buckets])
+        self.num_buckets = np.array([input_dim if buckets is None else buckets
+                                     for input_dim, buckets in zip(input_dims, num_buckets)], dtype=np.int64)
+        quotient_dims = np.where(self.compressed, -(-input_dims // self.num_buckets), 0)
+        self.quotient_offsets = np.concatenate([[0], np.cumsum(quotient_dims[:-1])]).astype(np.int64)
+        self.remainder_offsets = np.concatenate([[0], np.cumsum(self.num_buckets[:-1])]).astype(np.int64)
+        # Quotient embeddings start around one, so that the products start like ordinary embeddings.
+        self.quotient_embedding = tf.keras.layers.Embedding(
+            int(quotient_dims.sum()), output_dim,
+            embeddings_initializer=tf.keras.initializers.RandomUniform(minval=0.95, maxval=1.05))
+        self.remainder_embedding = tf.keras.layers.Embedding(int(self.num_buckets.sum()), output_dim)
+
+    def call(self, inputs):
+        """ Look up the embeddings of the indices of the fields.
+
+        # Arguments
+            inputs (Tensor): Batch input tensor of shape (batch_size, num_of_fields) of indices.
+
+        # Returns
+            Batch tensor of shape (batch_size, num_of_fields, output_dim).
+        """
+        indices = tf.cast(inputs, tf.int64)
+        remainders = indices % self.num_buckets + self.remainder_offsets
+        embeddings = self.remainder_embedding(remainders)
+        if self.compressed.all():
+            return self.quotient_embedding(indices // self.num_buckets + self.quotient_offsets) * embeddings
+        # The uncompressed fields look up the first quotient row, which is then ignored.
+        quotients = tf.where(self.compressed, indices // self.num_buckets + self.quotient_offsets, 0)
+        return tf.where(self.compressed[:, np.newaxis], self.quotient_embedding(quotients) * embeddings, embeddings)
+
+
+class MixedDimensionEmbedding(Layer):
+    """ This module builds a Keras layer of mixed-dimension embeddings of a categorical field, where the indices are
+    split into consecutive blocks of embeddings of decreasing dimensions, projected up to a common dimension.
+
+    # Note
+        Categories indexed by descending frequency, as by BasePreprocessor, get larger embeddings when they are more
+            frequent. Each index is only looked up and projected in its own block.
+        Reference: https://arxiv.org/abs/1909.11810
+
+    # Arguments
+        block_sizes (list): The numbers of indices of each block, in the order of the indices.
+        block_dims (list): The dimensions of the embeddings of each block.
+        output_dim (int): The common dimension of the output embeddings.
+
+    # Attributes
+        embeddings (list): The Embedding layers of the blocks.
+        projections (list): The Dense layers projecting the embeddings of the blocks, or None for the blocks whose
+            dimension is output_dim.
+    """
+
+    def __init__(self, block_sizes, block_dims, output_dim):
+        super(MixedDimensionEmbedding, self).__init__()
+        self.block_starts = np.concatenate([[0], np.cumsum(block_sizes[:-1])]).astype(np.int64)
+        self.output_dim = output_dim
+        self.embeddings = [tf.keras.layers.Embedding(size, dim) for size, dim in zip(block_sizes, block_dims)]
+        self.projections = [None if dim == output_dim else tf.keras.layers.Dense(output_dim, use_bias=False)
+                            for dim in block_dims]
+
+    def call(self, inputs):
+        """ Look up the embeddings of the indices.
+
+        # Arguments
+            inputs (Tensor): Batch input tensor of indices.
+
+        # Returns
+            Batch tensor of the shape of the inputs with an extra last dimension of output_dim.
+        """
+        indices = tf.reshape(tf.cast(inputs, tf.int64), [-1])
+        block_ids = tf.reduce_sum(tf.cast(indices[:, tf.newaxis] >= self.block_starts[1:], tf.int32), axis=1)
+        num_blocks = len(self.embeddings)
+        block_indices = tf.dynamic_partition(indices - tf.gather(self.block_starts, block_ids), block_ids, num_blocks)
+        positions = tf.dynamic_partition(tf.range(tf.size(indices)), block_ids, num_blocks)
+        outputs = []
+        for embedding, projection, temp_indices in zip(self.embeddings, self.projections, block_indices):
+            output = embedding(temp_indices)
+            outputs.append(output if projection is None else projection(output))
+        output = tf.dynamic_stitch(positions, outputs)
+        output = tf.reshape(output, tf.concat([tf.shape(inputs), [self.output_dim]], axis=0))
+        output.set_shape(inputs.shape.concatenate(self.output_dim))
+        return output
+
+
+@tf.keras.utils.register_keras_serializable(package='autorecsys')
+class LazyAdam(tf.keras.optimizers.Adam):
+    """ This module builds a Keras Adam optimizer which only updates the rows of embedding tables looked up in a batch.
+
+    # Note
+        For sparse gradients, e.g., of Embedding layers, the moments and the weights of the rows which are not looked
+            up in the batch are left unchanged instead of decayed and updated, so the cost of a step scales with the
+            batch size instead of the table sizes. Dense gradients are applied as by Adam.
+        Reference: https://www.tensorflow.org/addons/api_docs/python/tfa/optimizers/LazyAdam
+
+    # Arguments
+        name (str): The name of the optimizer.
+        kwargs (dict): Other arguments of Adam, except amsgrad.
+    """
+
+    def __init__(self, name='LazyAdam', **kwargs):
+        if kwargs.get('amsgrad'):
+            raise ValueError('LazyAdam does not support amsgrad.')
+        super(LazyAdam, self).__init__(name=name, **kwargs)
+
+    def update_step(self, gradient, variable):
+        """ Update a variable with its gradient.
+
+        # Arguments
+            gradient (Tensor or IndexedSlices): The gradient of the variable, whose indices are unique if sparse.
+            variable (Variable): The variable to update.
+        """
+        if not isinstance(gradient, tf.IndexedSlices):
+            return super(LazyAdam, self).update_step(gradient, variable)
+        lr = tf.cast(self.learning_rate, variable.dtype)
+        local_step = tf.cast(self.iterations + 1, variable.dtype)
+        beta_1_power = tf.pow(tf.cast(self.beta_1, variable.dtype), local_step)
+        beta_2_power = tf.pow(tf.cast(self.beta_2, variable.dtype), local_step)
+        alpha = lr * tf.sqrt(1 - beta_2_power) / (1 - beta_1_power)
+
+        var_key = self._var_key(variable)
+        m = self._momentums[self._index_dict[var_key]]
+        v = self._velocities[self._index_dict[var_key]]
+        indices = gradient.indices
+        m_rows = self.beta_1 * tf.gather(m, indices) + (1 - self.beta_1) * gradient.values
+        v_rows = self.beta_2 * tf.gather(v, indices) + (1 - self.beta_2) * tf.square(gradient.values)
+        m.scatter_update(tf.IndexedSlices(m_rows, indices))
+        v.scatter_update(tf.IndexedSlices(v_rows, indices))
+        variable.scatter_sub(tf.IndexedSlices(alpha * m_rows / (tf.sqrt(v_rows) + self.epsilon), indices))
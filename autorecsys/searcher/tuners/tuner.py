@@ -14,9 +14,12 @@ import shutil
 import logging
 import collections
 
+import pickle
+import hashlib
 import tensorflow as tf
 import numpy as np
 from autorecsys.utils import display
+from autorecsys.utils.cache import DatasetCache, fingerprint_data, materialize_dataset
 from autorecsys.utils.common import create_directory
 from autorecsys.searcher.core import trial as trial_module
 from autorecsys.searcher.core import oracle as oracle_module
@@ -642,14 +645,39 @@ class MultiExecutionTuner(Tuner):
 
 
 class PipeTuner(MultiExecutionTuner):
+    """Tuner of a HyperGraph, whose Preprocessors are fitted to the data in each trial.
 
-    def __init__(self, oracle, hypergraph, fit_on_val_data=False, **kwargs):
+    # Arguments
+        oracle: Instance of Oracle class.
+        hypergraph: Instance of HyperGraph class.
+        fit_on_val_data: Boolean. Whether to fit the best model on the validation data too.
+        preprocess_cache_size: Int. Number of preprocessed datasets kept in memory,
+            so that trials with the same preprocessing hyperparameters reuse them.
+        preprocess_cache_dir: String. Directory to also keep the preprocessed
+            datasets on disk, e.g. to share them between searches. Defaults to
+            None to keep them only in memory.
+        preprocess_batch_size: Int. Number of instances transformed at once by the
+            Preprocessors supporting transform_batch, or fitted at once by those
+            supporting update_batch.
+        preprocess_num_workers: Int. Number of processes to fit the batches in
+            parallel. Defaults to None to fit them in the current process.
+        **kwargs: Keyword arguments relevant to all `Tuner` subclasses.
+    """
+
+    def __init__(self, oracle, hypergraph, fit_on_val_data=False, preprocess_cache_size=4,
+                 preprocess_cache_dir=None, preprocess_batch_size=1024,
+                 preprocess_num_workers=None, **kwargs):
         super().__init__(oracle, **kwargs)
         self.oracle = oracle
         self.hypergraph = hypergraph
         self.need_fully_train = False
         self.best_hp = None
         self.fit_on_val_data = fit_on_val_data
+        self.preprocess_cache = DatasetCache(max_size=preprocess_cache_size,
+                                             directory=preprocess_cache_dir)
+        self.preprocess_batch_size = preprocess_batch_size
+        self.preprocess_num_workers = preprocess_num_workers
+        self.preprocess_graph = None
 
     def run_trial(self, trial, *fit_args, **fit_kwargs):
         """Preprocess the x and y before calling the base run_trial."""
@@ -659,9 +687,12 @@ class PipeTuner(MultiExecutionTuner):
         new_fit_kwargs = copy.copy(fit_kwargs)
 
         # Preprocess the dataset and set the shapes of the HyperNodes.
-        self.hypermodel = self.hypergraph.build_graphs(trial.hyperparameters)
+        plain_graph = self.hypergraph.hyper_build(trial.hyperparameters)
+        self.hypermodel = plain_graph.build_keras_graph()
+        self.preprocess_graph = plain_graph.build_preprocess_graph()
 
         self._prepare_run(new_fit_kwargs)
+        self._preprocess(self.preprocess_graph, trial.hyperparameters, new_fit_kwargs)
 
         model = super().run_trial(trial, **new_fit_kwargs)
         return model
@@ -675,9 +706,125 @@ class PipeTuner(MultiExecutionTuner):
         fit_kwargs['validation_data'] = validation_data
         fit_kwargs['batch_size'] = fit_kwargs.get('batch_size', 32)
 
+    def _get_preprocess_key(self, preprocess_graph, hp, fingerprint):
+        """Get the cache key of the preprocessed data.
+        # Arguments
+            preprocess_graph: PreprocessGraph. The preprocessors of the trial.
+            hp: HyperParameters. The hyperparameters of the trial.
+            fingerprint: String. The fingerprint of the input data.
+        # Returns
+            A string, which only depends on the data and the hyperparameters under
+            the name scopes of the preprocessors.
+        """
+        digest = hashlib.sha1(fingerprint.encode())
+        for block in preprocess_graph._blocks:
+            values = sorted((name, value) for name, value in hp.values.items()
+                            if name.startswith(block.name + '/'))
+            # Pickle the state, since the repr of a large array elides its middle values.
+            digest.update(pickle.dumps((type(block).__name__, sorted(block.get_state().items()),
+                                        values)))
+        return digest.hexdigest()
+
+    def _preprocess(self, preprocess_graph, hp, fit_kwargs):
+        """Replace the data in the fit kwargs by the data preprocessed by the Preprocessors.
+        The preprocessed data are cached with the fitted Preprocessors, so trials
+        which only differ in the hyperparameters of the Keras model reuse them.
+        # Arguments
+            preprocess_graph: PreprocessGraph. The preprocessors of the trial.
+            hp: HyperParameters. The hyperparameters of the trial.
+            fit_kwargs: Dict. The fit kwargs with x, y and validation_data.
+        """
+        if not preprocess_graph._blocks:
+            return
+        x_val, y_val = fit_kwargs['validation_data']
+        fingerprint = fingerprint_data([fit_kwargs['x'], fit_kwargs['y'], x_val, y_val])
+        key = None
+        entry = None
+        if fingerprint is not None:
+            key = self._get_preprocess_key(preprocess_graph, hp, fingerprint)
+            entry = self.preprocess_cache.get(key)
+        if entry is None:
+            dataset = self._to_dataset(preprocess_graph, fit_kwargs['x'], fit_kwargs['y'], fit=True)
+            validation_data = None
+            if x_val is not None:
+                validation_data = self._to_dataset(preprocess_graph, x_val, y_val)
+            dataset, validation_data = preprocess_graph.preprocess(
+                dataset, validation_data=validation_data, fit=True,
+                batch_size=self.preprocess_batch_size,
+                num_workers=self.preprocess_num_workers)
+            entry = {
+                'state': preprocess_graph.get_state(),
+                'train': self._materialize(preprocess_graph, dataset),
+                'validation': None if validation_data is None else self._materialize(preprocess_graph,
+                                                                                     validation_data)}
+            if key is not None:
+                self.preprocess_cache.put(key, entry)
+        else:
+            # Restore the fitted Preprocessors and the shapes of the Keras model inputs.
+            preprocess_graph.set_state(entry['state'])
+
+        fit_kwargs['x'], fit_kwargs['y'] = entry['train']
+        if entry['validation'] is not None:
+            fit_kwargs['validation_data'] = entry['validation']
+
+    @staticmethod
+    def _materialize(preprocess_graph, dataset):
+        x, y = materialize_dataset(dataset)
+        # The datasets are in the order of the node ids of the PreprocessGraph.
+        node_ids = sorted(preprocess_graph._node_to_id[node] for node in preprocess_graph.outputs)
+        return [x[node_ids.index(preprocess_graph._node_to_id[node])] for node in preprocess_graph.outputs], y
+
+    @staticmethod
+    def transform(preprocess_graph, x, batch_size=1024):
+        """Transform the data with the Preprocessors fitted in a trial into the inputs of its Keras model.
+        # Arguments
+            preprocess_graph: PreprocessGraph. The fitted Preprocessors, e.g., returned by
+                load_preprocess_graph. If None, x is returned unchanged.
+            x: The features, in the same format as those searched on.
+            batch_size: Int. Number of instances transformed at once by the
+                Preprocessors supporting transform_batch.
+        # Returns
+            A list of numpy.ndarray, one for each input of the Keras model.
+        """
+        if preprocess_graph is None:
+            return x
+        num_rows = len(x[0] if isinstance(x, (list, tuple)) else x)
+        dataset = PipeTuner._to_dataset(preprocess_graph, x, np.zeros(num_rows))
+        dataset, _ = preprocess_graph.preprocess(dataset, batch_size=batch_size)
+        return PipeTuner._materialize(preprocess_graph, dataset)[0]
+
+    @staticmethod
+    def _to_dataset(preprocess_graph, x, y, fit=False):
+        x = list(x) if isinstance(x, (list, tuple)) else [x]
+        datasets = []
+        for input_node, temp_x in zip(preprocess_graph.inputs, x):
+            if fit:
+                datasets.append(input_node.fit_transform(temp_x))
+            else:
+                datasets.append(input_node.transform(temp_x))
+        x_dataset = tf.data.Dataset.zip(tuple(datasets)) if len(datasets) > 1 else datasets[0]
+        y_dataset = y if isinstance(y, tf.data.Dataset) else tf.data.Dataset.from_tensor_slices(np.asarray(y))
+        return tf.data.Dataset.zip((x_dataset, y_dataset))
+
     def save_weights(self, trial, pipe):
         trial_dir = self.get_trial_dir(trial.trial_id)
         tf.keras.models.save_model(pipe, trial_dir)
+        if self.preprocess_graph is not None and self.preprocess_graph._blocks:
+            self.preprocess_graph.save(self._get_save_path(trial, 'preprocess_graph'))
+
+    def load_preprocess_graph(self, trial):
+        """Load the Preprocessors fitted in a history trial.
+        # Arguments
+            trial: Trial. The trial to be loaded.
+        # Returns
+            PreprocessGraph, or None if the HyperGraph has no Preprocessor.
+        """
+        path = self._get_save_path(trial, 'preprocess_graph')
+        if not tf.io.gfile.exists(path):
+            return None
+        preprocess_graph = self.hypergraph.hyper_build(trial.hyperparameters).build_preprocess_graph()
+        preprocess_graph.reload(path)
+        return preprocess_graph
 
     def load_model(self, trial):
         """Load the model in a history trial.
@@ -693,16 +840,14 @@ class PipeTuner(MultiExecutionTuner):
 
     def get_best_model(self):
         """Load the best PreprocessGraph and Keras model.
-        It is mainly used by the predict and evaluate function of AutoModel.
+        It is mainly used by the predict and evaluate function of Search. The
+        model predicts on the data transformed by transform with the PreprocessGraph.
         # Returns
-            tf.keras.Model
+            Tuple of (PreprocessGraph, tf.keras.Model). The PreprocessGraph is None
+            if the HyperGraph has no Preprocessor.
         """
-        keras_graph = self.hypergraph.build_graphs(
-            self.best_hp)
-        keras_graph.reload(self.best_keras_graph_path)
-        model = keras_graph.build(self.best_hp)
-        model.load_weights(self.best_model_path)
-        return model
+        best_trial = self.oracle.get_best_trials(1)[0]
+        return self.load_preprocess_graph(best_trial), self.load_model(best_trial)
 
     @property
     def best_keras_graph_path(self):
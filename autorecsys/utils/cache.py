@@ -0,0 +1,140 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+import hashlib
+import collections
+import numpy as np
+import pandas as pd
+
+from autorecsys.utils.common import save_pickle, load_pickle
+
+
+def fingerprint_data(data):
+    """ Get a fingerprint of the content of input data, which changes whenever the data change.
+
+    # Arguments
+        data (object): None, ndarray, DataFrame, Series, or a list or tuple of them.
+
+    # Returns
+        String hexadecimal digest of the data, or None if the data contain other objects, e.g., tf.data.Dataset,
+            whose content cannot be fingerprinted without iterating over them.
+    """
+    digest = hashlib.sha1()
+
+    def update(value):
+        if value is None:
+            digest.update(b'None')
+        elif isinstance(value, (list, tuple)):
+            digest.update('{}{}'.format(type(value).__name__, len(value)).encode())
+            return all(update(element) for element in value)
+        elif isinstance(value, (pd.DataFrame, pd.Series)):
+            columns = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+            digest.update(repr((type(value).__name__, list(columns), value.shape)).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=False).values)
+        elif isinstance(value, np.ndarray):
+            digest.update(repr((value.dtype.str, value.shape)).encode())
+            if value.dtype == object:
+                digest.update(pd.util.hash_array(value.ravel()))
+            else:
+                digest.update(np.ascontiguousarray(value).view(np.uint8))
+        else:
+            return False
+        return True
+
+    return digest.hexdigest() if update(data) else None
+
+
+def materialize_dataset(dataset, batch_size=8192):
+    """ Compute all the elements of a dataset of (x, y) pairs into numpy arrays.
+
+    # Arguments
+        dataset (tf.data.Dataset): Dataset whose elements are pairs of a tuple of features and a target.
+        batch_size (int): Number of elements computed at a time.
+
+    # Returns
+        Tuple of a tuple of ndarray features and an ndarray target.
+    """
+    xs, ys = [], []
+    for x, y in dataset.batch(batch_size).as_numpy_iterator():
+        xs.append(x)
+        ys.append(y)
+    x = tuple(np.concatenate(column) for column in zip(*xs))
+    return x, np.concatenate(ys)
+
+
+class DatasetCache(object):
+    """ Cache of preprocessed datasets, in memory with a least-recently-used bound and optionally on disk.
+
+    # Note
+        Entries evicted from memory are still read back from disk if a directory is set, so the directory grows with
+            the number of distinct keys and should be removed by the user when no longer needed.
+
+    # Arguments
+        max_size (int): Maximum number of entries kept in memory, or 0 to keep none.
+        directory (str): Directory to save the entries as pickle files, or None to keep them only in memory.
+
+    # Attributes
+        hits (int): Number of lookups which found the entry.
+        misses (int): Number of lookups which did not find the entry.
+    """
+
+    def __init__(self, max_size=4, directory=None):
+        self.max_size = max_size
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        if directory is not None and not os.path.exists(directory):
+            os.makedirs(directory)
+
+    def _get_path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def _keep(self, key, entry):
+        if self.max_size <= 0:
+            return
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """ Get a cached entry and mark it as the most recently used.
+
+        # Arguments
+            key (str): Key of the entry.
+
+        # Returns
+            The cached entry, or None if the key is not cached.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        if self.directory is not None and os.path.exists(self._get_path(key)):
+            entry = load_pickle(self._get_path(key))
+            self._keep(key, entry)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        """ Cache an entry, evicting the least recently used entries from memory beyond max_size.
+
+        # Arguments
+            key (str): Key of the entry.
+            entry (object): Picklable entry.
+        """
+        self._keep(key, entry)
+        if self.directory is not None:
+            # Write to a temporary file first so that an interrupted write does not leave a corrupt entry.
+            path = self._get_path(key)
+            save_pickle(path + '.tmp', entry)
+            os.replace(path + '.tmp', path)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and os.path.exists(self._get_path(key)))
+
+    def __len__(self):
+        return len(self._entries)
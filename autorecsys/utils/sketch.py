@@ -0,0 +1,102 @@
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import math
+import numpy as np
+import pandas as pd
+
+
+class CountMinSketch(object):
+    """ Count-Min Sketch to approximately count the occurrences of categories in bounded memory.
+
+    # Note
+        The estimated count of a category is never less than its true count, and exceeds it by at most
+            error * total_count with probability 1 - delta, where total_count is the number of counted occurrences.
+        The sketch takes ceil(e / error) * ceil(ln(1 / delta)) counters, no matter how many categories are counted.
+        Reference: http://dimacs.rutgers.edu/~graham/pubs/papers/cm-full.pdf
+
+    # Arguments
+        error (float): Maximum overestimation of counts relative to the total count.
+        delta (float): Probability that the overestimation exceeds the error.
+        seed (int): Seed of the hash functions.
+
+    # Attributes
+        error (float): Maximum overestimation of counts relative to the total count.
+        delta (float): Probability that the overestimation exceeds the error.
+        width (int): Number of counters per hash function.
+        depth (int): Number of hash functions.
+        table (ndarray): (depth, width) matrix of counters.
+        total_count (int): Number of counted occurrences.
+    """
+
+    def __init__(self, error=1e-4, delta=0.01, seed=0):
+        self.error = error
+        self.delta = delta
+        self.width = int(math.ceil(math.e / error))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total_count = 0
+        # Parameters of the multiply-shift hash functions, which must be odd.
+        rng = np.random.RandomState(seed)
+        self._multipliers = rng.randint(0, 2 ** 62, size=self.depth, dtype=np.int64).astype(np.uint64) * 2 + 1
+        self._offsets = rng.randint(0, 2 ** 62, size=self.depth, dtype=np.int64).astype(np.uint64)
+
+    def _buckets(self, categories):
+        """ Hash categories to one counter per hash function.
+
+        # Note
+            Categories are hashed by value, so a category must be of the same data type whenever it is counted.
+
+        # Arguments
+            categories (array-like): Distinct categories.
+
+        # Returns
+            (depth, N) matrix of counter positions, where N is the number of categories.
+        """
+        hashes = pd.util.hash_array(np.asarray(categories), categorize=False)
+        mixed = hashes[np.newaxis, :] * self._multipliers[:, np.newaxis] + self._offsets[:, np.newaxis]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.intp)
+
+    def update(self, categories, counts):
+        """ Count occurrences of categories.
+
+        # Arguments
+            categories (array-like): Distinct categories.
+            counts (array-like): Number of occurrences of each category.
+
+        # Returns
+            ndarray estimated number of occurrences of each category after the update.
+        """
+        counts = np.asarray(counts, dtype=np.int64)
+        buckets = self._buckets(categories)
+        for row, row_buckets in zip(self.table, buckets):
+            row += np.bincount(row_buckets, weights=counts, minlength=self.width).astype(self.table.dtype)
+        self.total_count += int(counts.sum())
+        return np.min(self.table[np.arange(self.depth)[:, np.newaxis], buckets], axis=0)
+
+    def estimate(self, categories):
+        """ Estimate the counts of categories.
+
+        # Arguments
+            categories (array-like): Distinct categories.
+
+        # Returns
+            ndarray estimated number of occurrences of each category.
+        """
+        buckets = self._buckets(categories)
+        return np.min(self.table[np.arange(self.depth)[:, np.newaxis], buckets], axis=0)
+
+    def error_bound(self):
+        """ Get the maximum overestimation of counts, which holds with probability 1 - delta.
+
+        # Returns
+            Float maximum overestimation of counts.
+        """
+        return self.error * self.total_count
+
+    def memory_usage(self):
+        """ Get the memory used by the counters.
+
+        # Returns
+            Integer number of bytes.
+        """
+        return self.table.nbytes
@@ -11,7 +11,21 @@ PAGES = {
         'autorecsys.pipeline.preprocessor.BasePreprocessor',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.format_dataset',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.load_dataset',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.infer_dtype_dict',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.get_dtype_dict',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.read_dataset',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.load_dataset_parallel',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.iter_dataset',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.get_relevant_columns',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.iter_columnar',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.transform_categorical',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.count_frequent_categories',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.save_fit_dict',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.load_fit_dict',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.encode_categorical',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.get_unseen_index',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.extend_fit_dict',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.apply_fit_dict',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.transform_numerical',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.get_hash_size',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.get_x',
@@ -21,6 +35,14 @@ PAGES = {
         'autorecsys.pipeline.preprocessor.BasePreprocessor.get_numerical_count',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.get_categorical_count',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.split_data',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.split_index',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.split_dataset',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.get_source_paths',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.get_split_paths',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.get_transform_key',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.save_transformed',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.load_transformed',
+        'autorecsys.pipeline.preprocessor.BasePreprocessor.append_dataset',
         'autorecsys.pipeline.preprocessor.BasePreprocessor.preprocess',
         'autorecsys.pipeline.preprocessor.AvazuPreprocessor',
         'autorecsys.pipeline.preprocessor.AvazuPreprocessor.preprocess',
@@ -31,6 +53,7 @@ PAGES = {
         'autorecsys.pipeline.preprocessor.NetflixPrizePreprocessor.preprocess',
         'autorecsys.pipeline.preprocessor.MovielensPreprocessor',
         'autorecsys.pipeline.preprocessor.MovielensPreprocessor.preprocess',
+        'autorecsys.pipeline.preprocessor.Normalization',
     ],
     'node.md': [
         'autorecsys.pipeline.node.Input',
@@ -39,6 +62,7 @@ PAGES = {
         'autorecsys.pipeline.node.StructuredDataInput',
         'autorecsys.pipeline.node.StructuredDataInput.get_state',
         'autorecsys.pipeline.node.StructuredDataInput.set_state',
+        'autorecsys.pipeline.node.StructuredDataInput.build',
         'autorecsys.pipeline.node.StructuredDataInput.update',
         'autorecsys.pipeline.node.StructuredDataInput.infer_column_types',
     ],
@@ -47,6 +71,8 @@ PAGES = {
         'autorecsys.pipeline.mapper.LatentFactorMapper.get_state',
         'autorecsys.pipeline.mapper.LatentFactorMapper.set_state',
         'autorecsys.pipeline.mapper.LatentFactorMapper.build',
+        'autorecsys.pipeline.mapper.LatentFactorMapper.from_preprocessor',
+        'autorecsys.pipeline.mapper.LatentFactorMapper.get_embedding_bytes',
         'autorecsys.pipeline.mapper.DenseFeatureMapper',
         'autorecsys.pipeline.mapper.DenseFeatureMapper.get_state',
         'autorecsys.pipeline.mapper.DenseFeatureMapper.set_state',
@@ -55,6 +81,8 @@ PAGES = {
         'autorecsys.pipeline.mapper.SparseFeatureMapper.get_state',
         'autorecsys.pipeline.mapper.SparseFeatureMapper.set_state',
         'autorecsys.pipeline.mapper.SparseFeatureMapper.build',
+        'autorecsys.pipeline.mapper.SparseFeatureMapper.from_preprocessor',
+        'autorecsys.pipeline.mapper.SparseFeatureMapper.get_embedding_bytes',
     ],
     'interactor.md': [
         'autorecsys.pipeline.interactor.RandomSelectInteraction',
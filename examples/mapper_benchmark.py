@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import os
+
+os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'
+
+import argparse
+import time
+
+import logging
+import numpy as np
+import tensorflow as tf
+from autorecsys.pipeline.mapper import DenseFeatureMapper, SparseFeatureMapper
+from autorecsys.pipeline.utils import FieldEmbedding
+from autorecsys.searcher.core import hyperparameters as hp_module
+
+# logging setting
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class PerColumnDenseFeatureMapper(DenseFeatureMapper):
+    """ DenseFeatureMapper with one layer and one multiplication per column, as before it was vectorized. """
+
+    def build(self, hp, inputs=None):
+        embedding_dim = self.embedding_dim or hp.Choice('embedding_dim', [8, 16], default=8)
+        return tf.concat([FieldEmbedding(1, embedding_dim)(inputs[0][:, col_id:col_id + 1])
+                          for col_id in range(self.num_of_fields)], axis=1)
+
+
+def build_model(mapper, num_of_fields):
+    """ Build a logistic regression over the flattened embeddings of the mapper. """
+    inputs = tf.keras.Input(shape=(num_of_fields,))
+    embeddings = mapper.build(hp_module.HyperParameters(), [inputs])
+    outputs = tf.keras.layers.Dense(1, activation='sigmoid')(tf.keras.layers.Flatten()(embeddings))
+    return tf.keras.Model(inputs, outputs)
+
+
+def timeit(func, steps, repeat):
+    """ Return the best wall-clock time of running func steps times. """
+    func().numpy()  # trace the function
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.time()
+        for _ in range(steps):
+            result = func()
+        result.numpy()
+        best = min(best, time.time() - start_time)
+    return best
+
+
+def benchmark_mapper(name, mapper, x, y, steps, repeat):
+    model = build_model(mapper, x.shape[1])
+    optimizer = tf.keras.optimizers.Adam()
+    loss_fn = tf.keras.losses.BinaryCrossentropy()
+    x, y = tf.constant(x), tf.constant(y)
+
+    @tf.function
+    def predict_step():
+        return model(x)
+
+    @tf.function
+    def gradient_step():
+        with tf.GradientTape() as tape:
+            loss = loss_fn(y, model(x, training=True)[:, 0])
+        return loss, tape.gradient(loss, model.trainable_variables)
+
+    @tf.function
+    def train_step():
+        loss, gradients = gradient_step()
+        optimizer.apply_gradients(zip(gradients, model.trainable_variables))
+        return loss
+
+    # Examples per second of the forward pass, the backward pass included, and the optimizer update included.
+    throughputs = [steps * len(x) / timeit(step, steps, repeat)
+                   for step in (predict_step, lambda: gradient_step()[0], train_step)]
+    logger.info('{:>8}: {} variables, {:.0f} forward, {:.0f} forward+backward, {:.0f} Adam step examples/s'.format(
+        name, len(model.trainable_variables), *throughputs))
+
+
+if __name__ == '__main__':
+    # parse args
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-num_of_fields', type=int, help='number of sparse feature columns', default=26)
+    parser.add_argument('-num_of_dense_fields', type=int, help='number of dense feature columns', default=13)
+    parser.add_argument('-hash_size', type=int, help='number of categories of each column', default=10000)
+    parser.add_argument('-embedding_dim', type=int, help='dimension of the embeddings', default=16)
+    parser.add_argument('-batch_size', type=int, help='number of examples per step', default=2048)
+    parser.add_argument('-steps', type=int, help='number of measured steps', default=50)
+    parser.add_argument('-repeat', type=int, help='number of repeated runs', default=3)
+    args = parser.parse_args()
+    print("args:", args)
+
+    # Criteo-like categorical indices, skewed towards the frequent categories.
+    rows = args.batch_size
+    rng = np.random.RandomState(0)
+    x = np.minimum(rng.zipf(1.2, (rows, args.num_of_fields)) - 1, args.hash_size - 1).astype(np.float32)
+    y = rng.randint(0, 2, rows).astype(np.float32)
+
+    for fused in (False, True):
+        mapper = SparseFeatureMapper(num_of_fields=args.num_of_fields, hash_size=args.hash_size,
+                                     embedding_dim=args.embedding_dim, fused=fused)
+        benchmark_mapper('fused' if fused else 'default', mapper, x, y, args.steps, args.repeat)
+
+    # Criteo-like numerical values after the log transformation.
+    x = np.log1p(rng.lognormal(2, 2, (rows, args.num_of_dense_fields))).astype(np.float32)
+    for name, mapper_class in (('column', PerColumnDenseFeatureMapper), ('dense', DenseFeatureMapper)):
+        mapper = mapper_class(num_of_fields=args.num_of_dense_fields, embedding_dim=args.embedding_dim)
+        benchmark_mapper(name, mapper, x, y, args.steps, args.repeat)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import math
+import time
+import tracemalloc
+
+import logging
+import numpy as np
+import pandas as pd
+from autorecsys.pipeline.preprocessor import NUMERICAL_TRANSFORMS, CriteoPreprocessor, factorize_categories, \
+    index_categories
+
+# logging setting
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def legacy_scale_by_log(num):
+    """ Per-element log transformation used by transform_numerical() before it was vectorized. """
+    return math.log(float(num)) ** 2 if num > 2 else num
+
+
+def timeit(func, repeat):
+    """ Return the best wall-clock time of running func. """
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.time()
+        func()
+        best = min(best, time.time() - start_time)
+    return best
+
+
+def benchmark_numerical(rows, repeat):
+    # Criteo numerical columns are heavy-tailed integer counts.
+    values = np.floor(np.random.lognormal(2, 2, rows))
+    column = pd.Series(values)
+
+    legacy_time = timeit(lambda: column.map(legacy_scale_by_log), repeat)
+    logger.info('numerical transform {:>10}: {:.4f}s'.format('legacy', legacy_time))
+    assert np.array_equal(column.map(legacy_scale_by_log).values, NUMERICAL_TRANSFORMS['log'](values))
+    for name, transform in NUMERICAL_TRANSFORMS.items():
+        vectorized_time = timeit(lambda: transform(values), repeat)
+        logger.info('numerical transform {:>10}: {:.4f}s ({:.1f}x)'.format(
+            name, vectorized_time, legacy_time / vectorized_time))
+
+
+def benchmark_categorical_filter(rows, repeat, chunk_size, categorical_filter, sketch_error):
+    # Categories such as device_ip follow a Zipfian distribution with a long tail of one-off values.
+    column = pd.Series(np.random.zipf(1.2, rows).astype(str), dtype=object)
+    chunks = [column.iloc[i:i + chunk_size].to_frame('c') for i in range(0, rows, chunk_size)]
+
+    def exact():
+        counts = None
+        for chunk_df in chunks:
+            _, chunk_counts = factorize_categories(chunk_df['c'])
+            counts = chunk_counts if counts is None else \
+                pd.concat([counts, chunk_counts]).groupby(level=0, sort=False).sum()
+        return index_categories(counts, categorical_filter)[1], counts
+
+    preprocessor = CriteoPreprocessor(categorical_columns=['c'], categorical_filter=categorical_filter,
+                                      sketch_error=sketch_error)
+
+    def approximate():
+        return preprocessor.count_frequent_categories(chunks)['c']
+
+    exact_time = timeit(exact, repeat)
+    approximate_time = timeit(approximate, repeat)
+    fit, counts = exact()
+    estimates = approximate()
+    sketch = preprocessor.category_sketches['c']
+
+    # Peak memory of the counting pass, including the kept counts.
+    tracemalloc.start()
+    exact()
+    exact_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.reset_peak()
+    approximate()
+    approximate_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    frequent = counts[counts > categorical_filter]
+    logger.info('categorical filter {:>10}: {:.4f}s, {:.1f} MB peak, {} categories counted, {} frequent'.format(
+        'exact', exact_time, exact_memory / 2 ** 20, len(counts), len(frequent)))
+    logger.info('categorical filter {:>10}: {:.4f}s, {:.1f} MB peak, {:.1f} MB sketch, {} candidates kept'.format(
+        'sketch', approximate_time, approximate_memory / 2 ** 20, sketch.memory_usage() / 2 ** 20, len(estimates)))
+    overestimates = estimates.values - counts[estimates.index].values
+    logger.info('sketch error bound {:.1f} (with probability {:.2f}), max observed error {}, '
+                'missed frequent categories {}, false positives {}'.format(
+                    sketch.error_bound(), 1 - sketch.delta, overestimates.max(),
+                    len(frequent.index.difference(estimates.index)), len(estimates.index.difference(frequent.index))))
+
+
+if __name__ == '__main__':
+    # parse args
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-rows', type=int, help='number of rows of the synthetic column', default=1000000)
+    parser.add_argument('-repeat', type=int, help='number of repeated runs', default=3)
+    parser.add_argument('-chunk_size', type=int, help='number of rows per chunk to count categories', default=1000000)
+    parser.add_argument('-categorical_filter', type=int, help='filter of infrequent categories', default=100)
+    parser.add_argument('-sketch_error', type=float, help='relative error of approximate counts', default=1e-5)
+    args = parser.parse_args()
+    print("args:", args)
+
+    benchmark_numerical(args.rows, args.repeat)
+    benchmark_categorical_filter(args.rows, args.repeat, args.chunk_size, args.categorical_filter, args.sketch_error)
@@ -1,8 +1,9 @@
 import pytest
+import numpy as np
 import tensorflow as tf
 from autorecsys.searcher.core import hyperparameters as hp_module
 
-from autorecsys.pipeline import Input, MLPInteraction, ConcatenateInteraction, RatingPredictionOptimizer 
+from autorecsys.pipeline import base, Input, MLPInteraction, ConcatenateInteraction, RatingPredictionOptimizer 
 from autorecsys.pipeline import graph as graph_module
 
 # TODO: we don't support overwrite hp for graph now.
@@ -82,3 +83,86 @@ def test_graph_basics():
     assert model.input_shape == (None, 30)
     assert model.output_shape == (None, )
 
+
+def test_graph_optimizer_choices():
+    input_node = Input(shape=(30,))
+    output_node = MLPInteraction()(input_node)
+    output_node = RatingPredictionOptimizer()(output_node)
+    graph = graph_module.PlainGraph(input_node, output_node)
+
+    # the optimizers updating only the embeddings looked up are selectable
+    for optimizer, optimizer_class in (('lazy_adam', 'LazyAdam'), ('adagrad', 'Adagrad')):
+        hp = hp_module.HyperParameters()
+        hp.Fixed('optimizer', optimizer)
+        model = graph.build_keras_graph().build(hp)
+        assert type(model.optimizer).__name__ == optimizer_class
+
+
+class MaxAbsScaler(base.Preprocessor):
+    """Scale each feature by its maximum absolute value, by instances or by batches."""
+
+    def __init__(self, batched=True, **kwargs):
+        super().__init__(**kwargs)
+        self.batched = batched
+        self.max_abs = None
+
+    def update(self, x, y=None):
+        value = np.abs(tf.nest.flatten(x)[0].numpy())
+        self.max_abs = value if self.max_abs is None else np.maximum(self.max_abs, value)
+
+    def update_batch(self, x, y=None):
+        return np.abs(x[0]).max(axis=0)
+
+    def merge(self, partial_state):
+        self.max_abs = partial_state if self.max_abs is None else np.maximum(self.max_abs, partial_state)
+
+    def supports_batch_update(self):
+        return self.batched
+
+    def transform(self, x, fit=False):
+        return (x.numpy() / self.max_abs).astype(np.float32)
+
+    def transform_batch(self, x, fit=False):
+        if not self.batched:
+            raise NotImplementedError
+        return tf.cast(x, tf.float32) / tf.constant(self.max_abs, tf.float32)
+
+    def supports_batch(self):
+        return self.batched
+
+    def output_types(self):
+        return (tf.float32,)
+
+    @property
+    def output_shape(self):
+        return tf.TensorShape(self.max_abs.shape)
+
+
+def test_preprocess_graph_batch():
+    x = np.random.RandomState(0).rand(100, 4) * 10
+    dataset = tf.data.Dataset.from_tensor_slices((x, np.zeros(100)))
+    results = []
+    for batched, batch_size in [(False, None), (True, 32), (False, 32)]:
+        input_node = Input(shape=[4])
+        output_node = MaxAbsScaler(batched=batched)(input_node)
+        output_node = MaxAbsScaler(batched=batched)(output_node)
+        graph = graph_module.PreprocessGraph(input_node, output_node)
+        output, _ = graph.preprocess(dataset, fit=True, batch_size=batch_size)
+        assert output.element_spec[0][0].shape == (4,)
+        results.append(np.stack([element[0][0].numpy() for element in output]))
+    assert np.allclose(results[0], x / x.max(axis=0))
+    assert np.allclose(results[1], results[0])
+    assert np.allclose(results[2], results[0])
+
+
+def test_preprocess_graph_fit_batch():
+    x = np.random.RandomState(0).rand(100, 4) * 10
+    dataset = tf.data.Dataset.from_tensor_slices((x, np.zeros(100)))
+    for num_workers in [None, 2]:
+        input_node = Input(shape=[4])
+        scaler = MaxAbsScaler()
+        output_node = scaler(input_node)
+        graph = graph_module.PreprocessGraph(input_node, output_node)
+        graph.preprocess(dataset, fit=True, batch_size=32, num_workers=num_workers)
+        assert np.array_equal(scaler.max_abs, x.max(axis=0))
+        assert scaler.outputs[0].shape == (4,)
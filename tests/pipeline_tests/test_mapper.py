@@ -11,8 +11,10 @@ import pandas as pd
 from autorecsys.pipeline.mapper import (
     LatentFactorMapper,
     DenseFeatureMapper,
-    SparseFeatureMapper
+    SparseFeatureMapper,
+    get_dimension_blocks
 )
+from autorecsys.pipeline.utils import MixedDimensionEmbedding, QuotientRemainderEmbedding
 from autorecsys.searcher.core import hyperparameters as hp_module
 from tensorflow.python.util import nest
 
@@ -48,7 +50,8 @@ class TestMappers(unittest.TestCase):
             'name': 'latent_factor_mapper_1',
             'column_id': 0,
             'num_of_entities': 3,
-            'embedding_dim': 4}
+            'embedding_dim': 4,
+            'num_collisions': None}
         assert mapper.get_state() == sol_get_state
 
         # test set_state
@@ -60,7 +63,8 @@ class TestMappers(unittest.TestCase):
             'name': 'latent_factor_mapper_1',
             'column_id': self.column_id,
             'num_of_entities': 10,
-            'embedding_dim': self.embed_dim}
+            'embedding_dim': self.embed_dim,
+            'num_collisions': None}
         mapper.set_state(p)
         ans_set_state = mapper.get_state()
         assert ans_set_state == sol_set_state
@@ -112,7 +116,10 @@ class TestMappers(unittest.TestCase):
             'name': 'sparse_feature_mapper_1',
             'num_of_fields': 10,
             'hash_size': [2, 4, 10],
-            'embedding_dim': 4}
+            'embedding_dim': 4,
+            'fused': False,
+            'num_collisions': None,
+            'num_frequent': None}
         assert mapper.get_state() == sol_get_state
 
         # test set_state
@@ -125,7 +132,10 @@ class TestMappers(unittest.TestCase):
             'name': 'sparse_feature_mapper_1',
             'num_of_fields': self.input_shape,
             'hash_size': hash_size,
-            'embedding_dim': self.embed_dim}
+            'embedding_dim': self.embed_dim,
+            'fused': False,
+            'num_collisions': None,
+            'num_frequent': None}
         mapper.set_state(p)
         ans_set_state = mapper.get_state()
         assert ans_set_state == sol_set_state
@@ -137,3 +147,140 @@ class TestMappers(unittest.TestCase):
         output = mapper.build(hp, tensor_inputs)  # Act
         assert len(nest.flatten(output)) == 1
         assert output.shape == (self.batch, self.input_shape, self.embed_dim)
+
+        # test build with hash buckets shared by all fields
+        mapper = SparseFeatureMapper(num_of_fields=self.input_shape, hash_size=100, embedding_dim=self.embed_dim)
+        output = mapper.build(hp_module.HyperParameters(), tensor_inputs)
+        assert output.shape == (self.batch, self.input_shape, self.embed_dim)
+
+    def test_SparseFeatureMapper_fused(self):
+        hash_size = [3, 5, 7]
+        inputs = [tf.constant([[0, 4, 6], [2, 1, 0]], dtype=tf.float32)]
+        mapper = SparseFeatureMapper(num_of_fields=3, hash_size=hash_size, embedding_dim=self.embed_dim, fused=True)
+        assert mapper.get_state()['fused']
+        output = mapper.build(hp_module.HyperParameters(), inputs)
+        assert output.shape == (2, 3, self.embed_dim)
+
+        # each field is looked up in its own rows of the single table
+        model_input = tf.keras.Input(shape=(3,))
+        model = tf.keras.Model(model_input, mapper.build(hp_module.HyperParameters(), [model_input]))
+        assert len(model.trainable_weights) == 1
+        table = model.trainable_weights[0].numpy()
+        assert table.shape == (sum(hash_size), self.embed_dim)
+        expected = table[[[0, 3 + 4, 8 + 6], [2, 3 + 1, 8 + 0]]]
+        assert np.allclose(model(inputs[0]).numpy(), expected)
+
+    def test_DenseFeatureMapper_weights(self):
+        mapper = DenseFeatureMapper(num_of_fields=self.input_shape, embedding_dim=self.embed_dim)
+        model_input = tf.keras.Input(shape=(self.input_shape,))
+        model = tf.keras.Model(model_input, mapper.build(hp_module.HyperParameters(), [model_input]))
+
+        # one trainable embedding per field, scaled by the value of the field
+        assert len(model.trainable_weights) == 1
+        embeddings = model.trainable_weights[0].numpy()
+        assert embeddings.shape == (self.input_shape, self.embed_dim)
+        x = self.tensor_inputs[0].numpy()
+        assert np.allclose(model(x).numpy(), x[:, :, np.newaxis] * embeddings[np.newaxis])
+
+    def test_mapper_sizing(self):
+        class FittedPreprocessor(object):
+            def get_hash_size(self):
+                return [3, 5, 7]
+
+            def get_categorical_count(self):
+                return 3
+
+        # tables are sized exactly by the preprocessor, and their memory is known before they are built
+        for fused in (False, True):
+            mapper = SparseFeatureMapper.from_preprocessor(FittedPreprocessor(), embedding_dim=4, fused=fused)
+            assert mapper.num_of_fields == 3 and mapper.hash_size == [3, 5, 7]
+            embedding_bytes = mapper.get_embedding_bytes()
+            model_input = tf.keras.Input(shape=(3,))
+            model = tf.keras.Model(model_input, mapper.build(hp_module.HyperParameters(), [model_input]))
+            assert embedding_bytes == 15 * 4 * 4 == sum(weight.numpy().nbytes for weight in model.trainable_weights)
+
+        mapper = LatentFactorMapper.from_preprocessor(FittedPreprocessor(), column_id=1)
+        assert mapper.num_of_entities == 5
+        hp = hp_module.HyperParameters()
+        assert mapper.get_embedding_bytes(hp) == 5 * 32 * 4  # default embedding_dim
+        mapper.build(hp, self.tensor_inputs)
+        assert sorted(hp.values) == ['{}/{}'.format(mapper.name, name) for name in ('embedding_dim', 'num_collisions')]
+
+    def test_mapper_quotient_remainder(self):
+        hash_size = [5, 1000, 30]
+        x = np.array([[4, 999, 0], [0, 0, 29], [1, 500, 7]], dtype=np.float32)
+        for fused in (False, True):
+            mapper = SparseFeatureMapper(num_of_fields=3, hash_size=hash_size, embedding_dim=4, fused=fused,
+                                         num_collisions=16)
+            model_input = tf.keras.Input(shape=(3,))
+            model = tf.keras.Model(model_input, mapper.build(hp_module.HyperParameters(), [model_input]))
+
+            # the small field keeps its full table, the others have 63 + 16 and 2 + 15 rows
+            rows = 5 + 63 + 16 + 2 + 15
+            assert sum(weight.shape[0] for weight in model.trainable_weights) == rows
+            assert mapper.get_embedding_bytes() == rows * 4 * 4
+            output = model(x).numpy()
+            assert output.shape == (3, 3, 4)
+            if fused:
+                # the small field looks up plain rows of the fused remainder table
+                layer = [layer for layer in model.layers if isinstance(layer, QuotientRemainderEmbedding)][0]
+                assert np.array_equal(output[:, 0], layer.remainder_embedding.embeddings.numpy()[[4, 0, 1]])
+
+            # every category has its own embedding
+            indices = np.arange(1000, dtype=np.float32)
+            all_embeddings = model(np.stack([indices % 5, indices, indices % 30], axis=1)).numpy()[:, 1]
+            assert len(np.unique(all_embeddings, axis=0)) == 1000
+
+        # the compression is searchable, and the default keeps full tables
+        mapper = LatentFactorMapper(column_id=1, num_of_entities=1000, embedding_dim=4)
+        hp = hp_module.HyperParameters()
+        assert mapper.get_embedding_bytes(hp) == 1000 * 4 * 4
+        hp.values['{}/num_collisions'.format(mapper.name)] = 64
+        assert mapper.get_embedding_bytes(hp) == (16 + 63) * 4 * 4
+        output = mapper.build(hp, [tf.constant(x)])
+        assert output.shape == (3, 4)
+
+    def test_mapper_mixed_dimension(self):
+        assert get_dimension_blocks(10, 8, 10) is None
+        assert get_dimension_blocks(1000, 8, 10) == ([10, 40, 950], [8, 4, 2])
+        assert get_dimension_blocks(100, 16, 10) == ([10, 40, 50], [16, 8, 4])
+
+        hash_size = [5, 100, 30]
+        x = np.array([[4, 99, 0], [0, 0, 29], [1, 12, 7]], dtype=np.float32)
+        for fused in (False, True):
+            mapper = SparseFeatureMapper(num_of_fields=3, hash_size=hash_size, embedding_dim=8, fused=fused,
+                                         num_frequent=10)
+            model_input = tf.keras.Input(shape=(3,))
+            model = tf.keras.Model(model_input, mapper.build(hp_module.HyperParameters(), [model_input]))
+
+            # the small field keeps its full table, the others have blocks of 10x8, 40x4 and 50x2 or 20x4 embeddings
+            num_parameters = 5 * 8 + (10 * 8 + 40 * 4 + 4 * 8 + 50 * 2 + 2 * 8) + (10 * 8 + 20 * 4 + 4 * 8)
+            assert sum(np.prod(weight.shape) for weight in model.trainable_weights) == num_parameters
+            assert mapper.get_embedding_bytes() == num_parameters * 4
+            output = model(x).numpy()
+            assert output.shape == (3, 3, 8)
+
+        # in fused mode, the mixed-dimension field is looked up beside the fused table of the compressed fields
+        x = np.array([[9, 999, 0], [0, 0, 29], [1, 500, 7]], dtype=np.float32)
+        mapper = SparseFeatureMapper(num_of_fields=3, hash_size=[10, 1000, 30], embedding_dim=8, fused=True,
+                                     num_collisions=16, num_frequent=2)
+        model_input = tf.keras.Input(shape=(3,))
+        model = tf.keras.Model(model_input, mapper.build(hp_module.HyperParameters(), [model_input]))
+        output = model(x).numpy()
+        assert output.shape == (3, 3, 8)
+        mixed = [layer for layer in model.layers if isinstance(layer, MixedDimensionEmbedding)]
+        fused = [layer for layer in model.layers if isinstance(layer, QuotientRemainderEmbedding)]
+        assert len(mixed) == 1 and len(fused) == 1
+        assert np.allclose(output[:, 0], mixed[0](x[:, 0]).numpy())
+        assert np.allclose(output[:, 1:], fused[0](x[:, 1:]).numpy())
+        assert sum(np.prod(weight.shape) for weight in model.trainable_weights) * 4 == mapper.get_embedding_bytes()
+
+        # the embeddings are looked up in the block of each index and projected
+        layer = MixedDimensionEmbedding([10, 40, 50], [8, 4, 2], 8)
+        indices = np.array([[0, 9], [10, 49], [50, 99]])
+        output = layer(indices).numpy()
+        assert output.shape == (3, 2, 8)
+        embeddings = [embedding.get_weights()[0] for embedding in layer.embeddings]
+        assert np.allclose(output[0], embeddings[0][[0, 9]])
+        assert np.allclose(output[1], embeddings[1][[0, 39]].dot(layer.projections[1].get_weights()[0]))
+        assert np.allclose(output[2], embeddings[2][[0, 49]].dot(layer.projections[2].get_weights()[0]))
@@ -1,10 +1,14 @@
 import copy
 
 import numpy as np
+import pandas as pd
 import pytest
 import tensorflow as tf
 
 from autorecsys.pipeline import node
+from autorecsys.pipeline import MLPInteraction, RatingPredictionOptimizer, SparseFeatureMapper
+from autorecsys.pipeline import graph as graph_module
+from autorecsys.searcher.core import hyperparameters as hp_module
 
 
 def test_input_type_error():
@@ -25,3 +29,89 @@ def test_input_numerical():
     assert 'Expect the data to Input to be numerical' in str(info.value)
 
 
+
+
+def test_input_dtype():
+    x = np.array([[0, 1], [2, 3]], dtype=np.int8)
+    input_node = node.Input(dtype='int32')
+    dataset = input_node.fit_transform(x)
+    assert dataset.element_spec.dtype == tf.int32
+    assert input_node.build().dtype == tf.int32
+    assert node.Input(shape=[2]).build().dtype == tf.float32
+
+
+def test_structured_data_input_column_types():
+    x = pd.DataFrame({
+        'numerical': np.arange(100) / 3,
+        'few_values': np.arange(100) % 2,
+        'strings': ['a', 'b', None, 'c'] * 25,
+        'missing': [np.nan] * 10 + list(range(90)),
+        'flags': [True, False] * 50,
+        'numeric_strings': [str(i) for i in range(90)] + ['nan'] * 10,
+    })
+    input_node = node.StructuredDataInput()
+    input_node.fit_transform(x)
+    assert input_node.column_types == {'numerical': 'numerical', 'few_values': 'categorical',
+                                       'strings': 'categorical', 'missing': 'numerical', 'flags': 'categorical',
+                                       'numeric_strings': 'numerical'}
+    assert input_node.count_nan.tolist() == [0, 0, 0, 10, 0, 10]
+    assert input_node.count_numerical.tolist() == [100, 100, 0, 90, 0, 90]
+    assert input_node.count_categorical.tolist() == [0, 0, 100, 0, 100, 0]
+    assert input_node.count_unique_numerical[1] == {0.0: 50, 1.0: 50}
+
+    # the statistics of an ndarray of strings are the same as those of the values
+    input_node = node.StructuredDataInput(column_names=list(x.columns))
+    input_node.fit_transform(x.values.astype(np.unicode))
+    assert input_node.count_numerical.tolist() == [100, 100, 0, 90, 0, 90]
+
+    # every parsed NaN counts as a distinct numerical value
+    input_node = node.StructuredDataInput()
+    input_node.fit_transform(pd.DataFrame({'parsed_nan': ['NaN'] * 1000 + ['1'] * 100}))
+    assert input_node.count_numerical.tolist() == [1100]
+    assert input_node.count_unique_nan.tolist() == [1000]
+    assert input_node.count_unique_numerical[0] == {1.0: 100}
+    assert input_node.column_types == {'parsed_nan': 'numerical'}
+
+    # only the sampled rows are counted
+    input_node = node.StructuredDataInput(sample_size=20)
+    input_node.fit_transform(x)
+    assert input_node.count_categorical[2] + input_node.count_numerical[0] == 40
+
+
+def test_structured_data_input_typed():
+    x = pd.DataFrame({'price': [1.5, 2.5, np.nan], 'count': [1, 2, 3], 'city': ['7', 'nan', '8']})
+    input_node = node.StructuredDataInput(typed=True)
+    dataset = input_node.fit_transform(x)
+    assert {name: spec.dtype for name, spec in dataset.element_spec.items()} == {
+        'price': tf.float64, 'count': tf.int64, 'city': tf.string}
+    row = next(iter(dataset))
+    assert row['count'].numpy() == 1 and row['city'].numpy() == b'7'
+    inputs = input_node.build()
+    assert inputs['count'].dtype == tf.int64 and inputs['price'].shape.as_list() == [None]
+
+    # the blocks cannot parse the non-numerical strings
+    with pytest.raises(ValueError) as info:
+        node.StructuredDataInput(typed=True).fit_transform(pd.DataFrame({'city': ['68fd1e64', None, '1']}))
+    assert 'Column city has non-numerical values' in str(info.value)
+
+    # an ndarray is converted column by column under the generated column names
+    dataset = node.StructuredDataInput(typed=True).fit_transform(np.arange(6, dtype=np.int32).reshape(3, 2))
+    assert dataset.element_spec['1'].dtype == tf.int32
+
+
+def test_structured_data_input_typed_mapper():
+    x = pd.DataFrame({'user': np.arange(100) % 7, 'item': (np.arange(100) % 5).astype(np.int32),
+                      'genre': [str(i % 3) for i in range(100)]})
+    y = np.random.RandomState(0).rand(100)
+    input_node = node.StructuredDataInput(typed=True)
+    dataset = input_node.fit_transform(x)
+    output_node = SparseFeatureMapper(num_of_fields=3, hash_size=[7, 5, 3], embedding_dim=4)(input_node)
+    output_node = MLPInteraction()(output_node)
+    output_node = RatingPredictionOptimizer()(output_node)
+    model = graph_module.KerasGraph(input_node, output_node).build(hp_module.HyperParameters())
+
+    # the mapper looks up the columns of the typed inputs, stacked in the column order
+    model.fit(tf.data.Dataset.zip((dataset, tf.data.Dataset.from_tensor_slices(y))).batch(32), verbose=0)
+    prediction = model.predict(dataset.batch(32), verbose=0)
+    assert prediction.shape == (100,)
+    assert np.allclose(model.predict(input_node.transform(x.iloc[::-1]).batch(32), verbose=0), prediction[::-1])
@@ -14,6 +14,10 @@ import numpy as np
 import tensorflow as tf
 
 from autorecsys.pipeline.preprocessor import BasePreprocessor, NetflixPrizePreprocessor, CriteoPreprocessor, AvazuPreprocessor, MovielensPreprocessor
+from autorecsys.pipeline.preprocessor import NUMERICAL_TRANSFORMS, split_rows, split_rows_by_time, append_npy
+from autorecsys.pipeline.preprocessor import Normalization
+from autorecsys.pipeline import Input
+from autorecsys.pipeline import graph as graph_module
 
 
 logger = logging.getLogger(__name__)
@@ -47,7 +51,15 @@ class DummyPreprocessor(BasePreprocessor):
                  validate_percentage=0.1,
                  train_path=None,
                  validate_path=None,
-                 test_path=None):
+                 test_path=None,
+                 chunk_size=None,
+                 numerical_transform='log',
+                 compact_dtype=False,
+                 num_workers=None,
+                 hash_buckets=None,
+                 sketch_error=None,
+                 time_column=None,
+                 dtype_sample_size=None):
 
         if columns is None:
             columns = range(3)
@@ -78,7 +90,15 @@ class DummyPreprocessor(BasePreprocessor):
                          validate_percentage=validate_percentage,
                          train_path=train_path,
                          validate_path=validate_path,
-                         test_path=test_path)
+                         test_path=test_path,
+                         chunk_size=chunk_size,
+                         numerical_transform=numerical_transform,
+                         compact_dtype=compact_dtype,
+                         num_workers=num_workers,
+                         hash_buckets=hash_buckets,
+                         sketch_error=sketch_error,
+                         time_column=time_column,
+                         dtype_sample_size=dtype_sample_size)
         self.data_df = data_df
 
     def preprocess(self):
@@ -114,12 +134,74 @@ class TestPreprocessors(unittest.TestCase):
         assert test_X.shape[0] == 2
         assert test_y.shape[0] == 2
 
+    def test_split_index(self):
+        train_index, validate_index, test_index = split_rows(10000, 0.1, 0.2)
+        assert np.array_equal(np.sort(np.concatenate([train_index, validate_index, test_index])), np.arange(10000))
+        assert abs(len(test_index) - 1000) < 100
+        assert abs(len(validate_index) - 2000) < 150
+
+        # rows keep their sets when they are split in parts with row offsets
+        part_index = split_rows(5000, 0.1, 0.2, offset=5000)
+        for index, part in zip((train_index, validate_index, test_index), part_index):
+            assert np.array_equal(index[index >= 5000] - 5000, part)
+
+        base = DummyPreprocessor(data_df=self.input_df, test_percentage=0.2, validate_percentage=0.2)
+        train_X, train_y, val_X, val_y, test_X, test_y = base.split_dataset()
+        assert len(train_X) + len(val_X) + len(test_X) == 10
+        assert list(train_X.columns) == ['user_id', 'num_people']
+        assert np.array_equal(train_y, base.get_y()[base.split_index()[0]])
+        pd.testing.assert_frame_equal(test_X, base.get_x().iloc[base.split_index()[2]])
+
+    def test_split_index_by_time(self):
+        times = np.repeat(np.arange(10), 100)[::-1]  # rows in descending time order
+        train_index, validate_index, test_index = split_rows_by_time(times, 0.1, 0.2)
+        assert np.array_equal(np.sort(times[test_index]), np.full(100, 9))
+        assert set(times[validate_index]) == {7, 8}
+        assert times[train_index].max() == 6
+
+        # rows with the same timestamp stay in the same set
+        train_index, validate_index, test_index = split_rows_by_time(np.repeat(np.arange(4), [4, 3, 2, 1]), 0.15, 0.0)
+        assert len(test_index) == 3 and len(validate_index) == 0
+
+        # timestamps encoded as categories are kept before the transformation
+        base = DummyPreprocessor(data_df=self.input_df.copy(), categorical_columns=['user_id', 'num_people'],
+                                 time_column='num_people', test_percentage=0.2, validate_percentage=0.2)
+        times = base.data_df['num_people'].values
+        base.transform_categorical()
+        train_index, validate_index, test_index = base.split_index()
+        assert times[train_index].max() <= times[validate_index].min() <= times[test_index].min()
+
+    def test_append_npy(self):
+        np.save('values.npy', np.arange(5, dtype=np.int8))
+        append_npy('values.npy', np.arange(3, dtype=np.int8))
+        assert np.array_equal(np.load('values.npy'), [0, 1, 2, 3, 4, 0, 1, 2])
+        append_npy('values.npy', np.array([300], dtype=np.int16))  # the data type is widened
+        assert np.load('values.npy').dtype == np.int16
+        assert np.array_equal(np.load('values.npy'), [0, 1, 2, 3, 4, 0, 1, 2, 300])
+
     def test_transform_numerical(self):
         sol = np.array([[1, 1, 1], [1, 2, 1], [2, math.log(float(3)) ** 2, 1]])
         base = DummyPreprocessor(data_df=self.small_input_df)
         base.transform_numerical()
         assert base.data_df.shape == (3, 3)
-        assert np.array_equal(sol, base.data_df.values)
+        assert np.allclose(sol, base.data_df.values)
+
+    def test_transform_numerical_methods(self):
+        values = np.array([0, 1, 2, 3, 10, 100], dtype=np.float64)
+        sol = np.array([0, 1, 2] + [math.log(v) ** 2 for v in values[3:]])
+        assert np.allclose(NUMERICAL_TRANSFORMS['log'](values), sol)
+
+        # the same as the per-cell transformation, on continuous data with negative and missing values
+        continuous = np.append(np.random.RandomState(0).lognormal(0, 3, 1000) - 1, np.nan)
+        sol = pd.Series(continuous).map(lambda num: math.log(float(num)) ** 2 if num > 2 else num).values
+        assert np.allclose(NUMERICAL_TRANSFORMS['log'](continuous), sol, equal_nan=True)
+        assert np.allclose(NUMERICAL_TRANSFORMS['log1p'](values), np.log1p(values))
+        assert NUMERICAL_TRANSFORMS['clip'](values).max() < 100
+        assert np.array_equal(NUMERICAL_TRANSFORMS['quantile'](values, num_bins=2), [0, 0, 0, 1, 1, 1])
+
+        base = DummyPreprocessor(data_df=self.small_input_df.copy(), numerical_transform=lambda x: x * 2)
+        base.transform_numerical()
+        assert np.array_equal(base.data_df['num_people'].values, [2, 4, 6])
 
     def test_transform_categorical(self):
         sol = np.array([[0, 1, 1], [0, 2, 1], [1, 3, 1]])
@@ -128,6 +210,184 @@ class TestPreprocessors(unittest.TestCase):
         assert base.data_df.shape == (3, 3)
         assert np.array_equal(sol, base.data_df.values)
 
+    def test_transform_categorical_chunked(self):
+        self.input_df.to_csv('input.csv', sep='\t', index=False)
+        base = DummyPreprocessor(data_df=self.input_df)
+        base.transform_categorical()
+        chunked = DummyPreprocessor(csv_path='input.csv', columns=list(self.input_df.columns), chunk_size=3)
+        chunked.load_dataset()
+        assert chunked.data_df is None
+        chunked.transform_categorical()
+        assert chunked.data_df is None  # the chunks are encoded one at a time
+        for col in base.categorical_columns:
+            pd.testing.assert_series_equal(chunked.fit_dict[col], base.fit_dict[col])
+        assert np.array_equal(pd.concat(chunked.iter_encoded()).values, base.data_df.values)
+
+    def test_transform_categorical_filter(self):
+        sol = np.array([0, 0, 0, 0, 1, 1, 1, 2, 2, 2])  # user_id 3 and 4 are grouped as infrequent categories
+        base = DummyPreprocessor(data_df=self.input_df.copy(), categorical_filter=2)
+        base.transform_categorical()
+        assert np.array_equal(base.data_df['user_id'].values, sol)
+        assert base.fit_dict['user_id'].values.dtype == np.int8
+
+        # unseen categories share the index of the infrequent categories
+        assert np.array_equal(base.encode_categorical('user_id', pd.Series([2, 4, 5])), [1, 2, 2])
+
+    def test_transform_categorical_sketch(self):
+        sol = np.array([0, 0, 0, 0, 1, 1, 1, 2, 2, 2])  # user_id 3 and 4 are grouped as infrequent categories
+        base = DummyPreprocessor(data_df=self.input_df.copy(), categorical_filter=2, sketch_error=1e-3)
+        base.transform_categorical()
+        assert np.array_equal(base.data_df['user_id'].values, sol)
+        assert list(base.fit_dict['user_id'].index) == [1, 2]
+        assert base.get_hash_size() == [3]
+        assert base.category_sketches['user_id'].error_bound() == 1e-3 * 10
+        assert np.array_equal(base.encode_categorical('user_id', pd.Series([2, 4, 5])), [1, 2, 2])
+
+        # with no frequent category, all the categories share the unseen index
+        base = DummyPreprocessor(data_df=self.input_df.copy(), categorical_filter=5, sketch_error=1e-2)
+        base.transform_categorical()
+        assert len(base.fit_dict['user_id']) == 0
+        assert np.array_equal(base.data_df['user_id'].values, np.zeros(10))
+        assert base.get_hash_size() == [1]
+
+    def test_CriteoPreprocessor_sketch(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path)
+        criteo.load_dataset()
+        criteo.transform_categorical()
+        sketched = CriteoPreprocessor(csv_path=csv_path, sketch_error=1e-5, chunk_size=1000)
+        sketched.load_dataset()
+        sketched.transform_categorical()
+        sketched_df = pd.concat(sketched.iter_encoded())
+        for i, col in enumerate(criteo.categorical_columns):
+            # with a small error, the sketch keeps exactly the frequent categories
+            frequent = criteo.category_counts[col][criteo.category_counts[col] > criteo.categorical_filter]
+            assert set(sketched.fit_dict[col].index) == set(frequent.index)
+            assert sketched.get_hash_size()[i] == len(frequent) + 1
+            assert np.array_equal(np.sort(sketched_df[col].value_counts().values),
+                                  np.sort(criteo.data_df[col].value_counts().values))
+
+    def test_transform_categorical_hashing(self):
+        base = DummyPreprocessor(data_df=self.input_df.copy(), hash_buckets=7)
+        base.transform_categorical()
+        assert base.fit_dict is None
+        assert base.get_hash_size() == [7]
+        indices = base.data_df['user_id'].values
+        assert indices.min() >= 0 and indices.max() < 7
+        assert len(np.unique(indices[self.input_df['user_id'].values == 1])) == 1
+
+        # categories are hashed by their string representation, so unseen data need no lookup table
+        assert np.array_equal(base.encode_categorical('user_id', pd.Series(['1', '2', '3', '4'])), indices[[0, 4, 7, 9]])
+
+    def test_transform_categorical_hashing_chunked(self):
+        # user_id is parsed as integers in the first chunks, and as floats in the last chunk with a missing value
+        data_df = self.input_df.astype({'user_id': object})
+        data_df.loc[9, 'user_id'] = np.nan
+        data_df.to_csv('input.csv', sep='\t', index=False)
+        base = DummyPreprocessor(csv_path='input.csv', columns=list(data_df.columns), hash_buckets=1000)
+        base.load_dataset()
+        base.transform_categorical()
+        chunked = DummyPreprocessor(csv_path='input.csv', columns=list(data_df.columns), hash_buckets=1000,
+                                    chunk_size=3)
+        chunked.load_dataset()
+        chunked.transform_categorical()
+        chunked_df = pd.concat(chunked.iter_encoded())
+        assert chunked_df['user_id'].dtype == base.data_df['user_id'].dtype
+        assert np.array_equal(chunked_df['user_id'].values, base.data_df['user_id'].values)
+        assert len(np.unique(chunked_df['user_id'].values[[7, 8]])) == 1  # user_id 3 in both dtypes
+
+    def test_CriteoPreprocessor_hashing(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path, hash_buckets=1000)
+        criteo.load_dataset()
+        criteo.transform_categorical()
+        assert criteo.get_hash_size() == [1000] * 26
+        assert criteo.get_x_categorical(criteo.data_df).max() < 1000
+        chunked = CriteoPreprocessor(csv_path=csv_path, hash_buckets=1000, chunk_size=1000)
+        chunked.load_dataset()
+        assert chunked.category_counts is None
+        chunked.transform_categorical()
+        pd.testing.assert_frame_equal(criteo.data_df, pd.concat(chunked.iter_encoded()))
+
+    def test_fit_dict_file(self):
+        base = DummyPreprocessor(data_df=self.input_df.copy(), categorical_filter=2, fit_dictionary_path='fit_dict')
+        base.transform_categorical()
+        assert base.has_fit_dict_file()
+
+        # the saved fit dictionary is reused instead of counting categories
+        loaded = DummyPreprocessor(data_df=self.small_input_df.copy(), fit_dictionary_path='fit_dict')
+        loaded.transform_categorical()
+        pd.testing.assert_series_equal(loaded.fit_dict['user_id'], base.fit_dict['user_id'])
+        assert np.array_equal(loaded.data_df['user_id'].values, [0, 0, 1])
+
+        other = DummyPreprocessor(categorical_columns=['num_people'], fit_dictionary_path='fit_dict')
+        with pytest.raises(ValueError):
+            other.load_fit_dict()
+
+    def test_CriteoPreprocessor_parallel(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path)
+        criteo.load_dataset()
+        criteo.transform_categorical()
+        parallel = CriteoPreprocessor(csv_path=csv_path, num_workers=3)
+        parallel.load_dataset()
+        parallel.transform_categorical()
+        pd.testing.assert_frame_equal(criteo.data_df, parallel.data_df)
+        assert criteo.get_hash_size() == parallel.get_hash_size()
+
+    def test_load_dataset_parallel_dtypes(self):
+        # user_id is parsed as integers in the first shard, and as floats or strings in the second shard
+        data_df = pd.DataFrame({'user_id': [i % 4 + 1 for i in range(40)], 'num_people': 1, 'rating': 1}, dtype=object)
+        for value in (np.nan, 'abc'):
+            data_df.loc[38, 'user_id'] = value
+            data_df.to_csv('input.csv', sep='\t', index=False)
+            base = DummyPreprocessor(csv_path='input.csv', columns=list(data_df.columns))
+            base.load_dataset()
+            base.transform_categorical()
+            parallel = DummyPreprocessor(csv_path='input.csv', columns=list(data_df.columns), num_workers=2)
+            parallel.load_dataset()
+            parallel.transform_categorical()
+            pd.testing.assert_frame_equal(base.data_df, parallel.data_df)
+            pd.testing.assert_series_equal(base.fit_dict['user_id'], parallel.fit_dict['user_id'])
+
+    def test_AvazuPreprocessor_parallel(self):
+        csv_path = os.path.join(dataset_directory, 'avazu/train-10k')
+        avazu = AvazuPreprocessor(csv_path=csv_path)
+        avazu.load_dataset()
+        avazu.transform_categorical()
+        parallel = AvazuPreprocessor(csv_path=csv_path, num_workers=2)
+        parallel.load_dataset()
+        parallel.transform_categorical()
+        pd.testing.assert_frame_equal(avazu.data_df, parallel.data_df)
+
+    def test_CriteoPreprocessor_fit_dict_file(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path, fit_dictionary_path='fit_dict.npz')
+        criteo.preprocess()
+        loaded = CriteoPreprocessor(csv_path=csv_path, fit_dictionary_path='fit_dict.npz', chunk_size=1000)
+        loaded.load_dataset()
+        assert loaded.category_counts is None
+        loaded.transform_categorical()
+        for col in criteo.categorical_columns:
+            pd.testing.assert_series_equal(loaded.fit_dict[col], criteo.fit_dict[col], check_index_type=False)
+        loaded_df = pd.concat(loaded.iter_encoded())
+        assert np.array_equal(loaded.get_x_categorical(loaded_df), criteo.get_x_categorical(criteo.data_df))
+
+    def test_extend_fit_dict(self):
+        base = DummyPreprocessor(data_df=self.input_df.copy(), categorical_filter=1)
+        base.transform_categorical()
+        fit_dict = base.fit_dict['user_id'].copy()
+        unseen_index = base.get_unseen_index('user_id')
+        new_df = pd.DataFrame({'user_id': [5, 5, 6, fit_dict.index[0]], 'num_people': 1, 'rating': 1})
+        base.extend_fit_dict(new_df)
+        extended = base.fit_dict['user_id']
+        pd.testing.assert_series_equal(extended[fit_dict.index], fit_dict, check_dtype=False)
+        assert extended[5] == max(fit_dict.max(), unseen_index) + 1
+        assert 6 not in extended.index  # infrequent in the new data
+        assert base.get_unseen_index('user_id') == unseen_index
+        assert np.array_equal(base.encode_categorical('user_id', new_df['user_id']),
+                              [extended[5], extended[5], unseen_index, fit_dict.iloc[0]])
+
     def test_get_hash_size(self):
         base = DummyPreprocessor(data_df=self.small_input_df)
         base.transform_categorical()
@@ -175,6 +435,104 @@ class TestPreprocessors(unittest.TestCase):
         criteo.preprocess()
         assert criteo.data_df.shape == (10000, 40)
 
+    def test_CriteoPreprocessor_chunked(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path)
+        criteo.load_dataset()
+        criteo.transform_categorical()
+        chunked = CriteoPreprocessor(csv_path=csv_path, chunk_size=1000)
+        chunked.load_dataset()
+        chunked.transform_categorical()
+        pd.testing.assert_frame_equal(criteo.data_df, pd.concat(chunked.iter_encoded()))
+        assert criteo.get_hash_size() == chunked.get_hash_size()
+
+    def test_CriteoPreprocessor_split_chunks(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        for params in ({}, {'numerical_transform': 'quantile'}, {'time_column': 14}):
+            splits = CriteoPreprocessor(csv_path=csv_path, **params).preprocess()
+            for transform_path in (None, 'transformed'):
+                chunked = CriteoPreprocessor(csv_path=csv_path, chunk_size=1000, transform_path=transform_path,
+                                             **params)
+                chunked_splits = chunked.preprocess()
+                assert chunked.data_df is None  # the whole dataset is never loaded
+                for data, chunked_data in zip(splits, chunked_splits):
+                    if isinstance(data, pd.DataFrame):
+                        pd.testing.assert_frame_equal(data, chunked_data, check_index_type=False)
+                    else:
+                        assert np.array_equal(data, chunked_data)
+
+    def test_CriteoPreprocessor_transform_path(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path, transform_path='transformed')
+        splits = criteo.preprocess()
+        hash_size = criteo.get_hash_size()
+        assert os.path.isfile('transformed/manifest.json')
+
+        # the cached dataset is reused without loading the CSV data
+        criteo = CriteoPreprocessor(csv_path=csv_path, transform_path='transformed')
+        cached_splits = criteo.preprocess()
+        assert criteo.data_df is None
+        assert criteo.get_hash_size() == hash_size
+        assert isinstance(cached_splits[0][14].values, np.memmap)
+        for data, cached_data in zip(splits, cached_splits):
+            assert np.array_equal(np.asarray(data), np.asarray(cached_data))
+
+        # the cached dataset is not reused if the preprocessing parameters change
+        criteo = CriteoPreprocessor(csv_path=csv_path, transform_path='transformed', categorical_filter=2)
+        criteo.preprocess()
+        assert criteo.data_df is not None
+
+    def test_CriteoPreprocessor_columnar(self):
+        pa = pytest.importorskip('pyarrow')
+        import pyarrow.feather as feather
+        import pyarrow.parquet as pq
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        splits = CriteoPreprocessor(csv_path=csv_path).preprocess()
+        data_df = pd.read_csv(csv_path, sep='\t', header=None)
+        data_df.columns = [str(col) for col in data_df.columns]
+        data_df['ignored'] = 'ignored'
+        pq.write_table(pa.Table.from_pandas(data_df, preserve_index=False), 'train.parquet', row_group_size=1000)
+        feather.write_feather(data_df, 'train.arrow', chunksize=1000)
+
+        for path in ('train.parquet', 'train.arrow'):
+            criteo = CriteoPreprocessor(csv_path=path)
+            assert list(next(criteo.iter_columnar(path, 10)).columns) == list(range(40))  # only relevant columns
+            for chunk_size in (None, 3000):
+                columnar_splits = CriteoPreprocessor(csv_path=path, chunk_size=chunk_size).preprocess()
+                for data, columnar_data in zip(splits, columnar_splits):
+                    assert np.array_equal(np.asarray(data), np.asarray(columnar_data))
+
+    def test_CriteoPreprocessor_infer_dtype_dict(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path, dtype_sample_size=None)
+        splits = criteo.preprocess()
+        sampled = CriteoPreprocessor(csv_path=csv_path, dtype_sample_size=100)
+        dtype_dict = sampled.get_dtype_dict()
+        assert all(dtype_dict[col] == 'category' for col in range(14, 40))  # hashed categories
+        assert not any(col in dtype_dict for col in range(14))
+        assert CriteoPreprocessor(csv_path=csv_path, compact_dtype=True).get_dtype_dict()[1] == np.float32
+
+        # categorical data with missing values are loaded compactly and transformed the same way
+        sampled.load_dataset()
+        assert sampled.data_df[14].dtype == 'category' and sampled.data_df[33].isin([0.0]).any()
+        assert sampled.data_df.memory_usage(deep=True).sum() * 3 < criteo.read_dataset().memory_usage(deep=True).sum()
+        sampled_splits = CriteoPreprocessor(csv_path=csv_path, dtype_sample_size=100).preprocess()
+        for data, sampled_data in zip(splits, sampled_splits):
+            assert np.array_equal(np.asarray(data), np.asarray(sampled_data))
+
+    def test_CriteoPreprocessor_compact_dtype(self):
+        csv_path = os.path.join(dataset_directory, 'criteo/train-10k.txt')
+        criteo = CriteoPreprocessor(csv_path=csv_path)
+        criteo.preprocess()
+        compact = CriteoPreprocessor(csv_path=csv_path, compact_dtype=True)
+        compact.preprocess()
+        x, compact_x = criteo.get_x(), compact.get_x()
+        assert compact.get_x_numerical(compact_x).dtype == np.float32
+        assert compact.get_x_categorical(compact_x).dtype in (np.int16, np.int32)
+        assert np.array_equal(compact.get_x_categorical(compact_x), criteo.get_x_categorical(x))
+        assert np.allclose(compact.get_x_numerical(compact_x), criteo.get_x_numerical(x))
+        assert compact_x.memory_usage().sum() * 2 < x.memory_usage().sum()
+
     def test_NetflixPreprocessor(self):
         netflix = NetflixPrizePreprocessor(
             non_csv_path=os.path.join(dataset_directory, 'netflix/combined_data_1-10k.txt'),
@@ -182,8 +540,85 @@ class TestPreprocessors(unittest.TestCase):
         netflix.preprocess()
         assert netflix.data_df.shape == (10000, 3)
 
+    def test_NetflixPreprocessor_format_dataset(self):
+        with open(os.path.join(dataset_directory, 'netflix/combined_data_1-10k.txt')) as f:
+            lines = f.readlines()
+        split = lines.index('3:\n')
+        with open('combined_data_1.txt', 'w') as f:
+            f.writelines(lines[:split])
+        with open('combined_data_2.txt', 'w') as f:
+            f.writelines(lines[split:])
+        sol = []
+        for line in lines:
+            if ':' in line:
+                movie = line.strip(':\n')
+            else:
+                sol.append(movie + ',' + line)
+
+        netflix = NetflixPrizePreprocessor(non_csv_path='combined_data_*.txt', csv_path='combined_data.csv',
+                                           num_workers=2)
+        netflix.format_dataset()
+        with open('combined_data.csv') as f:
+            assert f.readlines() == sol
+
+        # the conversion is skipped if the CSV dataset is up to date
+        with open('combined_data.csv', 'w') as f:
+            f.write('')
+        os.utime('combined_data.csv', (0, os.path.getmtime('combined_data_2.txt') + 10))
+        netflix.format_dataset()
+        assert os.path.getsize('combined_data.csv') == 0
+
+    def test_AvazuPreprocessor_append_dataset(self):
+        data_df = pd.read_csv(os.path.join(dataset_directory, 'avazu/train-10k'))
+        data_df['hour'] = 14102100 + np.arange(len(data_df)) // 1000
+        data_df[data_df['hour'] < 14102109].to_csv('history.csv', index=False)
+        data_df[data_df['hour'] == 14102109].to_csv('today.csv', index=False)
+        data_df.to_csv('all.csv', index=False)
+
+        for time_column in ('hour', None):
+            avazu = AvazuPreprocessor(csv_path='history.csv', transform_path=str(time_column), time_column=time_column)
+            splits = avazu.preprocess()
+            hash_size = avazu.get_hash_size()
+            if time_column is not None:
+                assert [len(x) for x in splits[0::2]] == [7000, 1000, 1000]
+                assert splits[2].index.min() == 7000 and splits[4].index.min() == 8000
+            appended_splits = avazu.append_dataset('today.csv')
+            assert sum(len(y) for y in appended_splits[1::2]) == len(data_df)
+            assert all(new >= old for new, old in zip(avazu.get_hash_size(), hash_size))
+            if time_column is not None:
+                # the new day is the test set, and the previous test set is the validation set
+                assert appended_splits[4].index.min() == 9000
+                assert np.array_equal(appended_splits[2].index, splits[4].index)
+                assert len(appended_splits[0]) == 8000
+
+            # the cached rows keep their indices, and the new rows are encoded with the extended fit dictionary
+            x = pd.concat(appended_splits[0::2]).sort_index()
+            old_x = pd.concat(splits[0::2]).sort_index()
+            assert np.array_equal(x.loc[old_x.index].values, old_x.values)
+            encoded_df = avazu.apply_fit_dict(avazu.read_dataset('today.csv'))
+            assert np.array_equal(x.loc[9000:].values, encoded_df.drop(columns='click').values)
+
+            # the extended dataset is reused by the next run
+            avazu = AvazuPreprocessor(csv_path='history.csv', transform_path=str(time_column), time_column=time_column)
+            assert sum(len(y) for y in avazu.preprocess()[1::2]) == len(data_df)
+
     def test_AvazuPreprocessor(self):
         avazu = AvazuPreprocessor(csv_path=os.path.join(
             dataset_directory, 'avazu/train-10k'))
         avazu.preprocess()
         assert avazu.data_df.shape == (9999, 23)
+
+
+def test_Normalization():
+    x = np.random.RandomState(0).rand(100, 4) * [1, 10, 100, 0]
+    dataset = tf.data.Dataset.from_tensor_slices((x, np.zeros(100)))
+    for batch_size, num_workers in [(None, None), (32, None), (32, 2)]:
+        input_node = Input(shape=[4])
+        normalization = Normalization()
+        graph = graph_module.PreprocessGraph(input_node, normalization(input_node))
+        output, _ = graph.preprocess(dataset, fit=True, batch_size=batch_size, num_workers=num_workers)
+        assert normalization.count == 100
+        assert normalization.outputs[0].shape == (4,)
+        output = np.stack([element[0][0].numpy() for element in output])
+        # the constant feature is only centered
+        assert np.allclose(output, (x - x.mean(axis=0)) / np.where(x.std(axis=0) > 0, x.std(axis=0), 1), atol=1e-5)
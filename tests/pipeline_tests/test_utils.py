@@ -7,7 +7,7 @@ import unittest
 
 import numpy as np
 import tensorflow as tf
-from autorecsys.pipeline.utils import Bias
+from autorecsys.pipeline.utils import Bias, LazyAdam
 
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Suppress warning for running TF with CPU
 
@@ -36,3 +36,30 @@ class TestBias(unittest.TestCase):
         bias = Bias(self.inputs.shape[-1])  # Pass shape of input as units argument
         ans = bias(self.inputs)
         tf.assert_equal(self.inputs, ans)  # Assert tensor is equal since bias layer adds zeroes
+
+
+def test_LazyAdam():
+    embeddings = [tf.keras.layers.Embedding(10, 4, embeddings_initializer='ones') for _ in range(2)]
+    optimizers = [LazyAdam(learning_rate=0.1), tf.keras.optimizers.Adam(learning_rate=0.1)]
+
+    def step(indices):
+        for embedding, optimizer in zip(embeddings, optimizers):
+            with tf.GradientTape() as tape:
+                loss = tf.reduce_sum(embedding(tf.constant(indices)))
+            optimizer.apply_gradients(zip(tape.gradient(loss, embedding.trainable_weights),
+                                          embedding.trainable_weights))
+        return [embedding.get_weights()[0] for embedding in embeddings]
+
+    # the first step is the same as Adam, duplicate indices included
+    lazy, dense = step([1, 2, 2])
+    assert np.allclose(lazy, dense)
+    assert np.allclose(lazy[[0, 3]], 1) and not np.allclose(lazy[[1, 2]], 1)
+
+    # the rows not looked up are left unchanged, unlike Adam
+    lazy_previous = lazy
+    lazy, dense = step([3])
+    assert np.allclose(lazy[[1, 2]], lazy_previous[[1, 2]]) and not np.allclose(dense[[1, 2]], lazy_previous[[1, 2]])
+    assert np.allclose(lazy[3], dense[3])
+
+    with pytest.raises(ValueError):
+        LazyAdam(amsgrad=True)
@@ -1 +1,85 @@
-# TODO
\ No newline at end of file
+import numpy as np
+import pytest
+
+from autorecsys.pipeline import Input, Normalization, MLPInteraction, RatingPredictionOptimizer
+from autorecsys.pipeline import graph as graph_module
+from autorecsys.searcher.core import hyperparameters as hp_module
+from autorecsys.searcher.tuners.randomsearch import RandomSearch
+from autorecsys.searcher.tuners.tuner import PipeTuner
+
+
+@pytest.fixture(scope='function')
+def tmp_dir(tmpdir_factory):
+    return tmpdir_factory.mktemp('tuner_test', numbered=True)
+
+
+def build_tuner(directory, max_trials=1):
+    input_node = Input(shape=[4])
+    output_node = Normalization()(input_node)
+    output_node = MLPInteraction()(output_node)
+    output_node = RatingPredictionOptimizer()(output_node)
+    hypergraph = graph_module.HyperGraph(input_node, output_node)
+    return RandomSearch(hypergraph=hypergraph, objective='val_mse', max_trials=max_trials,
+                        hyperparameters=hypergraph.get_hyperparameters(), directory=str(directory))
+
+
+def preprocess(tuner, hp, x, y):
+    preprocess_graph = tuner.hypergraph.hyper_build(hp).build_preprocess_graph()
+    fit_kwargs = {'x': x, 'y': y, 'validation_data': (x[:10], y[:10])}
+    tuner._preprocess(preprocess_graph, hp, fit_kwargs)
+    return preprocess_graph, fit_kwargs
+
+
+def test_pipe_tuner_preprocess_cache(tmp_dir):
+    x = np.random.RandomState(0).rand(100, 4) * 10
+    y = np.random.RandomState(1).rand(100)
+    tuner = build_tuner(tmp_dir)
+    normalized = (x - x.mean(axis=0)) / x.std(axis=0)
+
+    # the first trial fits the preprocessors and caches the data
+    hp = hp_module.HyperParameters()
+    preprocess_graph, fit_kwargs = preprocess(tuner, hp, x, y)
+    assert (tuner.preprocess_cache.hits, tuner.preprocess_cache.misses) == (0, 1)
+    assert np.allclose(fit_kwargs['x'][0], normalized, atol=1e-5)
+    assert np.allclose(fit_kwargs['validation_data'][0][0], normalized[:10], atol=1e-5)
+
+    # a trial with other hyperparameters of the Keras model reuses the data and the fitted preprocessors
+    hp = hp_module.HyperParameters()
+    with hp.name_scope(tuner.hypergraph._blocks[1].name):
+        hp.Fixed('num_layers', 3)
+    preprocess_graph, cached_kwargs = preprocess(tuner, hp, x, y)
+    assert (tuner.preprocess_cache.hits, tuner.preprocess_cache.misses) == (1, 1)
+    assert np.array_equal(cached_kwargs['x'][0], fit_kwargs['x'][0])
+    assert preprocess_graph.outputs[0].shape == (4,)
+    assert np.allclose(preprocess_graph._blocks[0].mean, x.mean(axis=0))
+    assert np.allclose(PipeTuner.transform(preprocess_graph, x[:10])[0], normalized[:10], atol=1e-5)
+
+    # other data are preprocessed again
+    preprocess(tuner, hp, x[::-1], y)
+    assert (tuner.preprocess_cache.hits, tuner.preprocess_cache.misses) == (1, 2)
+
+
+def test_pipe_tuner_preprocess_key(tmp_dir):
+    tuner = build_tuner(tmp_dir)
+    hp = hp_module.HyperParameters()
+    preprocess_graph = tuner.hypergraph.hyper_build(hp).build_preprocess_graph()
+    normalization = preprocess_graph._blocks[0]
+    normalization.mean = np.zeros(2000)
+    key = tuner._get_preprocess_key(preprocess_graph, hp, 'data')
+    # the values elided from the repr of the array still change the key
+    normalization.mean[1000] = 1
+    assert tuner._get_preprocess_key(preprocess_graph, hp, 'data') != key
+
+
+def test_pipe_tuner_best_model(tmp_dir):
+    x = np.random.RandomState(0).rand(100, 4) * 10
+    y = x.sum(axis=1) / 10
+    tuner = build_tuner(tmp_dir)
+    tuner.search(x=x, y=y, x_val=x[:20], y_val=y[:20], epochs=1, batch_size=32, verbose=0)
+
+    # the best model predicts on the data transformed by the preprocessors fitted in its trial
+    preprocess_graph, model = tuner.get_best_model()
+    assert np.allclose(preprocess_graph._blocks[0].mean, x.mean(axis=0))
+    prediction = model.predict(PipeTuner.transform(preprocess_graph, x), verbose=0)
+    normalized = ((x - x.mean(axis=0)) / x.std(axis=0)).astype(np.float32)
+    assert np.allclose(prediction, model.predict(normalized, verbose=0), atol=1e-5)
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from autorecsys.utils.cache import DatasetCache, fingerprint_data, materialize_dataset
+
+
+def test_fingerprint_data():
+    x = np.arange(12, dtype=np.float32).reshape(4, 3)
+    y = pd.Series([0, 1, 0, 1])
+    fingerprint = fingerprint_data([x, y, None])
+    assert fingerprint == fingerprint_data([x.copy(), y.copy(), None])
+    assert fingerprint != fingerprint_data([x + 1, y, None])
+    assert fingerprint != fingerprint_data([x.astype(np.float64), y, None])
+    assert fingerprint != fingerprint_data([x.reshape(3, 4), y, None])
+    assert fingerprint_data(pd.DataFrame(x)) != fingerprint_data(pd.DataFrame(x, columns=['a', 'b', 'c']))
+    assert fingerprint_data([x, tf.data.Dataset.from_tensor_slices(x)]) is None
+
+
+def test_materialize_dataset():
+    x = np.arange(10, dtype=np.float32)
+    dataset = tf.data.Dataset.from_tensor_slices(((x, x * 2), x + 1))
+    (x0, x1), y = materialize_dataset(dataset, batch_size=3)
+    assert np.array_equal(x0, x) and np.array_equal(x1, x * 2) and np.array_equal(y, x + 1)
+
+
+def test_dataset_cache(tmpdir):
+    cache = DatasetCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # evicts b, the least recently used
+    assert 'b' not in cache and cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+    # evicted entries are read back from disk
+    cache = DatasetCache(max_size=1, directory=str(tmpdir.join('cache')))
+    cache.put('a', {'train': np.arange(3)})
+    cache.put('b', 2)
+    assert len(cache) == 1 and 'a' in cache
+    assert np.array_equal(cache.get('a')['train'], np.arange(3))
+    assert np.array_equal(DatasetCache(directory=cache.directory).get('a')['train'], np.arange(3))
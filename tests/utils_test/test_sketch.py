@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from autorecsys.utils.sketch import CountMinSketch
+
+
+def test_count_min_sketch():
+    values = pd.Series(np.random.RandomState(0).zipf(1.5, 100000))
+    counts = values.value_counts()
+    sketch = CountMinSketch(error=1e-3, delta=0.01)
+    assert sketch.width == 2719 and sketch.depth == 5
+
+    # counts in two parts add up, and estimates never fall below the true counts
+    half = len(values) // 2
+    for part in (values[:half], values[half:]):
+        part_counts = part.value_counts()
+        sketch.update(part_counts.index, part_counts.values)
+    estimates = sketch.estimate(counts.index)
+    assert sketch.total_count == len(values)
+    assert np.all(estimates >= counts.values)
+    assert np.max(estimates - counts.values) <= sketch.error_bound()
+    assert sketch.memory_usage() == sketch.width * sketch.depth * 8
+
+
+def test_count_min_sketch_mixed_types():
+    sketch = CountMinSketch(error=1e-2)
+    estimates = sketch.update(np.array(['a', 'b', 0.0], dtype=object), [3, 2, 1])
+    assert np.all(estimates >= [3, 2, 1])
+    assert sketch.estimate(np.array(['a'], dtype=object))[0] >= 3